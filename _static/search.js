@@ -0,0 +1,99 @@
+// Title search over the movie grid.
+// The optimized site loads a precomputed prefix index of the title words
+// (see commands/site_assets.py); without it the titles on the page are scanned.
+(function () {
+  "use strict";
+
+  var script = document.currentScript;
+  var input = document.getElementById("movie-search");
+  var items = Array.prototype.slice.call(document.querySelectorAll(".movie-grid li"));
+  var index = null;
+
+  function words(text) {
+    return text.normalize("NFKD").replace(/[\u0300-\u036f]/g, "").toLowerCase()
+      .split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+  }
+
+  function find(node, word) {
+    while (word) {
+      var next = null;
+      for (var label in node) {
+        if (!label) {
+          continue;
+        }
+        if (label.startsWith(word)) {
+          return node[label];
+        }
+        if (word.startsWith(label)) {
+          next = node[label];
+          word = word.slice(label.length);
+          break;
+        }
+      }
+      if (!next) {
+        return null;
+      }
+      node = next;
+    }
+    return node;
+  }
+
+  function collect(node, ids) {
+    for (var label in node) {
+      if (label) {
+        collect(node[label], ids);
+      } else {
+        node[label].forEach(function (id) { ids.add(id); });
+      }
+    }
+    return ids;
+  }
+
+  function matchIndex(query) {
+    var matches = null;
+    query.forEach(function (word) {
+      var node = find(index, word);
+      var ids = node ? collect(node, new Set()) : new Set();
+      matches = matches ? new Set(Array.from(matches).filter(function (id) { return ids.has(id); })) : ids;
+    });
+    return matches;
+  }
+
+  function matchPage(query) {
+    var matches = new Set();
+    items.forEach(function (item, id) {
+      var title = words(item.querySelector(".movie-title").textContent);
+      if (query.every(function (word) {
+        return title.some(function (part) { return part.startsWith(word); });
+      })) {
+        matches.add(id);
+      }
+    });
+    return matches;
+  }
+
+  function update() {
+    var query = words(input.value);
+    var matches = query.length ? (index ? matchIndex(query) : matchPage(query)) : null;
+    items.forEach(function (item, id) {
+      var hidden = matches !== null && !matches.has(id);
+      if (item.hidden !== hidden) {
+        item.hidden = hidden;
+      }
+    });
+  }
+
+  if (!input) {
+    return;
+  }
+  input.addEventListener("input", update);
+  if (script && script.dataset.index && window.fetch) {
+    fetch(script.dataset.index)
+      .then(function (response) { return response.ok ? response.json() : null; })
+      .then(function (loaded) {
+        index = loaded;
+        update();
+      })
+      .catch(function () {});
+  }
+})();
@@ -1,7 +1,21 @@
 import statistics
 import difflib
-import random
+import heapq
+from commands.approx_stats import ApproximateStatistics, HISTOGRAM_BINS, MAX_RATING
+from commands.fulltext import FullTextIndex
+from commands.parallel import (FUZZY_PARALLEL_THRESHOLD, default_workers,
+                               parallel_fuzzy_matches, parallel_statistics,
+                               parallel_top_movies, worth_splitting)
+from commands.sampler import MovieSampler
+from commands.query import (And, Compare, MovieFrame, Query, QueryError,
+                            QUERY_HELP)
+from commands.view_cache import ViewCache
 from storage.istorage import IStorage
+from storage.movie import MovieCollection
+
+PAGE_SIZE = 20
+# Histogram bars from empty to the fullest bin of a decade
+BAR_LEVELS = " .:-=+*#%@"
 
 
 class Analytics:
@@ -12,32 +26,66 @@ class Analytics:
         randomly select a movie, perform fuzzy searches on movie titles, sort movies
         by rating or release year, and filter movies based on user-specified criteria.
 
+        Statistics, fuzzy search and sorting of large catalogs are split into
+        chunks that are processed by a pool of worker processes and merged.
+        Their results are kept in a ViewCache until the next save, so repeating
+        a command on an unchanged catalog is instant.
+
         Attributes:
             movies_data (IStorage): A data source for movie information, typically implementing
                              a 'get_movies()' method to retrieve a dictionary of movies.
+            workers (int): Number of worker processes for large catalogs.
+            views (ViewCache): Cache of the movies and the views derived from them.
 
         Methods:
             show_statistics(): Displays average, median, highest, and lowest ratings.
-            random_movie(): Selects and displays a random movie from the database.
+            show_approximate_statistics(): Displays estimated statistics computed in one
+                                           streaming pass with bounded memory.
+            random_movie(): Suggests a random movie, optionally weighted by rating or
+                            recency, that was not suggested recently.
             fuzzy_search(): Performs a fuzzy search on movie titles based on user input.
-            sort_movies(sort_key, reverse_order): Sorts movies by a specified key.
+            sort_movies(sort_key, reverse_order, offset, limit): Sorts movies by a specified key.
+            top_movies(items, sort_key, reverse_order, offset, limit): Selects one sorted page.
             print_movies(sorted_movies): Prints a list of sorted movies.
+            print_sorted_pages(sort_key, reverse_order): Prints sorted movies page by page.
             sorted_by_rating(): Sorts and displays movies by rating in descending order.
             sorted_by_year(): Sorts and displays movies by release year based on user preference.
             get_valid_input(prompt, category): Prompts user for valid numerical input with
                                                validation.
             filtered_movies(): Filters and displays movies based on minimum rating and year range.
+            query_movies(): Runs a multi-criteria query entered by the user.
+            full_text_search(): Ranks movies by how well their title and notes match
+                                the user's words.
     """
 
-    def __init__(self, movies_data: IStorage):
+    def __init__(self, movies_data: IStorage, workers: int = None, views: ViewCache = None):
         """
             Initializes the Analytics instance with a given movie data source.
 
             Args:
                 movies_data (object): A data source object that has a 'get_movies()' method
                                           to retrieve movie data.
+                workers (int, optional): Worker processes for large catalogs; defaults to
+                                         one per core, 1 disables them.
+                views (ViewCache, optional): View cache shared with other commands;
+                                             a private one by default.
         """
         self.movies = movies_data
+        self.workers = workers or default_workers()
+        self.views = ViewCache(movies_data) if views is None else views
+        self._sampler = MovieSampler()
+        movies_data.add_listener(self._sampler.on_save)
+        self._text_index = None
+
+    def movie_frame(self):
+        """
+            Returns the typed column view of the movies, rebuilt only when the
+            storage version changes.
+
+            Returns:
+                MovieFrame: The columns of the current movies.
+        """
+        return self.views.get(("frame",), lambda: MovieFrame(self.views.movies()))
 
     def show_statistics(self):
         """
@@ -48,47 +96,115 @@ class Analytics:
             prints the average rating (to one decimal place), the median rating, and the
             titles of the movies with the highest and lowest ratings.
         """
-        movies = self.movies.get_movies()
-        ratings = [float(movie["Rating"]) for movie in movies.values()]
+        stats = self.views.get(("statistics",), lambda: self.compute_statistics(
+            self.views.movies(), self.workers))
 
-        if not ratings:
+        if stats is None:
             print("No ratings available.")
             return
 
-        average_rating = sum(ratings) / len(movies)
-        median_rating = statistics.median(ratings)
-        highest_rating = max(ratings)
-        lowest_rating = min(ratings)
+        print(f"\nAverage rating: {stats['average']:.1f}")
+        print(f"Median rating: {stats['median']:.1f}")
+
+        for title in stats["best"]:
+            print(f"Best movie: {title}, Rating: {stats['highest']}")
+        for title in stats["worst"]:
+            print(f"Worst movie: {title}, Rating: {stats['lowest']}")
+
+    def show_approximate_statistics(self):
+        """
+            Displays rating statistics estimated in a single streaming pass.
+
+            Meant for catalogs too large for show_statistics(): the movies are
+            streamed from storage instead of loaded, the quartiles are estimated
+            with their error bounds, and ratings are shown as a histogram per
+            release decade.
+        """
+        stats = ApproximateStatistics.from_movies(self.movies.iter_movies())
+        if not stats.count:
+            print("No ratings available.")
+            return
 
-        best_movies = {title: movie["Rating"] for title, movie in movies.items()
-                       if float(movie["Rating"]) == highest_rating}
-        worst_movies = {title: movie["Rating"] for title, movie in movies.items()
-                        if float(movie["Rating"]) == lowest_rating}
+        print(f"\nApproximate statistics of {stats.count} rated movies")
+        print(f"Average rating: {stats.average:.1f}")
+        for name, fraction in (("Lower quartile", 0.25), ("Median", 0.5),
+                               ("Upper quartile", 0.75)):
+            estimate, low, high = stats.quantile(fraction)
+            print(f"{name} rating: ~{estimate:.1f} (between {low:.1f} and {high:.1f})")
+        for label, rating, sample in (("Best", stats.highest, stats.best),
+                                      ("Worst", stats.lowest, stats.worst)):
+            print(f"{label} rating: {rating} ({sample.seen} movie(s), e.g. "
+                  f"{', '.join(sample.items)})")
+
+        step = MAX_RATING / HISTOGRAM_BINS
+        print(f"\nRatings by decade ({'|'.join(f'{i * step:g}' for i in range(HISTOGRAM_BINS))}):")
+        for decade in sorted(stats.decades):
+            bins = stats.decades[decade]
+            fullest = max(bins)
+            bars = "".join(BAR_LEVELS[-(-count * (len(BAR_LEVELS) - 1) // fullest)]
+                           for count in bins)
+            print(f"{decade}s [{bars}] {sum(bins)} movies")
 
-        print(f"\nAverage rating: {average_rating:.1f}")
-        print(f"Median rating: {median_rating:.1f}")
+    @staticmethod
+    def compute_statistics(movies, workers=1):
+        """
+            Calculates rating statistics for a dictionary of movies.
 
-        for title in best_movies:
-            print(f"Best movie: {title}, Rating: {highest_rating}")
-        for title in worst_movies:
-            print(f"Worst movie: {title}, Rating: {lowest_rating}")
+            Args:
+                movies (dict): Movies keyed by title.
+                workers (int, optional): Worker processes for large catalogs.
+
+            Returns:
+                dict | None: The average, median, highest and lowest ratings together with
+                             the titles of the best and worst movies, or None if there
+                             are no ratings.
+        """
+        movies = MovieCollection.wrap(movies)
+        if worth_splitting(len(movies), workers):
+            return parallel_statistics(movies, workers)
+        # Movies without a rating, such as "N/A" in older files, are left out
+        rated = [(title, float(movie.rating)) for title, movie in movies.items()
+                 if movie.rating is not None]
+        ratings = [rating for _, rating in rated]
+
+        if not ratings:
+            return None
+
+        highest_rating = max(ratings)
+        lowest_rating = min(ratings)
+        return {
+            "average": sum(ratings) / len(ratings),
+            "median": statistics.median(ratings),
+            "highest": highest_rating,
+            "lowest": lowest_rating,
+            "best": [title for title, rating in rated if rating == highest_rating],
+            "worst": [title for title, rating in rated if rating == lowest_rating]
+        }
 
     def random_movie(self):
         """
-        Selects and displays a random movie from the movie database.
+        Suggests a random movie from the movie database.
 
         This function:
-        - Retrieves movie data from the storage.
-        - Randomly selects one movie from the collection.
+        - Asks whether better rated or newer movies should be preferred.
+        - Picks a movie through the sampler, which is kept up to date with every
+          save and avoids the last few suggestions.
         - Prints the movie title and its rating.
         """
-        movies = self.movies.get_movies()
-        if not movies:
+        version = self.movies.version()
+        if self._sampler.version != version:
+            # Changed by another process, or first use
+            self._sampler.rebuild(self.views.movies(), version)
+        if not self._sampler:
             print("No movies available.")
             return
 
-        title, details = random.choice(list(movies.items()))
-        print(f"\nYour movie for tonight: {title}, it's rated {details['Rating']}")
+        answer = input("Prefer (R)ated, (N)ew or (A)ny movies? [A] ").strip().lower()
+        weight_by = {"r": "rating", "n": "recency"}.get(answer[:1], "uniform")
+        title = self._sampler.pick(weight_by)
+        rating = self._sampler.rating(title)
+        print(f"\nYour movie for tonight: {title}, "
+              f"it's rated {'N/A' if rating is None else rating}")
 
     def fuzzy_search(self):
         """
@@ -98,7 +214,7 @@ class Analytics:
             The search is case-insensitive and matches parts of the movie titles.
             If matches are found, it prints out the movie titles along with their ratings.
         """
-        movies = self.movies.get_movies()
+        movies = self.views.movies()
         if not movies:
             print("No movies available.")
             return
@@ -109,39 +225,109 @@ class Analytics:
             print("No input provided.")
             return
 
+        matched_keys = self.views.get(
+            ("search", " ".join(part_of_name.lower().split())),
+            lambda: self.search_titles(movies, part_of_name, self.workers))
+        if not matched_keys:
+            print("No matches found.")
+        else:
+            for key in matched_keys:
+                print(f"{key}, {movies[key].get('Rating', 'N/A')}")
+
+    @staticmethod
+    def search_titles(movies, part_of_name, workers=1):
+        """
+            Finds the titles that fuzzily match any word of the search phrase.
+
+            Args:
+                movies (dict): Movies keyed by title.
+                part_of_name (str): The search phrase.
+                workers (int, optional): Worker processes for large catalogs.
+
+            Returns:
+                list: Matching titles, in the order they were found, without duplicates.
+        """
         search_words = part_of_name.lower().split()
+        if worth_splitting(len(movies), workers, FUZZY_PARALLEL_THRESHOLD):
+            return parallel_fuzzy_matches(list(movies.keys()), search_words, workers)
         normalized_dict = {key: key.lower().split() for key in movies.keys()}
-        matched_keys = []
+        matched_keys = {}
         for word in search_words:
             for original_key, words in normalized_dict.items():
                 if difflib.get_close_matches(word, words, n=5, cutoff=0.6):
-                    matched_keys.append(original_key)
-        if not matched_keys:
-            print("No matches found.")
-        else:
-            for key in matched_keys:
-                if key in movies:
-                    print(f"{key}, {movies[key]['Rating']}")
+                    matched_keys[original_key] = None
+        return list(matched_keys)
 
-    def sort_movies(self, sort_key, reverse_order=False):
+    def sort_movies(self, sort_key, reverse_order=False, offset=0, limit=None):
         """
-        Sorts movies based on the provided key and displays the sorted list.
+        Sorts movies based on the provided key and returns the requested slice.
 
         This function:
         - Retrieves movie data from the storage.
-        - Sorts the movies by the specified key (either 'rating' or 'year').
-        - Calls the function to print the sorted movies.
+        - Selects the movies by the specified key (either 'rating' or 'year').
+        - Returns only the rows from offset to offset + limit, without sorting the rest.
 
         Parameters:
-        - sort_key (str): The key to sort movies by ('rating' or 'year').
+        - sort_key (str): The key to sort movies by ('Rating' or 'Year').
         - reverse_order (bool): Whether to sort in descending order.
+        - offset (int): Number of leading rows to skip.
+        - limit (int | None): Maximum number of rows, or None for all of them.
         """
-        movies = self.movies.get_movies()
+        movies = self.views.movies()
         if not movies:
             print("No movies available.")
             return None
 
-        return sorted(movies.items(), key=lambda x: x[1][sort_key], reverse=reverse_order)
+        return self.views.get(
+            ("sorted", sort_key, reverse_order, offset, limit),
+            lambda: self.top_movies(movies.items(), sort_key, reverse_order, offset, limit,
+                                    self.workers))
+
+    @staticmethod
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def top_movies(items, sort_key, reverse_order=False, offset=0, limit=None, workers=1):
+        """
+        Selects one page of movies in sorted order.
+
+        With a limit, a heap of offset + limit entries is kept while scanning the
+        movies once, which costs O(n log k) instead of sorting the whole catalog.
+        Ties keep their storage order, exactly as a stable full sort would, and
+        movies without a value for the key come last in either order.
+        For large catalogs, each worker process selects the page candidates of
+        its chunk and the chunks are merged.
+
+        Parameters:
+        - items (iterable): (title, details) tuples.
+        - sort_key (str): The key to sort movies by ('Rating' or 'Year').
+        - reverse_order (bool): Whether to sort in descending order.
+        - offset (int): Number of leading rows to skip.
+        - limit (int | None): Maximum number of rows, or None for all of them.
+        - workers (int): Worker processes for large catalogs.
+
+        Returns:
+        - list: The selected (title, details) tuples.
+        """
+        # A full sort is not split: merging all rows would cost as much as sorting them
+        if limit is not None and hasattr(items, "__len__") and \
+                worth_splitting(len(items), workers):
+            return parallel_top_movies(items, sort_key, reverse_order, offset, limit, workers)
+
+        missing = []
+
+        def known():
+            for item in items:
+                if item[1].get(sort_key) is None:
+                    missing.append(item)
+                else:
+                    yield item
+
+        def key(item):
+            return item[1][sort_key]
+
+        if limit is None:
+            return (sorted(known(), key=key, reverse=reverse_order) + missing)[offset:]
+        select = heapq.nlargest if reverse_order else heapq.nsmallest
+        return (select(offset + limit, known(), key=key) + missing)[offset:offset + limit]
 
     @staticmethod
     def print_movies(sorted_movies):
@@ -149,27 +335,56 @@ class Analytics:
         Prints the sorted movies.
 
         This function:
-        - Takes a list of sorted movie items.
+        - Takes an iterable of sorted movie items.
         - Displays each movie's title, release year, and rating.
 
         Parameters:
-        - sorted_movies (list): A list of sorted movie tuples (title, details).
-        - sort_key (str): The key by which the movies were sorted.
+        - sorted_movies (iterable): Sorted movie tuples (title, details).
         """
         for title, details in sorted_movies:
-            print(f"{title} ({details['Year']}): {details['Rating']}")
+            print(f"{title} ({details.get('Year', 'N/A')}): {details.get('Rating', 'N/A')}")
+
+    def print_sorted_pages(self, sort_key, reverse_order=False, page_size=PAGE_SIZE):
+        """
+        Displays movies sorted by a key one page at a time.
+
+        Each page is selected with top_movies, so the first screen appears
+        without sorting the whole catalog, and further pages are only computed
+        when the user asks for them. Pages are cached until the next save.
+
+        Parameters:
+        - sort_key (str): The key to sort movies by ('Rating' or 'Year').
+        - reverse_order (bool): Whether to sort in descending order.
+        - page_size (int): Number of movies per page.
+        """
+        movies = self.views.movies()
+        if not movies:
+            print("No movies available.")
+            return
+
+        offset = 0
+        while True:
+            self.print_movies(self.views.get(
+                ("sorted", sort_key, reverse_order, offset, page_size),
+                lambda offset=offset: self.top_movies(movies.items(), sort_key,
+                                                      reverse_order, offset, page_size)))
+            offset += page_size
+            if offset >= len(movies):
+                return
+            answer = input(f"\nShowing {offset} of {len(movies)}. "
+                           "Show more? (Y/N) ").strip().lower()
+            if answer != "y":
+                return
 
     def sorted_by_rating(self):
         """
-        Sorts and displays movies by their rating in descending order.
+        Sorts and displays movies by their rating in descending order, page by page.
         """
-        sorted_movies = self.sort_movies("Rating", True)
-        if sorted_movies:
-            self.print_movies(sorted_movies)
+        self.print_sorted_pages("Rating", True)
 
     def sorted_by_year(self):
         """
-        Sorts and displays movies by their release year.
+        Sorts and displays movies by their release year, page by page.
 
         Prompts the user to choose whether to display the latest movies first.
         """
@@ -179,9 +394,7 @@ class Analytics:
             print('Please enter "Y" or "N"')
 
         sort_descending = user_choice == "y"
-        sorted_movies = self.sort_movies("Year", sort_descending)
-        if sorted_movies:
-            self.print_movies(sorted_movies)
+        self.print_sorted_pages("Year", sort_descending)
 
     @staticmethod
     def get_valid_input(prompt, category):
@@ -228,8 +441,8 @@ class Analytics:
         Output:
             - Prints the filtered list of movies or a message if no matches are found.
         """
-        movies = self.movies.get_movies()
-        if not movies:
+        frame = self.movie_frame()
+        if len(frame) == 0:
             print("No movies available.")
             return
 
@@ -241,14 +454,93 @@ class Analytics:
         end_year = self.get_valid_input(
             "Enter end year (leave blank for no end year): ", "year")
 
-        filtered_movie_list = [
-            (title, details) for title, details in movies.items()
-            if (start_rating is None or float(details["Rating"]) >= start_rating) and
-            (start_year is None or int(details["Year"]) >= start_year) and
-            (end_year is None or int(details["Year"]) <= end_year)
-        ]
+        filtered_movie_list = self.filter_movies(None, start_rating, start_year, end_year, frame)
 
         if filtered_movie_list:
             self.print_movies(filtered_movie_list)
         else:
             print('No movies match for given criteria.')
+
+    @staticmethod
+    def filter_movies(movies, start_rating=None, start_year=None, end_year=None, frame=None):
+        """
+        Selects the movies matching a minimum rating and a release year range.
+
+        The criteria are compiled into a query plan and evaluated over typed
+        columns for all movies at once.
+
+        Args:
+            movies (dict): Movies keyed by title. Ignored if a frame is given.
+            start_rating (float, optional): Minimum rating, or None for no minimum.
+            start_year (float, optional): First release year, or None for no lower bound.
+            end_year (float, optional): Last release year, or None for no upper bound.
+            frame (MovieFrame, optional): A prebuilt column view of the movies.
+
+        Returns:
+            list: (title, details) tuples of the matching movies.
+        """
+        conditions = []
+        if start_rating is not None:
+            conditions.append(Compare("rating", ">=", start_rating))
+        if start_year is not None:
+            conditions.append(Compare("year", ">=", start_year))
+        if end_year is not None:
+            conditions.append(Compare("year", "<=", end_year))
+        query = Query(And(conditions) if conditions else None)
+        return query.run(movies, frame)
+
+    def query_movies(self):
+        """
+        Prompts the user for a query and displays the matching movies.
+
+        The query can combine rating and year ranges, title substrings or regular
+        expressions, and notes or poster presence with AND, OR and NOT, followed
+        by optional ORDER BY and LIMIT clauses.
+        """
+        frame = self.movie_frame()
+        if len(frame) == 0:
+            print("No movies available.")
+            return
+
+        print(QUERY_HELP)
+        text = input("\nEnter query: ").strip()
+        try:
+            results = Query.compile(text).run(None, frame)
+        except QueryError as err:
+            print(f"Invalid query: {err}")
+            return
+
+        if results:
+            self.print_movies(results)
+        else:
+            print('No movies match for given criteria.')
+
+    def full_text_search(self):
+        """
+        Prompts the user for search words and displays the best matching movies.
+
+        Titles and notes are searched through a full-text index, which is built
+        on first use and then kept up to date with every save. Words match their
+        other forms ("heists" finds "heist"), "quoted words" must appear as a
+        phrase and word* matches every word starting with it.
+        """
+        if self._text_index is None:
+            self._text_index = FullTextIndex.open(self.movies)
+        if not self._text_index:
+            print("No movies available.")
+            return
+
+        text = input("Enter search words: ").strip()
+        if not text:
+            print("No input provided.")
+            return
+
+        results = self._text_index.search(text)
+        if not results:
+            print("No matches found.")
+            return
+        movies = self.views.movies()
+        for title, _ in results:
+            if title in movies:
+                movie = movies[title]
+                print(f"{title} ({movie.get('Year', 'N/A')}): {movie.get('Rating', 'N/A')}")
@@ -0,0 +1,463 @@
+import itertools
+import json
+import math
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from commands.analytics import Analytics
+from commands.downloader import APIError, MovieInfoDownloader
+from commands.query import MovieFrame, Query, QueryError
+from storage.istorage import IStorage
+from storage.movie import Movie, MovieCollection
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SORT_KEYS = {"rating": "Rating", "year": "Year"}
+
+
+class BadRequest(Exception):
+    """Raised when a request has invalid parameters or body."""
+
+
+class MovieCatalog:
+    """
+        Keeps the movie database loaded in memory between API requests.
+
+        Reads are served from the cached dictionary, which is reloaded only when
+        the storage version changes, including saves made by other processes.
+        Mutations go through the IStorage methods, so the file stays the source
+        of truth.
+
+        Attributes:
+            storage (IStorage): The storage backend holding the movies.
+    """
+
+    def __init__(self, storage: IStorage):
+        """
+            Initializes the catalog with a storage backend.
+
+            Args:
+                storage (IStorage): The storage backend to serve.
+        """
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._generation = uuid.uuid4().hex[:8]
+        self._version = None
+        self._movies = None
+        self._frame = None
+
+    def snapshot(self) -> tuple:
+        """
+            Returns the current movies and their version tag.
+
+            Returns:
+                tuple: The movies dictionary and a version string. The dictionary must
+                       be treated as read-only.
+        """
+        with self._lock:
+            version = self.storage.version()
+            if self._movies is None or version != self._version:
+                self._movies = self.storage.get_movies()
+                self._version = version
+            return self._movies, f"{self._generation}-{self._version}"
+
+    def frame(self) -> MovieFrame:
+        """
+            Returns the typed column view of the current movies for queries.
+
+            Returns:
+                MovieFrame: The columns, built once per catalog version.
+        """
+        movies, _ = self.snapshot()
+        with self._lock:
+            if self._frame is None or self._frame[0] is not movies:
+                self._frame = (movies, MovieFrame(movies))
+            return self._frame[1]
+
+    def mutate(self, operation, *args):
+        """
+            Applies a storage mutation and refreshes the cached movies.
+
+            Args:
+                operation (callable): An IStorage method such as add_movie.
+                *args: Arguments passed to the method.
+        """
+        with self._lock:
+            operation(*args)
+            self._movies = None
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+        An HTTPServer that handles requests on a fixed pool of worker threads.
+
+        Attributes:
+            catalog (MovieCatalog): The in-memory catalog shared by the workers.
+    """
+
+    def __init__(self, server_address, catalog: MovieCatalog, workers: int = 8):
+        """
+            Binds the server and creates its worker pool.
+
+            Args:
+                server_address (tuple): Host and port to listen on.
+                catalog (MovieCatalog): The catalog to serve.
+                workers (int, optional): Number of worker threads. Defaults to 8.
+        """
+        super().__init__(server_address, MovieRequestHandler)
+        self.catalog = catalog
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        """
+            Handles one connection on a worker thread.
+        """
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+class MovieRequestHandler(BaseHTTPRequestHandler):
+    """
+        Serves the movie catalog as JSON.
+
+        Endpoints:
+            GET    /movies                 paginated list of all movies
+            GET    /movies/<title>         a single movie
+            GET    /search?q=              fuzzy title search
+            GET    /sorted?key=&order=     movies sorted by rating or year
+            GET    /filter?min_rating=&start_year=&end_year=
+            GET    /query?q=               multi-criteria query, see commands.query
+            GET    /stats                  rating statistics
+            POST   /movies                 {"title": ...} fetched from OMDb, or
+                                           {"title": ..., "details": {...}} stored as given
+            PATCH  /movies/<title>         {"notes": ...}
+            DELETE /movies/<title>
+
+        List endpoints accept "offset" and "limit" and support conditional GETs
+        through ETag and If-None-Match.
+    """
+
+    server_version = "MovieAPI/1.0"
+    server: PooledHTTPServer
+
+    # pylint: disable=invalid-name
+    def do_GET(self):
+        """Dispatches GET requests."""
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        movies, version = self.server.catalog.snapshot()
+        etag = f'"{version}:{url.path}?{url.query}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            if url.path == "/movies":
+                self.send_page(movies.items(), params, etag)
+            elif url.path.startswith("/movies/"):
+                title = unquote(url.path[len("/movies/"):])
+                if title not in movies:
+                    self.send_error_json(HTTPStatus.NOT_FOUND, f"Movie {title} doesn't exist!")
+                    return
+                self.send_json(self.movie_to_json(title, movies[title]), etag=etag)
+            elif url.path == "/search":
+                titles = Analytics.search_titles(movies, self.get_param(params, "q", str, ""))
+                self.send_page(((title, movies[title]) for title in titles), params, etag)
+            elif url.path == "/sorted":
+                self.send_page(self.sort_items(movies, params), params, etag, len(movies))
+            elif url.path == "/filter":
+                self.send_page(Analytics.filter_movies(
+                    movies,
+                    self.get_param(params, "min_rating", float),
+                    self.get_param(params, "start_year", int),
+                    self.get_param(params, "end_year", int),
+                    self.server.catalog.frame()), params, etag)
+            elif url.path == "/query":
+                query = Query.compile(self.get_param(params, "q", str, ""))
+                self.send_page(query.run(movies, self.server.catalog.frame()), params, etag)
+            elif url.path == "/stats":
+                self.send_json(Analytics.compute_statistics(movies) or {}, etag=etag)
+            else:
+                self.send_error_json(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        except (BadRequest, QueryError) as err:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(err))
+
+    def do_POST(self):
+        """Adds a movie."""
+        if urlsplit(self.path).path != "/movies":
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+            return
+        try:
+            body = self.read_json()
+            title = body.get("title")
+            if not isinstance(title, str) or not title.strip():
+                raise BadRequest("Movie name must not be empty.")
+            # Duplicates are found by alias and IMDb ID, as when adding from the menu
+            movies = MovieCollection.wrap(self.server.catalog.snapshot()[0])
+            existing = movies.find(title)
+            if existing is None:
+                if "details" in body:
+                    new_movie = {title: self.validate_details(body["details"])}
+                else:
+                    new_movie = MovieInfoDownloader().fetch_movie_data(title)
+                [(new_title, details)] = new_movie.items()
+                existing = movies.find(Movie.from_dict(details).imdb_id or new_title)
+            if existing is not None:
+                self.send_error_json(HTTPStatus.CONFLICT,
+                                     f"Movie '{title}' already exists as '{existing}'!")
+                return
+        except BadRequest as err:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(err))
+            return
+        except (APIError, ValueError) as err:
+            self.send_error_json(HTTPStatus.BAD_GATEWAY, str(err))
+            return
+
+        catalog = self.server.catalog
+        catalog.mutate(catalog.storage.add_movie, new_movie)
+        self.send_json(self.movie_to_json(new_title, details), status=HTTPStatus.CREATED)
+
+    def do_PATCH(self):
+        """Updates the notes of a movie."""
+        title = self.get_title()
+        if title is None:
+            return
+        try:
+            notes = self.read_json().get("notes")
+            if not isinstance(notes, str):
+                raise BadRequest('Expected a "notes" string.')
+        except BadRequest as err:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(err))
+            return
+        catalog = self.server.catalog
+        catalog.mutate(catalog.storage.update_movie, title, notes)
+        movies, _ = catalog.snapshot()
+        movie = movies.get(title)
+        if movie is None:
+            # Deleted by another client while the notes were saved
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"Movie {title} doesn't exist!")
+            return
+        self.send_json(self.movie_to_json(title, movie))
+
+    def do_DELETE(self):
+        """Deletes a movie."""
+        title = self.get_title()
+        if title is None:
+            return
+        catalog = self.server.catalog
+        catalog.mutate(catalog.storage.delete_movie, title)
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.end_headers()
+    # pylint: enable=invalid-name
+
+    def get_title(self):
+        """
+            Extracts an existing movie title from a /movies/<title> path.
+
+            Returns:
+                str | None: The title, or None if an error response was already sent.
+        """
+        path = urlsplit(self.path).path
+        if not path.startswith("/movies/"):
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+            return None
+        title = unquote(path[len("/movies/"):])
+        movies, _ = self.server.catalog.snapshot()
+        if title not in movies:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"Movie {title} doesn't exist!")
+            return None
+        return title
+
+    def read_json(self) -> dict:
+        """
+            Reads and decodes the JSON request body.
+
+            Returns:
+                dict: The decoded body.
+
+            Raises:
+                BadRequest: If the body is not a JSON object.
+        """
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as err:
+            raise BadRequest(f"Invalid JSON body: {err}") from err
+        if not isinstance(body, dict):
+            raise BadRequest("Expected a JSON object.")
+        return body
+
+    @staticmethod
+    def validate_details(details) -> dict:
+        """
+            Checks the explicit details of a new movie.
+
+            Args:
+                details: The "details" value of the request body.
+
+            Returns:
+                dict: The details.
+
+            Raises:
+                BadRequest: If details is not an object with a numeric Rating, an
+                            integer Year and string values for the other fields.
+        """
+        if not isinstance(details, dict):
+            raise BadRequest('Expected a "details" object.')
+        rating, year = details.get("Rating"), details.get("Year")
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)) \
+                or not math.isfinite(rating):
+            raise BadRequest('Expected a numeric "Rating".')
+        if isinstance(year, bool) or not isinstance(year, int):
+            raise BadRequest('Expected an integer "Year".')
+        for field in ("Poster", "IMDB Link", "Notes"):
+            if details.get(field) is not None and not isinstance(details[field], str):
+                raise BadRequest(f'Expected a string "{field}".')
+        return details
+
+    @staticmethod
+    def get_param(params, name, convert, default=None):
+        """
+            Reads and converts a single query parameter.
+
+            Args:
+                params (dict): Parsed query string.
+                name (str): Parameter name.
+                convert (callable): Conversion applied to the raw value.
+                default: Value used when the parameter is missing.
+
+            Returns:
+                The converted value or the default.
+
+            Raises:
+                BadRequest: If the value cannot be converted.
+        """
+        if name not in params:
+            return default
+        try:
+            return convert(params[name][0])
+        except ValueError as err:
+            raise BadRequest(f"Invalid value for {name}: {params[name][0]}") from err
+
+    def sort_items(self, movies, params):
+        """
+            Selects the requested page of movies sorted by the "key" and "order"
+            query parameters, without sorting the movies outside of it.
+
+            Returns:
+                list: Sorted (title, details) tuples of the page.
+        """
+        key = self.get_param(params, "key", str, "rating").lower()
+        if key not in SORT_KEYS:
+            raise BadRequest(f"Unknown sort key: {key}")
+        reverse = self.get_param(params, "order", str, "desc").lower() == "desc"
+        offset, limit = self.page_bounds(params)
+        return Analytics.top_movies(movies.items(), SORT_KEYS[key], reverse, offset, limit)
+
+    def page_bounds(self, params):
+        """
+            Reads the "offset" and "limit" query parameters.
+
+            Returns:
+                tuple: The offset and the page size, clamped to MAX_PAGE_SIZE.
+        """
+        offset = max(self.get_param(params, "offset", int, 0), 0)
+        limit = min(max(self.get_param(params, "limit", int, DEFAULT_PAGE_SIZE), 1),
+                    MAX_PAGE_SIZE)
+        return offset, limit
+
+    @staticmethod
+    def movie_to_json(title, details) -> dict:
+        """
+            Converts a movie entry to its JSON representation.
+        """
+        return {"Title": title, **details}
+
+    def send_page(self, items, params, etag, total=None):
+        """
+            Sends one page of movies, streaming the entries as they are encoded.
+
+            Args:
+                items (iterable): (title, details) tuples to paginate.
+                params (dict): Parsed query string with optional offset and limit.
+                etag (str): ETag of the response.
+                total (int, optional): Size of the full result. If given, items is
+                                       already the requested page.
+        """
+        offset, limit = self.page_bounds(params)
+        if total is not None:
+            page = items
+        else:
+            if not hasattr(items, "__len__"):
+                items = list(items)
+            total = len(items)
+            page = itertools.islice(items, offset, offset + limit)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        next_offset = offset + limit if offset + limit < total else None
+        header = json.dumps({"total": total, "offset": offset, "limit": limit,
+                             "next_offset": next_offset})
+        # Reopen the header object so the movies can be appended one by one
+        self.wfile.write(header[:-1].encode("utf-8") + b', "movies": [')
+        for index, (title, details) in enumerate(page):
+            chunk = json.dumps(self.movie_to_json(title, details), ensure_ascii=False)
+            self.wfile.write((", " if index else "").encode("utf-8") + chunk.encode("utf-8"))
+        self.wfile.write(b"]}")
+
+    def send_json(self, data, status=HTTPStatus.OK, etag=None):
+        """
+            Sends a complete JSON response.
+        """
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        """
+            Sends an error response with a JSON body.
+        """
+        self.send_json({"error": message}, status=status)
+
+
+def run_server(storage: IStorage, host="127.0.0.1", port=8000, workers=8):
+    """
+        Serves the movie database over HTTP until interrupted.
+
+        Args:
+            storage (IStorage): The storage backend to serve.
+            host (str, optional): Interface to bind. Defaults to localhost.
+            port (int, optional): Port to listen on. Defaults to 8000.
+            workers (int, optional): Number of worker threads. Defaults to 8.
+    """
+    server = PooledHTTPServer((host, port), MovieCatalog(storage), workers)
+    print(f"Serving movie API on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBye!")
+    finally:
+        server.server_close()
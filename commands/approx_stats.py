@@ -0,0 +1,329 @@
+import itertools
+import math
+import random
+from collections import Counter
+
+SKETCH_K = 200
+SAMPLE_SIZE = 5
+BATCH_SIZE = 4096
+HISTOGRAM_BINS = 10
+MAX_RATING = 10.0
+
+
+class ReservoirSample:
+    """
+        Uniform random sample of fixed size from a stream of unknown length.
+
+        Each of the n items seen so far is in the sample with probability size/n
+        (Algorithm R).
+
+        Attributes:
+            items (list): The sampled items.
+            seen (int): Number of items offered so far.
+    """
+
+    def __init__(self, size=SAMPLE_SIZE, rng=random):
+        """
+            Initializes an empty sample.
+
+            Args:
+                size (int, optional): Maximum number of sampled items.
+                rng (random.Random, optional): Random source.
+        """
+        self.size = size
+        self.items = []
+        self.seen = 0
+        self._rng = rng
+
+    def add(self, item):
+        """
+            Offers an item to the sample.
+        """
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self._rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+    def merge(self, other):
+        """
+            Combines another sample into this one, as if both streams were one.
+        """
+        total = self.seen + other.seen
+        if total == 0:
+            return
+        merged = []
+        ours, theirs = list(self.items), list(other.items)
+        while len(merged) < self.size and (ours or theirs):
+            # Draw from each side in proportion to the number of items it stands for
+            pick_ours = not theirs or (ours and self._rng.random() < self.seen / total)
+            source = ours if pick_ours else theirs
+            merged.append(source.pop(self._rng.randrange(len(source))))
+        self.items, self.seen = merged, total
+
+
+class KllSketch:
+    """
+        KLL streaming quantile sketch.
+
+        Values are kept in a hierarchy of compactors. When a level fills up it is
+        sorted and every other value, starting at a random offset, is promoted to
+        the next level with twice the weight. Memory stays at about 3k values for
+        any stream length, and a quantile query's rank is off by at most
+        rank_error() of the stream length with high probability.
+    """
+
+    def __init__(self, k=SKETCH_K, rng=random):
+        """
+            Initializes an empty sketch.
+
+            Args:
+                k (int, optional): Accuracy parameter; the rank error shrinks roughly as 1/k.
+                rng (random.Random, optional): Random source for the compaction offsets.
+        """
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._rng = rng
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        """
+            Returns how many values a level may hold; lower levels get less space.
+        """
+        depth = len(self.compactors) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, value):
+        """
+            Adds a value to the sketch.
+        """
+        self.compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values):
+        """
+            Adds several values to the sketch.
+        """
+        self.compactors[0].extend(values)
+        self.count += len(values)
+        self._size += len(values)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        """
+            Compacts full levels until the sketch fits its size budget again.
+        """
+        for level, items in enumerate(self.compactors):
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                    self._max_size = sum(self._capacity(index)
+                                         for index in range(len(self.compactors)))
+                items.sort()
+                # An odd value out stays behind at this level
+                keep = [items.pop()] if len(items) % 2 else []
+                self.compactors[level + 1].extend(items[self._rng.randrange(2)::2])
+                self.compactors[level] = keep
+                self._size = sum(len(compactor) for compactor in self.compactors)
+                if self._size < self._max_size:
+                    break
+
+    def merge(self, other):
+        """
+            Adds the contents of another sketch with the same k.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self._max_size = sum(self._capacity(index) for index in range(len(self.compactors)))
+        self._size = sum(len(compactor) for compactor in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def rank_error(self):
+        """
+            Returns the normalized rank error of single quantile queries.
+
+            The constants are the empirical fit published with the DataSketches
+            KLL implementation, valid with about 99% confidence.
+        """
+        return 2.296 / self.k ** 0.9723
+
+    def quantile(self, fraction):
+        """
+            Estimates the value at a rank fraction of the stream.
+
+            Args:
+                fraction (float): The rank, between 0 and 1 (0.5 for the median).
+
+            Returns:
+                float | None: The estimated value, or None if the sketch is empty.
+        """
+        weighted = sorted((value, 1 << level)
+                          for level, items in enumerate(self.compactors) for value in items)
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = min(max(fraction, 0.0), 1.0) * total
+        running = 0
+        for value, weight in weighted:
+            running += weight
+            if running >= target:
+                return value
+        return weighted[-1][0]
+
+
+class ApproximateStatistics:  # pylint: disable=too-many-instance-attributes
+    """
+        Rating statistics computed in one streaming pass with bounded memory.
+
+        Count, average, minimum and maximum are exact. Quantiles come from a
+        KLL sketch and are reported with their error bounds. The movies tied for
+        the best and worst rating are counted, and a few of them are kept as a
+        uniform reservoir sample. Ratings are also counted in a fixed histogram
+        per release decade. Instances can be merged, so catalogs can be
+        summarized separately and then combined.
+    """
+
+    def __init__(self, k=SKETCH_K, sample_size=SAMPLE_SIZE, rng=random):
+        """
+            Initializes empty statistics.
+
+            Args:
+                k (int, optional): Accuracy parameter of the quantile sketch.
+                sample_size (int, optional): Titles kept for the best and worst movies.
+                rng (random.Random, optional): Random source.
+        """
+        self.count = 0
+        self.total = 0.0
+        self.highest = self.lowest = None
+        self.sketch = KllSketch(k, rng)
+        self.best = ReservoirSample(sample_size, rng)
+        self.worst = ReservoirSample(sample_size, rng)
+        self.decades = {}
+        self._sample_size = sample_size
+        self._rng = rng
+
+    def add(self, title, rating, year=None):
+        """
+            Adds one movie to the statistics.
+
+            Args:
+                title (str): The movie title.
+                rating (float | None): The rating; movies without one are skipped.
+                year (int, optional): The release year, used for the decade histogram.
+        """
+        self.add_batch([(title, rating, year)])
+
+    def add_batch(self, movies):
+        """
+            Adds a batch of movies to the statistics.
+
+            Working on batches keeps most of the per-movie work in built-ins
+            such as sum(), max() and Counter.
+
+            Args:
+                movies (list): (title, rating, year) tuples; movies without a rating
+                               are skipped and a missing year is None.
+        """
+        movies = [(title, float(rating), year) for title, rating, year in movies
+                  if rating is not None]
+        if not movies:
+            return
+        ratings = [rating for _, rating, _ in movies]
+        self.count += len(ratings)
+        self.total += sum(ratings)
+        self.sketch.extend(ratings)
+
+        highest, lowest = max(ratings), min(ratings)
+        if self.highest is None or highest > self.highest:
+            self.highest = highest
+            self.best = ReservoirSample(self._sample_size, self._rng)
+        if highest == self.highest:
+            for title, rating, _ in movies:
+                if rating == highest:
+                    self.best.add(title)
+        if self.lowest is None or lowest < self.lowest:
+            self.lowest = lowest
+            self.worst = ReservoirSample(self._sample_size, self._rng)
+        if lowest == self.lowest:
+            for title, rating, _ in movies:
+                if rating == lowest:
+                    self.worst.add(title)
+
+        bin_width = MAX_RATING / HISTOGRAM_BINS
+        counts = Counter((int(year) // 10 * 10,
+                          min(max(int(rating // bin_width), 0), HISTOGRAM_BINS - 1))
+                         for _, rating, year in movies if year is not None)
+        for (decade, index), count in counts.items():
+            self.decades.setdefault(decade, [0] * HISTOGRAM_BINS)[index] += count
+
+    @classmethod
+    def from_movies(cls, movies, **kwargs):
+        """
+            Computes the statistics of a stream of movies.
+
+            Args:
+                movies (iterable): (title, Movie) pairs, e.g. from IStorage.iter_movies().
+                **kwargs: Passed to the constructor.
+
+            Returns:
+                ApproximateStatistics: The statistics.
+        """
+        stats = cls(**kwargs)
+        movies = iter(movies)
+        while batch := [(title, movie.rating, movie.year)
+                        for title, movie in itertools.islice(movies, BATCH_SIZE)]:
+            stats.add_batch(batch)
+        return stats
+
+    def merge(self, other):
+        """
+            Adds the statistics of another catalog.
+        """
+        self.count += other.count
+        self.total += other.total
+        self.sketch.merge(other.sketch)
+        if other.highest is not None:
+            if self.highest is None or other.highest > self.highest:
+                self.highest, self.best = other.highest, other.best
+            elif other.highest == self.highest:
+                self.best.merge(other.best)
+        if other.lowest is not None:
+            if self.lowest is None or other.lowest < self.lowest:
+                self.lowest, self.worst = other.lowest, other.worst
+            elif other.lowest == self.lowest:
+                self.worst.merge(other.worst)
+        for decade, bins in other.decades.items():
+            ours = self.decades.setdefault(decade, [0] * HISTOGRAM_BINS)
+            self.decades[decade] = [mine + theirs for mine, theirs in zip(ours, bins)]
+
+    @property
+    def average(self):
+        """The exact average rating, or None without ratings."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction):
+        """
+            Estimates a rating quantile together with its error bounds.
+
+            Args:
+                fraction (float): The rank, between 0 and 1.
+
+            Returns:
+                tuple: The estimate and the lowest and highest rating the true value
+                       can have within the sketch's rank error.
+        """
+        error = self.sketch.rank_error()
+        return (self.sketch.quantile(fraction), self.sketch.quantile(fraction - error),
+                self.sketch.quantile(fraction + error))
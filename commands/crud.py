@@ -1,5 +1,9 @@
-from commands.downloader import MovieInfoDownloader
+from itertools import islice
+from commands.downloader import APIError, MovieInfoDownloader
+from commands.pager import page_lines, terminal_page_size
+from commands.view_cache import ViewCache
 from storage.istorage import IStorage
+from storage.movie import Movie, MovieCollection
 
 
 class Crud:
@@ -13,42 +17,64 @@ class Crud:
         Attributes:
             movies_data (IStorage): A data source for movie information, implementing methods
                         like 'get_movies()', 'add_movie()', 'delete_movie()', and 'update_movie()'.
+            views (ViewCache): Cache of the movies, so listing and lookups do not re-read
+                               an unchanged file.
 
         Methods:
-            list_movies(): Lists all movies in the database with their release years and ratings.
+            list_movies(offset, limit, page_size): Lists the movies with their release years
+                                                   and ratings, streamed and paged.
             get_num(prompt, category): Prompts the user for a numerical value and validates it.
-            is_movie_in_dict(name): Checks if a movie title exists in the database
-                                    (case-insensitive).
+            is_movie_in_dict(name): Checks if a movie exists in the database, matching
+                                    spelling variants and IMDb IDs.
+            find_title(name): Resolves a name or IMDb ID to the stored title.
             get_new_title(): Prompts the user for a new movie title and ensures it is unique.
             add_movie(): Adds a new movie to the database with a specified title, year, and rating.
             delete_movie(): Deletes a movie from the database if it exists.
             update_movie(): Updates a movie with a personal note if it exists in the database.
+            batch_edit(): Queues many edits with undo/redo and saves them in one write.
     """
-    def __init__(self, movies_data: IStorage):
+    def __init__(self, movies_data: IStorage, views: ViewCache = None):
         """
             Initializes the Crud instance with a movie data source.
 
             Args:
                 movies_data (object): A data source object that has methods to retrieve, add,
                                           delete, and update movies.
+                views (ViewCache, optional): View cache shared with other commands;
+                                             a private one by default.
         """
         self.movies = movies_data
+        self.views = ViewCache(movies_data) if views is None else views
 
-    def list_movies(self):
+    def list_movies(self, offset=0, limit=None, page_size=None):
         """
-            Lists all movies in the movie storage with their release years and ratings.
+            Lists the movies in the movie storage with their release years and ratings.
 
-            This function retrieves the list of movies and prints the total count along with
-            each movie's title, release year, and rating.
-        """
-        movies = self.movies.get_movies()
-        if not movies:
-            print("No movies available.")
-            return
+            The movies are streamed from the storage unless they are cached, and
+            the lines are written in batches, so the first movies appear at once
+            even for huge catalogs. On a terminal the list is shown a screen at a
+            time, and the rest of the file is not read after quitting.
 
-        print(f"\n{len(movies)} movies in total")
-        for name, details in movies.items():
-            print(f"{name} ({details['Year']}): {details['Rating']} ")
+            Args:
+                offset (int, optional): Movies to skip.
+                limit (int, optional): The most movies to list; all if None.
+                page_size (int, optional): Lines per page; a screen if the input and
+                                           output are a terminal, 0 to not page.
+        """
+        movies = islice(self.views.iter_movies(), offset,
+                        None if limit is None else offset + limit)
+        lines = (f"{name} ({details.get('Year', 'N/A')}): {details.get('Rating', 'N/A')} \n"
+                 for name, details in movies)
+        if page_size is None:
+            page_size = terminal_page_size()
+        print()
+        count, complete = page_lines(lines, page_size or None)
+        if not count:
+            print("No movies available." if not offset else f"No movies after {offset}.")
+        elif complete and not offset and limit is None:
+            print(f"\n{count} movies in total")
+        else:
+            print(f"\nListed movies {offset + 1} to {offset + count}")
 
     @staticmethod
     def get_num(prompt, category):
@@ -79,19 +105,30 @@ class Crud:
             except ValueError:
                 print(f"Please enter a valid {category}")
 
+    def find_title(self, name):
+        """
+            Resolves a movie name or IMDb ID to the title it is stored under.
+
+            Args:
+                name (str): The movie title, a spelling variant of it, or an IMDb ID.
+
+            Returns:
+                str | None: The stored title, or None if the movie does not exist.
+        """
+        return self.views.movies().find(name)
+
     def is_movie_in_dict(self, name):
         """
-            Check if a movie title exists in the dictionary in a case-insensitive manner.
+            Check if a movie exists in the dictionary, ignoring case, accents,
+            punctuation and leading articles, or by its IMDb ID.
 
             Args:
                 name (str): The movie title to check.
 
             Returns:
-                bool: True if the movie title exists in the dictionary (case-insensitive),
-                      False otherwise.
+                bool: True if the movie exists in the dictionary, False otherwise.
         """
-        movies = self.movies.get_movies()
-        return name.lower() in map(lambda key: key.lower(), movies.keys())
+        return self.find_title(name) is not None
 
     def get_new_title(self):
         """
@@ -126,6 +163,11 @@ class Crud:
             return
 
         new_movie = MovieInfoDownloader().fetch_movie_data(new_name)
+        for title, details in new_movie.items():
+            existing = self.find_title(Movie.from_dict(details).imdb_id or title)
+            if existing is not None:
+                print(f"Movie '{new_name}' already exists as '{existing}'!")
+                return
         self.movies.add_movie(new_movie)
         print(f"Movie {new_name} successfully added")
 
@@ -140,9 +182,10 @@ class Crud:
            - If the movie is not found, informs the user that the movie doesn't exist.
 
         """
-        movies = self.movies.get_movies()
+        movies = self.views.movies()
         if movies:
             name = input("Enter movie name to delete: ").strip()
+            name = MovieCollection.wrap(movies).find(name) or name
 
             if name in movies:
                 self.movies.delete_movie(name)
@@ -162,9 +205,10 @@ class Crud:
             - If the movie exists, prompts for a note and updates the movie.
             - If the movie does not exist, informs the user.
         """
-        movies = self.movies.get_movies()
+        movies = self.views.movies()
         if movies:
             name = input("Enter movie name: ").strip()
+            name = MovieCollection.wrap(movies).find(name) or name
 
             if name in movies:
                 note = input("Enter a note to add to the movie: ")
@@ -174,3 +218,68 @@ class Crud:
                 print(f"Movie {name} doesn't exist!")
         else:
             print("No movies in database")
+
+    def batch_edit(self):
+        """
+            Runs a batch editing session.
+
+            Adds, deletes and note updates are queued in memory and can be undone
+            and redone. Nothing is written until the user commits, and then all
+            edits are saved together in a single write.
+        """
+        session = self.movies.edit()
+        print("Batch edit: a <title> add, d <title> delete, n <title> note, u undo, r redo, "
+              "l list edits, c commit, q quit without saving")
+        while True:
+            command, _, argument = input("batch> ").strip().partition(" ")
+            command, argument = command.lower(), argument.strip()
+            if command in ("a", "d", "n") and argument:
+                self.queue_edit(session, command, argument)
+            elif command in ("u", "r"):
+                operation = session.undo() if command == "u" else session.redo()
+                action = "undo" if command == "u" else "redo"
+                if operation is None:
+                    print(f"Nothing to {action}.")
+                else:
+                    print(f"{action.capitalize()}: {operation[0]} {operation[1]}")
+            elif command == "l":
+                for kind, title, _ in session.operations:
+                    print(f"{kind} {title}")
+            elif command == "c":
+                count = len(session.operations)
+                skipped = session.commit()
+                print(f"Saved {count - len(skipped)} edit(s) in one write.")
+                for kind, title, _ in skipped:
+                    print(f"Skipped {kind} {title}: the movie was removed meanwhile.")
+                return
+            elif command == "q":
+                print("Edits discarded.")
+                return
+            else:
+                print("Unknown command.")
+
+    @staticmethod
+    def queue_edit(session, command, name):
+        """
+            Queues an add ("a"), delete ("d") or note update ("n") in a batch session.
+
+            Args:
+                session (EditSession): The session.
+                command (str): The edit command.
+                name (str): The movie name, resolved against the session's movies.
+        """
+        title = session.get_movies().find(name)
+        if command == "a":
+            if title is not None:
+                print(f"Movie '{name}' already exists!")
+                return
+            try:
+                session.add_movie(MovieInfoDownloader().fetch_movie_data(name))
+            except APIError as err:
+                print(f"Could not add '{name}': {err}")
+        elif title is None:
+            print(f"Movie {name} doesn't exist!")
+        elif command == "d":
+            session.delete_movie(title)
+        else:
+            session.update_movie(title, input("Enter a note to add to the movie: "))
@@ -0,0 +1,248 @@
+import difflib
+from collections import defaultdict
+from storage.istorage import IStorage
+from storage.movie import MovieCollection, normalize_title
+
+SIMILARITY_CUTOFF = 0.9
+# Titles longer than this only get an exact blocking key
+MAX_NEIGHBORHOOD_LENGTH = 40
+# Deletion buckets larger than this are too generic to be useful
+MAX_BUCKET_SIZE = 50
+
+
+class UnionFind:
+    """
+        Disjoint-set forest used to grow duplicate clusters from matched pairs.
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        """
+            Returns the representative of the item's cluster.
+        """
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        """
+            Merges the clusters of two items, keeping the smaller index as the root.
+        """
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def blocking_keys(normalized):
+    """
+        Returns the hash keys a normalized title is bucketed under.
+
+        Besides the exact title, the title and every variant of it with one
+        character deleted are keys of its neighbourhood, so two titles one typo
+        apart (an insertion, deletion or substitution) always share a bucket
+        without comparing all pairs of titles.
+
+        Args:
+            normalized (str): The normalized title.
+
+        Returns:
+            list: The blocking keys.
+    """
+    compact = normalized.replace(" ", "")
+    keys = [("exact", compact)]
+    if len(compact) <= MAX_NEIGHBORHOOD_LENGTH:
+        keys.append(("deletion", compact))
+        keys.extend(("deletion", compact[:index] + compact[index + 1:])
+                    for index in range(len(compact)))
+    return keys
+
+
+def is_duplicate(first, second):
+    """
+        Decides whether two catalog entries describe the same movie.
+
+        Args:
+            first (tuple): (normalized title, Movie) of the first entry.
+            second (tuple): (normalized title, Movie) of the second entry.
+
+        Returns:
+            bool: True if they are the same movie.
+    """
+    (first_title, first_movie), (second_title, second_movie) = first, second
+    first_id, second_id = first_movie.imdb_id, second_movie.imdb_id
+    if first_id and second_id:
+        return first_id == second_id
+    if first_movie.year is not None and second_movie.year is not None \
+            and first_movie.year != second_movie.year:
+        return False
+    if first_title == second_title:
+        return True
+    return difflib.SequenceMatcher(None, first_title, second_title).ratio() >= \
+        SIMILARITY_CUTOFF
+
+
+def compatible(first, second):
+    """
+        Decides whether two clusters may describe the same movie.
+
+        Args:
+            first (tuple): (IMDb IDs, years) sets of the first cluster.
+            second (tuple): (IMDb IDs, years) sets of the second cluster.
+
+        Returns:
+            bool: False if the clusters have different IMDb IDs or no common year.
+    """
+    (first_ids, first_years), (second_ids, second_years) = first, second
+    if first_ids and second_ids and first_ids != second_ids:
+        return False
+    return not first_years or not second_years or bool(first_years & second_years)
+
+
+def link_similar_titles(entries, buckets, clusters):  # pylint: disable=too-many-locals
+    """
+        Joins the clusters of matching entries that share a blocking key.
+
+        Two clusters are only joined if they are compatible as a whole, so an
+        entry without IMDb ID or year cannot link two different movies.
+
+        Args:
+            entries (list): (normalized title, Movie) tuples.
+            buckets (dict): Entry indices keyed by blocking key.
+            clusters (UnionFind): The clusters found so far, updated in place.
+    """
+    # IMDb IDs and years of each cluster, keyed by its root
+    traits = defaultdict(lambda: (set(), set()))
+    for index, (_, movie) in enumerate(entries):
+        ids, years = traits[clusters.find(index)]
+        if movie.imdb_id:
+            ids.add(movie.imdb_id)
+        if movie.year is not None:
+            years.add(movie.year)
+
+    for (kind, _), members in buckets.items():
+        if len(members) < 2 or (kind == "deletion" and len(members) > MAX_BUCKET_SIZE):
+            continue
+        for position, first in enumerate(members):
+            for second in members[position + 1:]:
+                first_root, second_root = clusters.find(first), clusters.find(second)
+                if first_root != second_root and \
+                        compatible(traits[first_root], traits[second_root]) and \
+                        is_duplicate(entries[first], entries[second]):
+                    clusters.union(first, second)
+                    first_traits, second_traits = traits.pop(first_root), traits.pop(second_root)
+                    traits[clusters.find(first)] = (first_traits[0] | second_traits[0],
+                                                    first_traits[1] | second_traits[1])
+
+
+def find_duplicates(movies):
+    """
+        Finds clusters of entries that describe the same movie.
+
+        Entries with the same IMDb ID are matched through a hash index. Entries
+        whose normalized titles share a blocking key are compared pairwise within
+        their bucket only, and a match needs compatible years and IMDb IDs, both
+        between the two entries and between the clusters they already belong to.
+
+        Args:
+            movies (Mapping): Movies keyed by title.
+
+        Returns:
+            list: Clusters of two or more titles, each in storage order.
+    """
+    movies = MovieCollection.wrap(movies)
+    titles = list(movies)
+    entries = [(normalize_title(title), movies[title]) for title in titles]
+    clusters = UnionFind(len(titles))
+
+    by_imdb_id = {}
+    buckets = defaultdict(list)
+    for index, (normalized, movie) in enumerate(entries):
+        imdb_id = movie.imdb_id
+        if imdb_id:
+            if imdb_id in by_imdb_id:
+                clusters.union(by_imdb_id[imdb_id], index)
+            else:
+                by_imdb_id[imdb_id] = index
+        for key in blocking_keys(normalized):
+            buckets[key].append(index)
+
+    link_similar_titles(entries, buckets, clusters)
+
+    grouped = defaultdict(list)
+    for index, title in enumerate(titles):
+        grouped[clusters.find(index)].append(title)
+    return [group for group in grouped.values() if len(group) > 1]
+
+
+def merge_duplicates(movies, clusters):
+    """
+        Merges each duplicate cluster into its first entry in a single streaming pass.
+
+        Entries are visited once in storage order. The first member of a cluster
+        is kept under its title; later members fill in its missing fields and add
+        their notes, then are dropped.
+
+        Args:
+            movies (Mapping): Movies keyed by title.
+            clusters (list): Clusters as returned by find_duplicates.
+
+        Returns:
+            MovieCollection: The deduplicated movies.
+    """
+    canonical = {title: cluster[0] for cluster in clusters for title in cluster}
+    merged = MovieCollection()
+    for title, movie in MovieCollection.wrap(movies).items():
+        target = canonical.get(title, title)
+        if target == title:
+            merged[title] = movie.copy()
+            continue
+        kept = merged[target]
+        for field in ("Rating", "Year", "Poster", "IMDB Link"):
+            if kept.get(field) in (None, "", "N/A") and movie.get(field) not in (None, ""):
+                kept[field] = movie[field]
+        if movie.notes and movie.notes not in (kept.notes or ""):
+            kept.notes = f"{kept.notes}; {movie.notes}" if kept.notes else movie.notes
+    return merged
+
+
+class Deduplicator:  # pylint: disable=too-few-public-methods
+    """
+        Menu command that finds and merges duplicate movies.
+
+        Attributes:
+            movies (IStorage): The storage to deduplicate.
+    """
+
+    def __init__(self, movies_data: IStorage):
+        """
+            Initializes the command with a movie data source.
+
+            Args:
+                movies_data (IStorage): The storage to deduplicate.
+        """
+        self.movies = movies_data
+
+    def deduplicate(self):
+        """
+            Lists duplicate movies and, after confirmation, merges them.
+        """
+        movies = self.movies.get_movies()
+        clusters = find_duplicates(movies)
+        if not clusters:
+            print("No duplicate movies found.")
+            return
+
+        for cluster in clusters:
+            print(" = ".join(cluster))
+        answer = input(f"\nMerge {len(clusters)} group(s) into their first title? (Y/N) ")
+        if answer.strip().lower() != "y":
+            print("Nothing was changed.")
+            return
+        # Merged into the movies as stored by then, keeping edits made during the prompt
+        merged = self.movies.merge_movies(clusters, merge_duplicates)
+        print(f"Merged {merged} duplicate movie(s).")
@@ -1,7 +1,16 @@
+import asyncio
+import json
 import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
 from dotenv import load_dotenv
 from requests.exceptions import HTTPError, ConnectionError, Timeout, RequestException
+from commands.rate_limit import CircuitBreaker, RateLimiter, RetryPolicy
+from storage.async_storage import IAsyncStorage
 
 
 def load_api_key() -> str:
@@ -21,28 +30,164 @@ def load_api_key() -> str:
     return api_key
 
 
+DEFAULT_API_URL = "http://www.omdbapi.com/"
+RECORD, REPLAY = "record", "replay"
+# Seconds to connect and to wait for the response
+DEFAULT_TIMEOUT = (3.05, 10)
+# OMDb requests per second of the whole process, and how many may go back to back
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 5
+# Throttled (429) and server-side (5xx) responses are worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Shared by all downloaders, so pacing and failing fast apply to the process as a whole
+OMDB_LIMITER = RateLimiter(DEFAULT_RATE, burst=DEFAULT_BURST)
+OMDB_BREAKER = CircuitBreaker()
+
+
 class APIError(Exception):
-    """Custom exception for handling API-related errors."""
+    """
+        Custom exception for handling API-related errors.
+
+        Attributes:
+            status (int | None): The HTTP status of the failed response, if there was one.
+            retry_after (float | None): Seconds the server asked to wait before retrying.
+            transient (bool): Whether a retry may succeed: throttling, a server error,
+                              a timeout or a failed connection.
+    """
+
+    def __init__(self, message: str, status: int = None, retry_after: float = None,
+                 transient: bool = False) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.transient = transient or status in RETRY_STATUSES
+
+
+def parse_retry_after(value: str):
+    """
+    Convert a Retry-After header into seconds.
+
+    Args:
+        value (str | None): Either a number of seconds or an HTTP date.
+
+    Returns:
+        float | None: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(),
+                   0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def response_key(query: str, by_id: bool = False) -> str:
+    """
+    Build the key a response is recorded under.
+
+    Args:
+        query (str): The requested title or IMDb ID.
+        by_id (bool, optional): Whether the query is an IMDb ID.
+
+    Returns:
+        str: "i:<id>" or "t:<title>", case-insensitive.
+    """
+    return f"{'i' if by_id else 't'}:{query.strip().lower()}"
+
+
+def load_recording(path: str) -> dict:
+    """
+    Load recorded OMDb responses.
+
+    The recording is a JSON Lines file with one {"key": ..., "response": ...}
+    object per line; later lines win.
+
+    Args:
+        path (str): The recording file.
+
+    Returns:
+        dict: Responses keyed by response_key(). Empty if the file does not exist.
+    """
+    responses = {}
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    responses[entry["key"]] = entry["response"]
+    except FileNotFoundError:
+        pass
+    return responses
 
 
 class MovieInfoDownloader:
     """
         A class to fetch movie information using the OMDb API.
 
+        Requests are paced by a token bucket that slows down when the API
+        throttles or fails and honours Retry-After. Transient failures are
+        retried with jittered exponential backoff, and a circuit breaker fails
+        fast while the API is down. The limiter and breaker are shared by all
+        downloaders by default (OMDB_LIMITER, OMDB_BREAKER).
+
+        In record mode every response is also appended to a recording file. In
+        replay mode the responses are answered from that file without network
+        access or an API key. The API URL, the mode and the recording file
+        default to the OMDB_API_URL, OMDB_MODE and OMDB_RECORDING environment
+        variables, so the whole application can be pointed at a local stand-in
+        server or a recording.
+
         Attributes:
             api_url (str): URL of the API endpoint for fetching movie information.
             api_key (str): The API key required for API requests.
+            mode (str | None): RECORD, REPLAY or None.
+            counts (Counter): Requests, retries, failures and short-circuited calls.
     """
-    def __init__(self, api_url: str = None) -> None:
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(self, api_url: str = None, api_key: str = None, mode: str = None,
+                 recording: str = None, *, limiter: RateLimiter = None,
+                 breaker: CircuitBreaker = None, retry: RetryPolicy = None,
+                 timeout=DEFAULT_TIMEOUT) -> None:
         """
             Initialize the MovieInfoDownloader with an API URL and key.
 
             Args:
                 api_url (str, optional): API URL for fetching movie information.
                                          Defaults to OMDb API.
+                api_key (str, optional): The API key. Defaults to API_KEY from the .env file.
+                mode (str, optional): RECORD or REPLAY.
+                recording (str, optional): The recording file for record and replay mode.
+                limiter (RateLimiter, optional): Request pacing. Defaults to OMDB_LIMITER.
+                breaker (CircuitBreaker, optional): Defaults to OMDB_BREAKER.
+                retry (RetryPolicy, optional): Retries of transient failures.
+                timeout (float | tuple, optional): Connect and read timeouts in seconds.
+
+            Raises:
+                ValueError: If the mode is unknown or has no recording file.
         """
-        self._api_url = api_url or "http://www.omdbapi.com/"
-        self._api_key = load_api_key()
+        load_dotenv()
+        self._api_url = api_url or os.getenv("OMDB_API_URL") or DEFAULT_API_URL
+        self.mode = mode or os.getenv("OMDB_MODE") or None
+        self._recording = recording or os.getenv("OMDB_RECORDING")
+        if self.mode not in (None, RECORD, REPLAY):
+            raise ValueError(f"Unknown downloader mode: {self.mode}")
+        if self.mode and not self._recording:
+            raise ValueError(f"The {self.mode} mode needs a recording file.")
+        self._responses = load_recording(self._recording) if self.mode == REPLAY else {}
+        self._record_lock = threading.Lock()
+        self._api_key = api_key or (None if self.mode == REPLAY else load_api_key())
+        self._limiter = limiter or OMDB_LIMITER
+        self._breaker = breaker or OMDB_BREAKER
+        self._retry = retry or RetryPolicy()
+        self._timeout = timeout
+        self.counts = Counter()
+        self._counts_lock = threading.Lock()
 
     def fetch_movie_data(self, title: str) -> dict:
         """
@@ -58,7 +203,80 @@ class MovieInfoDownloader:
             Raises:
                 APIError: If there is an issue with the request, response, or data processing.
         """
+        return self.parse_movie_data(self.request_movie_data(title), title)
+
+    def fetch_movie_by_id(self, imdb_id: str) -> dict:
+        """
+            Fetch detailed information about a movie by its IMDb ID.
+
+            Args:
+                imdb_id (str): IMDb ID of the movie, such as "tt0111161".
+
+            Returns:
+                dict: A dictionary keyed by the movie title with its details.
+
+            Raises:
+                APIError: If there is an issue with the request, response, or data processing.
+        """
+        return self.parse_movie_data(self.request_movie_data(imdb_id, by_id=True), imdb_id)
+
+    def request_movie_data(self, title: str, by_id: bool = False) -> dict:
+        """
+            Request the raw OMDb record for a movie title.
+
+            Args:
+                title (str): Title of the movie to search for.
+                by_id (bool, optional): Look the movie up by IMDb ID instead of title.
 
+            Returns:
+                dict: The decoded JSON response.
+
+            Raises:
+                APIError: If there is an issue with the request or the response body.
+        """
+        if self.mode == REPLAY:
+            try:
+                return self._responses[response_key(title, by_id)]
+            except KeyError:
+                raise APIError(f"No recorded response for: {title}") from None
+
+        retries = 0
+        while True:
+            if not self._breaker.allow():
+                self._count("short_circuited")
+                raise APIError(f"OMDb API unavailable, not retrying for "
+                               f"{self._breaker.retry_in():.0f} s", transient=True)
+            self._limiter.acquire()
+            self._count("requests")
+            try:
+                data = self._get(title, by_id)
+            except APIError as err:
+                if not err.transient:
+                    # The API answered; only the request was wrong
+                    self._breaker.record_success()
+                    raise
+                self._breaker.record_failure()
+                self._limiter.penalize(err.retry_after)
+                if retries + 1 >= self._retry.attempts:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._retry.backoff(retries, err.retry_after)
+                retries += 1
+                continue
+            self._breaker.record_success()
+            self._limiter.reward()
+            if self.mode == RECORD:
+                self.record(title, data, by_id)
+            return data
+
+    def _get(self, title: str, by_id: bool) -> dict:
+        """
+            Make a single OMDb request.
+
+            Raises:
+                APIError: If the request fails or the response is not JSON.
+        """
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
                           '(HTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36',
@@ -67,15 +285,76 @@ class MovieInfoDownloader:
 
         try:
             response = requests.get(
-                f"{self._api_url}?t={title}&apikey={self._api_key}",
+                f"{self._api_url}?{'i' if by_id else 't'}={title}&apikey={self._api_key}",
                 headers=headers,
-                timeout=10)
+                timeout=self._timeout)
             response.raise_for_status()
-            data = response.json()
+            return response.json()
+        except HTTPError as http_err:
+            response = http_err.response
+            raise APIError(
+                f"Request error occurred: {http_err}",
+                getattr(response, "status_code", None),
+                parse_retry_after(response.headers.get("Retry-After")) if response is not None
+                else None) from http_err
+        except (ConnectionError, Timeout) as req_err:
+            raise APIError(f"Request error occurred: {req_err}", transient=True) from req_err
+        except ValueError as json_err:
+            raise APIError(f"Error parsing JSON: {json_err}") from json_err
+        except RequestException as err:
+            raise APIError(f"Error fetching movie info: {err}") from err
+
+    def _count(self, name: str) -> None:
+        """
+            Increment one of the request counters.
+        """
+        with self._counts_lock:
+            self.counts[name] += 1
+
+    def counters(self) -> dict:
+        """
+            Report the request counters together with the limiter and breaker state.
+
+            Returns:
+                dict: The "downloader", "limiter" and "breaker" counters.
+        """
+        with self._counts_lock:
+            counts = dict(self.counts)
+        return {"downloader": counts, "limiter": self._limiter.counters(),
+                "breaker": self._breaker.counters()}
+
+    def record(self, title: str, data: dict, by_id: bool = False) -> None:
+        """
+            Append a response to the recording file.
+
+            Args:
+                title (str): The requested title or IMDb ID.
+                data (dict): The decoded response.
+                by_id (bool, optional): Whether the request was by IMDb ID.
+        """
+        line = json.dumps({"key": response_key(title, by_id), "response": data})
+        with self._record_lock, open(self._recording, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+    @staticmethod
+    def parse_movie_data(data: dict, title: str) -> dict:
+        """
+            Convert a raw OMDb record into the storage movie format.
+
+            Args:
+                data (dict): The decoded OMDb response.
+                title (str): The title that was requested, used in error messages.
 
-            if 'Title' not in data or 'imdbID' not in data:
-                raise APIError(f"Incomplete data received for movie: {title}")
+            Returns:
+                dict: A dictionary keyed by the movie title with its details.
 
+            Raises:
+                APIError: If the record is incomplete or its fields cannot be converted.
+        """
+        if 'Title' not in data or 'imdbID' not in data:
+            raise APIError(f"Incomplete data received for movie: {title}")
+
+        try:
             return {data.get('Title'): {
                     'Year': int(data.get('Year')),
                     'Rating': float(data.get('imdbRating')),
@@ -83,10 +362,85 @@ class MovieInfoDownloader:
                     'IMDB Link': f"https://www.imdb.com/title/{data.get('imdbID')}/",
                     'Notes': ""}
                     }
+        except (TypeError, ValueError) as parse_err:
+            raise APIError(f"Error parsing movie data: {parse_err}") from parse_err
 
-        except (HTTPError, ConnectionError, Timeout) as req_err:
-            raise APIError(f"Request error occurred: {req_err}") from req_err
-        except ValueError as json_err:
-            raise APIError(f"Error parsing JSON: {json_err}") from json_err
-        except RequestException as err:
-            raise APIError(f"Error fetching movie info: {err}") from err
+
+class AsyncMovieInfoDownloader:
+    """
+        An asyncio-aware front end for MovieInfoDownloader.
+
+        The blocking HTTP request runs in a thread pool while parsing happens on the
+        event loop, so several titles can be fetched at once and each one is saved
+        as soon as it arrives instead of after the whole batch.
+
+        Attributes:
+            downloader (MovieInfoDownloader): The blocking downloader doing the requests.
+    """
+    def __init__(self, downloader: MovieInfoDownloader = None,
+                 executor: ThreadPoolExecutor = None, max_concurrency: int = 8) -> None:
+        """
+            Initialize the async downloader.
+
+            Args:
+                downloader (MovieInfoDownloader, optional): Downloader used for the requests.
+                                                            Defaults to a new OMDb downloader.
+                executor (ThreadPoolExecutor, optional): Executor for the blocking requests.
+                                                         Defaults to the loop's executor.
+                max_concurrency (int, optional): Maximum number of requests in flight.
+                                                 Defaults to 8.
+        """
+        self.downloader = downloader or MovieInfoDownloader()
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+
+    async def fetch_movie_data(self, title: str) -> dict:
+        """
+            Fetch detailed information about a movie by its title without blocking the loop.
+
+            Args:
+                title (str): Title of the movie to search for.
+
+            Returns:
+                dict: A dictionary keyed by the movie title with its details.
+
+            Raises:
+                APIError: If there is an issue with the request, response, or data processing.
+        """
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self._executor,
+                                          self.downloader.request_movie_data, title)
+        return self.downloader.parse_movie_data(data, title)
+
+    async def import_movies(self, titles, storage: IAsyncStorage) -> tuple:
+        """
+            Fetch several titles concurrently and add each one to storage as it arrives.
+
+            Fetching, parsing and saving overlap: while one movie is being written,
+            the remaining requests are still in flight.
+
+            Args:
+                titles (iterable): Titles of the movies to add.
+                storage (IAsyncStorage): The storage to add the movies to.
+
+            Returns:
+                tuple: A list of added titles and a dict mapping failed titles to their errors.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def fetch(title):
+            async with semaphore:
+                try:
+                    return title, await self.fetch_movie_data(title)
+                except APIError as err:
+                    return title, err
+
+        added, failed = [], {}
+        for next_done in asyncio.as_completed([fetch(title) for title in titles]):
+            title, result = await next_done
+            if isinstance(result, APIError):
+                failed[title] = result
+                continue
+            await storage.add_movie(result)
+            added.extend(result)
+        return added, failed
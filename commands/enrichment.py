@@ -0,0 +1,270 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from commands.downloader import APIError, MovieInfoDownloader
+from commands.rate_limit import RateLimiter
+from storage.istorage import IStorage
+from storage.locking import atomic_write
+
+# Requests per second sent to OMDb by default
+DEFAULT_RATE = 5.0
+DEFAULT_WORKERS = 4
+BATCH_SIZE = 20
+# Fields taken over from OMDb; title and notes always stay as the user entered them
+REFRESHED_FIELDS = ("Rating", "Year", "Poster", "IMDB Link")
+# Seconds before a movie that OMDb could not complete, e.g. with no poster, is asked for again
+RETRY_AFTER = 7 * 24 * 3600
+
+
+def is_stale(details):
+    """
+        Checks whether a movie lacks metadata that OMDb can provide.
+
+        Args:
+            details (Mapping): The movie details.
+
+        Returns:
+            bool: True if the poster, rating, year or IMDb link is missing.
+    """
+    return details.get("Poster") in (None, "", "N/A") or any(
+        details.get(field) in (None, "") for field in ("Rating", "Year", "IMDB Link"))
+
+
+def find_stale(movies, refresh_all=False):
+    """
+        Lists the titles that need a refresh.
+
+        Args:
+            movies (Mapping): Movies keyed by title.
+            refresh_all (bool, optional): Refresh every movie, e.g. to update ratings.
+
+        Returns:
+            list: The titles, in storage order.
+    """
+    return [title for title, details in movies.items() if refresh_all or is_stale(details)]
+
+
+class EnrichmentWorker:  # pylint: disable=too-many-instance-attributes
+    """
+        Background worker that refreshes missing or stale movie metadata from OMDb.
+
+        The stale titles are fetched concurrently by a thread pool, with all
+        requests going through a shared rate limiter. Results are written in
+        batches, one storage commit each, and after every batch the refreshed
+        titles are recorded in a checkpoint file next to the catalog, so an
+        interrupted run continues where it stopped. Movies that are still
+        incomplete after a refresh, because OMDb has no poster for them for
+        example, are recorded there with the time of the attempt and skipped
+        by the next runs until RETRY_AFTER has passed. Once a run completes,
+        only those attempts are kept in the file.
+
+        Attributes:
+            refreshed (int): Movies refreshed in the current run.
+            failed (dict): Title -> error message of the movies that could not be fetched.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, movies_data: IStorage, downloader: MovieInfoDownloader = None,
+                 rate: float = DEFAULT_RATE, workers: int = DEFAULT_WORKERS,
+                 batch_size: int = BATCH_SIZE, checkpoint_path: str = None):
+        """
+            Initializes the worker.
+
+            Args:
+                movies_data (IStorage): The storage to refresh.
+                downloader (MovieInfoDownloader, optional): Downloader for the requests.
+                                                            Created on first use by default.
+                rate (float, optional): Requests per second. Defaults to DEFAULT_RATE.
+                workers (int, optional): Concurrent requests. Defaults to DEFAULT_WORKERS.
+                batch_size (int, optional): Refreshed movies per storage commit.
+                checkpoint_path (str, optional): Checkpoint file.
+                                                 Defaults to "<storage path>.enrich.json".
+        """
+        self.movies = movies_data
+        self._downloader = downloader
+        self._limiter = RateLimiter(rate, burst=workers)
+        self._workers = workers
+        self._batch_size = batch_size
+        self.checkpoint_path = checkpoint_path or f"{movies_data.path}.enrich.json"
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshed = 0
+        self.failed = {}
+
+    def load_checkpoint(self):
+        """
+            Returns the state of an interrupted run.
+
+            Returns:
+                dict: "refresh_all" and the "done" titles of an interrupted run, and the
+                      "attempted" titles with their fetch times. Empty if there is no
+                      usable checkpoint.
+        """
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+                checkpoint = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return checkpoint if isinstance(checkpoint, dict) else {}
+
+    def _save_checkpoint(self, done, refresh_all, attempted):
+        """
+            Records the refreshed titles so an interrupted run can be resumed.
+        """
+        checkpoint = {"refresh_all": refresh_all, "done": sorted(done), "attempted": attempted}
+        atomic_write(self.checkpoint_path, lambda file: json.dump(checkpoint, file))
+
+    def fetch_details(self, title, details):
+        """
+            Fetches fresh metadata for one movie, waiting for the rate limiter first.
+
+            The movie is looked up by its IMDb ID if it has one, by title otherwise.
+
+            Args:
+                title (str): The stored title.
+                details (Mapping): The stored details.
+
+            Returns:
+                dict: The refreshed fields.
+
+            Raises:
+                APIError: If the movie cannot be fetched.
+        """
+        self._limiter.acquire()
+        imdb_id = getattr(details, "imdb_id", None)
+        if imdb_id:
+            fetched = self._downloader.fetch_movie_by_id(imdb_id)
+        else:
+            fetched = self._downloader.fetch_movie_data(title)
+        fresh = next(iter(fetched.values()))
+        return {field: fresh[field] for field in REFRESHED_FIELDS
+                if fresh.get(field) not in (None, "")}
+
+    def run(self, refresh_all=False):  # pylint: disable=too-many-locals
+        """
+            Refreshes the stale movies in the calling thread until done or stopped.
+
+            A run that finds a checkpoint resumes it, including its refresh_all mode.
+            Recently attempted movies are skipped unless refresh_all is set.
+
+            Args:
+                refresh_all (bool, optional): Refresh every movie instead of only stale ones.
+
+            Returns:
+                bool: True if the run completed, False if it was stopped.
+        """
+        self._stop.clear()
+        self.refreshed, self.failed = 0, {}
+        if self._downloader is None:
+            self._downloader = MovieInfoDownloader()
+        checkpoint = self.load_checkpoint()
+        done = set(checkpoint.get("done", []))
+        refresh_all = refresh_all or checkpoint.get("refresh_all", False)
+        attempted = {title: fetched_at for title, fetched_at
+                     in checkpoint.get("attempted", {}).items()
+                     if time.time() - fetched_at < RETRY_AFTER}
+        movies = self.movies.get_movies()
+        pending = [title for title in find_stale(movies, refresh_all)
+                   if title not in done and (refresh_all or title not in attempted)]
+        batch = {}
+
+        def flush():
+            if batch:
+                self.movies.update_details(batch)
+                done.update(batch)
+                for title, fields in batch.items():
+                    if is_stale({**movies[title], **fields}):
+                        attempted[title] = time.time()
+                self.refreshed += len(batch)
+                batch.clear()
+                self._save_checkpoint(done, refresh_all, attempted)
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            titles = iter(pending)
+            running = {}
+            while not self._stop.is_set():
+                # Keep only a few requests queued so stop() takes effect quickly
+                while len(running) < self._workers * 2 and \
+                        (title := next(titles, None)) is not None:
+                    running[executor.submit(self.fetch_details, title, movies[title])] = title
+                if not running:
+                    break
+                finished, _ = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    title = running.pop(future)
+                    try:
+                        batch[title] = future.result()
+                    except APIError as err:
+                        self.failed[title] = str(err)
+                if len(batch) >= self._batch_size:
+                    flush()
+            for future in running:
+                future.cancel()
+        flush()
+
+        if self._stop.is_set():
+            return False
+        if attempted:
+            atomic_write(self.checkpoint_path,
+                         lambda file: json.dump({"attempted": attempted}, file))
+        elif os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return True
+
+    def start(self, refresh_all=False):
+        """
+            Starts the refresh in a background thread.
+
+            Args:
+                refresh_all (bool, optional): Refresh every movie instead of only stale ones.
+        """
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self.run, args=(refresh_all,),
+                                        name="movie-enrichment", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+            Asks the running refresh to finish its current batch and stop.
+        """
+        self._stop.set()
+
+    def join(self, timeout=None):
+        """
+            Waits for the background refresh to finish.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        """
+            Returns True while a background refresh is in progress.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh_metadata(self):
+        """
+            Menu command: starts a background refresh, or reports on and optionally
+            stops the one that is running.
+        """
+        if self.is_running():
+            print(f"Refresh in progress: {self.refreshed} movie(s) updated, "
+                  f"{len(self.failed)} failed.")
+            if input("Stop it? (Y/N) ").strip().lower() == "y":
+                self.stop()
+                self.join()
+                print("Refresh stopped; it will resume from here next time.")
+            return
+
+        if self.failed:
+            print("Last run could not refresh: " + ", ".join(sorted(self.failed)))
+        if "done" in self.load_checkpoint():
+            print("Resuming the interrupted refresh.")
+            self.start()
+        else:
+            answer = input("Refresh all movies instead of only incomplete ones? (Y/N) ")
+            self.start(answer.strip().lower() == "y")
+        print("Refreshing movie metadata in the background.")
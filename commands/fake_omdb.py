@@ -0,0 +1,194 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from commands.downloader import load_recording, response_key
+
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+LIMIT_REACHED = {"Response": "False", "Error": "Request limit reached!"}
+
+
+def synthetic_record(query: str, by_id: bool = False) -> dict:
+    """
+        Builds a plausible OMDb record for any title or IMDb ID.
+
+        The fields are derived from a hash of the query, so the same query always
+        gets the same record.
+
+        Args:
+            query (str): The requested title or IMDb ID.
+            by_id (bool, optional): Whether the query is an IMDb ID.
+
+        Returns:
+            dict: An OMDb-style record.
+    """
+    digest = int(hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest(), 16)
+    imdb_id = query.strip() if by_id else f"tt{digest % 10_000_000:07d}"
+    return {
+        "Title": f"Movie {imdb_id}" if by_id else query.strip(),
+        "Year": str(1920 + digest % 105),
+        "imdbRating": f"{1 + digest % 90 / 10:.1f}",
+        "imdbID": imdb_id,
+        "Poster": f"https://example.com/posters/{imdb_id}.jpg",
+        "Response": "True"
+    }
+
+
+class FakeOmdbServer(ThreadingHTTPServer):  # pylint: disable=too-many-instance-attributes
+    """
+        A local stand-in for the OMDb API for tests and load tests.
+
+        Answers the "t" (title) and "i" (IMDb ID) lookups of the real API from
+        recorded responses, as written by MovieInfoDownloader in record mode.
+        Queries without a recording get a synthetic record, or "Movie not found!"
+        if synthesizing is off. Every response is delayed by the configured
+        latency, and a share of the requests fails with 503 or is rejected with
+        429 and a Retry-After header, as the real API does over its quota.
+
+        Attributes:
+            url (str): The base URL to pass to MovieInfoDownloader.
+            counts (dict): Number of responses per HTTP status.
+    """
+
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, server_address=("127.0.0.1", 0), responses=None, *, latency=0.0,
+                 jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 synthesize=True, seed=None):
+        """
+            Binds the server.
+
+            Args:
+                server_address (tuple, optional): Host and port; port 0 picks a free one.
+                responses (dict, optional): Recorded responses keyed by response_key().
+                latency (float, optional): Seconds every response is delayed by.
+                jitter (float, optional): Up to this many seconds are added at random.
+                error_rate (float, optional): Share of requests answered with 503.
+                throttle_rate (float, optional): Share of requests answered with 429.
+                retry_after (int, optional): Seconds sent in the Retry-After header of a 429.
+                synthesize (bool, optional): Invent records for queries without a recording.
+                seed (int, optional): Seed for the random failures and jitter.
+        """
+        super().__init__(server_address, FakeOmdbHandler)
+        self.responses = responses or {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.synthesize = synthesize
+        self.counts = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        """The base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def draw(self):
+        """
+            Draws the delay and the outcome of one request.
+
+            Returns:
+                tuple: The delay in seconds and the HTTP status to fail with, or None.
+        """
+        with self._lock:
+            delay = self.latency + self._rng.random() * self.jitter
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return delay, HTTPStatus.TOO_MANY_REQUESTS
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, HTTPStatus.SERVICE_UNAVAILABLE
+        return delay, None
+
+    def lookup(self, query: str, by_id: bool) -> dict:
+        """
+            Returns the response body for a title or IMDb ID lookup.
+        """
+        recorded = self.responses.get(response_key(query, by_id))
+        if recorded is not None:
+            return recorded
+        return synthetic_record(query, by_id) if self.synthesize else NOT_FOUND
+
+    def count(self, status):
+        """
+            Counts a response by its status.
+        """
+        with self._lock:
+            self.counts[int(status)] = self.counts.get(int(status), 0) + 1
+
+
+class FakeOmdbHandler(BaseHTTPRequestHandler):
+    """
+        Serves OMDb lookups from the FakeOmdbServer.
+    """
+
+    server_version = "FakeOMDb/1.0"
+    server: FakeOmdbServer
+
+    # pylint: disable=invalid-name
+    def do_GET(self):
+        """Answers a title or IMDb ID lookup."""
+        params = parse_qs(urlsplit(self.path).query)
+        delay, failure = self.server.draw()
+        if delay:
+            time.sleep(delay)
+        if not params.get("apikey"):
+            self.send_json({"Response": "False", "Error": "No API key provided."},
+                           HTTPStatus.UNAUTHORIZED)
+        elif failure == HTTPStatus.TOO_MANY_REQUESTS:
+            self.send_json(LIMIT_REACHED, failure,
+                           {"Retry-After": str(self.server.retry_after)})
+        elif failure is not None:
+            self.send_json({"Response": "False", "Error": "Service unavailable"}, failure)
+        elif "i" in params:
+            self.send_json(self.server.lookup(params["i"][0], True))
+        elif "t" in params:
+            self.send_json(self.server.lookup(params["t"][0], False))
+        else:
+            self.send_json({"Response": "False", "Error": "Incorrect IMDb ID."})
+    # pylint: enable=invalid-name
+
+    def send_json(self, data, status=HTTPStatus.OK, headers=None):
+        """
+            Sends a JSON response and counts it.
+        """
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(status)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keeps the console quiet during load tests."""
+
+
+def start_fake_omdb(recording: str = None, **options) -> FakeOmdbServer:
+    """
+        Starts a fake OMDb server on a background thread.
+
+        Args:
+            recording (str, optional): A recording file written in record mode.
+            **options: Passed to FakeOmdbServer.
+
+        Returns:
+            FakeOmdbServer: The running server; call shutdown() and server_close()
+                            to stop it.
+    """
+    responses = load_recording(recording) if recording else None
+    server = FakeOmdbServer(responses=responses, **options)
+    threading.Thread(target=server.serve_forever, name="fake-omdb", daemon=True).start()
+    return server
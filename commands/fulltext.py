@@ -0,0 +1,426 @@
+import atexit
+import heapq
+import math
+import pickle
+import re
+import threading
+import unicodedata
+import weakref
+from bisect import bisect_left
+from functools import lru_cache
+from storage.istorage import apply_save
+from storage.locking import atomic_write
+from storage.movie import MovieCollection
+
+INDEX_FORMAT = 2
+# BM25 parameters: term frequency saturation and document length normalization
+K1 = 1.2
+B = 0.75
+# Title words count as often as this many words in the notes
+TITLE_BOOST = 2
+# Terms in more than this share of the movies only rank the matches of rarer terms
+COMMON_TERM_SHARE = 0.25
+TOKEN_PATTERN = re.compile(r"\w+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+# Suffixes stripped by the stemmer, longest first, with their replacement
+SUFFIXES = (("ational", "ate"), ("fulness", "ful"), ("iveness", "ive"), ("ization", "ize"),
+            ("ousness", "ous"), ("ingly", ""), ("ments", "ment"), ("sses", "ss"),
+            ("ness", ""), ("ing", ""), ("ies", "y"), ("ied", "y"), ("edly", ""),
+            ("ly", ""), ("ed", ""), ("es", ""), ("s", ""))
+MIN_STEM = 3
+# The open index of each storage object, which registers a single listener
+_INDEXES = weakref.WeakKeyDictionary()
+_INDEXES_LOCK = threading.Lock()
+
+
+def tokenize(text):
+    """
+        Splits text into lowercase words without accents.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list: The words in order.
+    """
+    if text.isascii():
+        return TOKEN_PATTERN.findall(text.lower())
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    plain = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(plain)
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """
+        Reduces a word to its stem with a small set of English suffix rules.
+
+        The rules are deliberately light: "running", "runs" and "run" share a
+        stem, as do "movies" and "movie" or "stories" and "story", but irregular
+        forms do not. A stem is never shorter than MIN_STEM.
+
+        Args:
+            word (str): A lowercase word.
+
+        Returns:
+            str: The stem.
+    """
+    if word.endswith("ss") or word.endswith("us") or word.endswith("is"):
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= MIN_STEM:
+            word = word[:len(word) - len(suffix)] + replacement
+            # A doubled final consonant is left over from "running" or "stopped"
+            if suffix in ("ing", "ed") and len(word) > MIN_STEM and word[-1] == word[-2] \
+                    and word[-1] not in "aeiouls":
+                word = word[:-1]
+            break
+    # Only some forms keep a final "e" or "y": "movie" and "movi(es)", "story" and "stori(es)"
+    if word.endswith("y"):
+        return word[:-1] + "i"
+    if word.endswith("e") and len(word) > MIN_STEM:
+        return word[:-1]
+    return word
+
+
+def analyze(text):
+    """
+        Turns text into the stemmed terms that are indexed and searched.
+    """
+    return [stem(word) for word in tokenize(text)]
+
+
+class FullTextIndex:  # pylint: disable=too-many-instance-attributes
+    """
+        Persistent inverted index over movie titles and notes with BM25 ranking.
+
+        Every term maps to a postings list of document -> positions. The positions
+        answer phrase queries and their count is the term frequency. Documents are
+        movies; the title is indexed before the notes and counts TITLE_BOOST times.
+        Each document also keeps the text it was indexed from, so only new or
+        changed movies are re-indexed when the index is synchronized with the
+        storage or told about a save. The index is kept as a pickle sidecar
+        next to the storage file ("<file>.fts").
+
+        Query syntax: plain words are ranked with BM25, "quoted words" must occur
+        as a phrase, and word* matches every term with that prefix.
+
+        Attributes:
+            path (str | None): The sidecar file, or None for an in-memory index.
+            version (int | None): The storage version the index reflects.
+    """
+
+    def __init__(self, path=None):
+        """
+            Initializes an empty index.
+
+            Args:
+                path (str, optional): Sidecar file for save().
+        """
+        self.path = path
+        self.version = None
+        self._postings = {}
+        self._doc_ids = {}
+        self._docs = []
+        self._free = []
+        self._total_length = 0
+        self._vocabulary = None
+        self._dirty = False
+
+    @classmethod
+    def open(cls, storage):
+        """
+            Returns the up-to-date index of a storage.
+
+            The first call for a storage object loads the index from its sidecar
+            and registers it as a listener of the storage; later calls return
+            the same index.
+
+            Args:
+                storage (IStorage): The storage to index.
+
+            Returns:
+                FullTextIndex: The index.
+        """
+        with _INDEXES_LOCK:
+            index = _INDEXES.get(storage)
+            if index is None:
+                index = cls(f"{storage.path}.fts")
+                index.load()
+                storage.add_listener(index.on_save)
+                # Saves only update the index in memory; it is written once on exit
+                atexit.register(index.save_if_changed)
+                _INDEXES[storage] = index
+            if index.version != storage.version():
+                index.sync(storage.get_movies(), storage.version())
+                index.save()
+        return index
+
+    def load(self):
+        """
+            Replaces the index with the one in its sidecar file, if that is readable.
+        """
+        path = self.path
+        try:
+            with open(path, "rb") as file:
+                state = pickle.load(file)
+            if state.get("format") == INDEX_FORMAT:
+                self.__dict__.update(state["index"])
+                self.path = path
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError,
+                KeyError, TypeError):
+            pass
+
+    def save(self):
+        """
+            Writes the index to its sidecar file, if it has one.
+        """
+        if self.path is None:
+            return
+        state = {key: value for key, value in self.__dict__.items()
+                 if key not in ("path", "_vocabulary", "_dirty")}
+        atomic_write(self.path, lambda file: pickle.dump(
+            {"format": INDEX_FORMAT, "index": state}, file, pickle.HIGHEST_PROTOCOL),
+                     mode="wb")
+        self._dirty = False
+
+    def save_if_changed(self):
+        """
+            Writes the index to its sidecar file if it changed since the last save.
+        """
+        if self._dirty:
+            self.save()
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def __contains__(self, title):
+        return title in self._doc_ids
+
+    @staticmethod
+    def _document_text(movie):
+        """
+            Returns the indexed text of a movie besides its title.
+        """
+        return movie.get("Notes") or ""
+
+    def update(self, title, movie):
+        """
+            Indexes a movie, replacing its previous entry if its text changed.
+
+            Args:
+                title (str): The movie title.
+                movie (Mapping): The movie details.
+
+            Returns:
+                bool: True if the index changed.
+        """
+        notes = self._document_text(movie)
+        doc_id = self._doc_ids.get(title)
+        if doc_id is not None:
+            if self._docs[doc_id][1] == notes:
+                return False
+            self.remove(title)
+
+        title_terms = analyze(title)
+        note_terms = analyze(notes)
+        length = len(title_terms) * TITLE_BOOST + len(note_terms)
+        # Each title copy and the notes start one position after the previous part,
+        # so a phrase cannot match across two parts
+        step = len(title_terms) + 1
+        positioned = [(copy * step + offset, term) for copy in range(TITLE_BOOST)
+                      for offset, term in enumerate(title_terms)]
+        positioned += [(TITLE_BOOST * step + offset, term)
+                       for offset, term in enumerate(note_terms)]
+        doc_id = self._free.pop() if self._free else len(self._docs)
+        if doc_id == len(self._docs):
+            self._docs.append(None)
+        self._docs[doc_id] = (title, notes, length)
+        self._doc_ids[title] = doc_id
+        self._total_length += length
+        for position, term in positioned:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary = None
+            postings.setdefault(doc_id, []).append(position)
+        return True
+
+    def remove(self, title):
+        """
+            Removes a movie from the index if present.
+
+            Args:
+                title (str): The movie title.
+
+            Returns:
+                bool: True if the index changed.
+        """
+        doc_id = self._doc_ids.pop(title, None)
+        if doc_id is None:
+            return False
+        _, notes, length = self._docs[doc_id]
+        for term in set(analyze(title) + analyze(notes)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary = None
+        self._docs[doc_id] = None
+        self._free.append(doc_id)
+        self._total_length -= length
+        return True
+
+    def sync(self, movies, version=None):
+        """
+            Brings the index in line with a full movie collection, re-indexing only
+            new and changed movies.
+
+            Args:
+                movies (Mapping): Movies keyed by title.
+                version (int, optional): The storage version of the movies.
+        """
+        movies = MovieCollection.wrap(movies)
+        for title in [title for title in self._doc_ids if title not in movies]:
+            self.remove(title)
+        for title, movie in movies.items():
+            self.update(title, movie)
+        self.version = version
+
+    def on_save(self, titles, movies, version):
+        """
+            Storage listener: re-indexes the movies touched by a save.
+        """
+        if titles is None or self.version is None or version != self.version + 1:
+            self.sync(movies, version)
+        else:
+            apply_save(titles, MovieCollection.wrap(movies), self.update, self.remove)
+            self.version = version
+        self._dirty = True
+
+    def _expand_prefix(self, prefix):
+        """
+            Returns the indexed terms starting with a prefix.
+        """
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _phrase_docs(self, terms):
+        """
+            Returns the documents containing the terms as consecutive words.
+        """
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return set()
+        # Start from the rarest term and check the others at their offsets
+        rarest = min(range(len(terms)), key=lambda index: len(postings[index]))
+        matches = set()
+        for doc_id, positions in postings[rarest].items():
+            for position in positions:
+                start = position - rarest
+                if all(start + offset in postings[offset].get(doc_id, ())
+                       for offset in range(len(terms)) if offset != rarest):
+                    matches.add(doc_id)
+                    break
+        return matches
+
+    def parse_query(self, query):
+        """
+            Splits a query into scored terms and phrase constraints.
+
+            Args:
+                query (str): The query.
+
+            Returns:
+                tuple: The terms to score (a list of term lists, one per query word,
+                       where a prefix contributes all its expansions) and the phrases
+                       (lists of terms) that results must contain.
+        """
+        scored, phrases = [], []
+        for phrase, word in QUERY_PATTERN.findall(query):
+            if phrase:
+                terms = analyze(phrase)
+                if terms:
+                    phrases.append(terms)
+                    scored.extend([term] for term in terms)
+            elif word.endswith("*") and tokenize(word):
+                prefix = "".join(tokenize(word))
+                # Stems drop a final "e" and end in "i" instead of "y", see stem()
+                if len(prefix) > MIN_STEM and prefix[-1] in "ey":
+                    prefix = prefix[:-1]
+                scored.append(self._expand_prefix(prefix))
+            else:
+                scored.extend([term] for term in analyze(word))
+        return scored, phrases
+
+    def search(self, query, limit=10):
+        """
+            Finds the movies best matching a query.
+
+            Args:
+                query (str): Words, "phrases" and prefix* terms.
+                limit (int, optional): Maximum number of results.
+
+            Returns:
+                list: (title, score) pairs, best first.
+        """
+        scored, phrases = self.parse_query(query)
+        if not self._doc_ids or not (scored or phrases):
+            return []
+        allowed = None
+        for terms in phrases:
+            docs = self._phrase_docs(terms)
+            allowed = docs if allowed is None else allowed & docs
+            if not allowed:
+                return []
+
+        count = len(self._doc_ids)
+        # Query words are scored rarest first; a prefix word counts all its expansions
+        groups = sorted(([self._postings.get(term, {}) for term in alternatives]
+                         for alternatives in scored),
+                        key=lambda group: sum(len(postings) for postings in group))
+        scores = {}
+        for group in groups:
+            candidates = allowed
+            if candidates is None and scores and \
+                    sum(len(postings) for postings in group) > COMMON_TERM_SHARE * count:
+                # A very common word adds little to the ranking; only score the movies
+                # the rarer words already found instead of walking its long postings
+                candidates = set(scores)
+            for postings in group:
+                self._score_term(postings, candidates, scores)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self._docs[doc_id][0], score) for doc_id, score in best]
+
+    def _score_term(self, postings, candidates, scores):
+        """
+            Adds the BM25 contribution of one term to the scores.
+
+            Args:
+                postings (dict): The term's postings, document -> positions.
+                candidates (Collection | None): The only documents to score, or None for all.
+                scores (dict): Document -> score, updated in place.
+        """
+        count = len(self._doc_ids)
+        average_length = self._total_length / count
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        if candidates is not None and len(candidates) < len(postings):
+            matches = ((doc_id, postings[doc_id]) for doc_id in candidates
+                       if doc_id in postings)
+        else:
+            matches = postings.items()
+        for doc_id, positions in matches:
+            if candidates is not None and doc_id not in candidates:
+                continue
+            frequency = len(positions)
+            norm = K1 * (1 - B + B * self._docs[doc_id][2] / average_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + \
+                idf * frequency * (K1 + 1) / (frequency + norm)
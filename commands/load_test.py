@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from commands.downloader import APIError, AsyncMovieInfoDownloader, MovieInfoDownloader
+from commands.fake_omdb import start_fake_omdb
+from commands.rate_limit import CircuitBreaker, RateLimiter, RetryPolicy
+from storage import init_async_storage
+
+DEFAULT_LOAD_RATE = 500.0
+
+
+def percentile(values, fraction):
+    """
+        Returns the value below which a fraction of the sorted values lies.
+
+        Args:
+            values (list): Sorted values.
+            fraction (float): Between 0 and 1.
+
+        Returns:
+            float | None: The value, or None if there are no values.
+    """
+    if not values:
+        return None
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class LoadReport:
+    """
+        Latency and throughput figures of a load test.
+
+        Attributes:
+            fetch_latencies (list): Seconds per successful OMDb lookup.
+            add_latencies (list): Seconds per successful add, lookup and save together.
+            failures (Counter): Failed adds by HTTP status, or "transient" for timeouts,
+                                connection errors and an open circuit.
+            counters (dict): The downloader's request, limiter and breaker counters.
+            elapsed (float): Wall-clock seconds of the whole run.
+    """
+
+    def __init__(self):
+        self.fetch_latencies = []
+        self.add_latencies = []
+        self.failures = Counter()
+        self.elapsed = 0.0
+        self.counters = {}
+
+    def success(self, fetch_latency, add_latency):
+        """
+            Records a movie that was fetched and saved.
+        """
+        self.fetch_latencies.append(fetch_latency)
+        self.add_latencies.append(add_latency)
+
+    def failure(self, error: APIError):
+        """
+            Records a movie that could not be fetched.
+        """
+        self.failures[error.status or ("transient" if error.transient else "error")] += 1
+
+    def summary(self) -> str:
+        """
+            Formats the figures for the console.
+
+            Returns:
+                str: A multi-line report.
+        """
+        added = len(self.add_latencies)
+        lines = [f"{added} movies added, {sum(self.failures.values())} failed "
+                 f"in {self.elapsed:.2f} s ({added / max(self.elapsed, 1e-9):.1f} adds/s)"]
+        for name, values in (("lookup", sorted(self.fetch_latencies)),
+                             ("add", sorted(self.add_latencies))):
+            if values:
+                lines.append(f"{name} latency ms: " + ", ".join(
+                    f"p{int(fraction * 100)} {percentile(values, fraction) * 1000:.1f}"
+                    for fraction in (0.5, 0.95, 0.99)) + f", max {values[-1] * 1000:.1f}")
+        for reason, count in self.failures.most_common():
+            lines.append(f"failed with {reason}: {count}")
+        for name, counts in self.counters.items():
+            lines.append(f"{name}: " + ", ".join(
+                f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+                for key, value in sorted(counts.items())))
+        return "\n".join(lines)
+
+
+async def drive_adds(titles, downloader: AsyncMovieInfoDownloader, storage,
+                     concurrency: int) -> LoadReport:
+    """
+        Adds movies concurrently, looking each up and saving it as it arrives.
+
+        This is the import path of the application: an OMDb lookup followed by
+        IStorage.add_movie, here with many adds in flight at once.
+
+        Args:
+            titles (iterable): Titles to add.
+            downloader (AsyncMovieInfoDownloader): Downloader for the lookups.
+            storage (IAsyncStorage): Storage the movies are added to.
+            concurrency (int): Maximum number of adds in flight.
+
+        Returns:
+            LoadReport: The measured figures.
+    """
+    report = LoadReport()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def add(title):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                movie = await downloader.fetch_movie_data(title)
+            except APIError as err:
+                report.failure(err)
+                return
+            fetched = time.perf_counter()
+            await storage.add_movie(movie)
+            report.success(fetched - start, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(add(title) for title in titles))
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def run_load_test(count=1000, concurrency=50, storage_path=None, recording=None, *,
+                  titles=None, rate=DEFAULT_LOAD_RATE, attempts=4, **server_options) -> tuple:
+    """
+        Runs a load test of the import path against a fake OMDb server.
+
+        Args:
+            count (int, optional): Number of movies to add.
+            concurrency (int, optional): Maximum number of adds in flight.
+            storage_path (str, optional): Data file to add to; a temporary JSON file
+                                          by default.
+            recording (str, optional): Recorded responses for the server to serve.
+            titles (list, optional): Titles to add; generated by default.
+            rate (float, optional): Requests per second the downloader starts out with.
+            attempts (int, optional): Tries per lookup, the first one included.
+            **server_options: Latency, error and throttle settings of FakeOmdbServer.
+
+        Returns:
+            tuple: The LoadReport and the server's response counts by status.
+    """
+    titles = titles or [f"Load Test Movie {index}" for index in range(count)]
+    server = start_fake_omdb(recording, **server_options)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load-test")
+    with tempfile.TemporaryDirectory() as directory:
+        storage = init_async_storage(storage_path or os.path.join(directory, "load.json"))
+        # A limiter and breaker of its own, so the run neither waits for nor trips
+        # the ones shared with the real API
+        downloader = MovieInfoDownloader(
+            api_url=server.url, api_key="load-test",
+            limiter=RateLimiter(rate, burst=concurrency), breaker=CircuitBreaker(),
+            retry=RetryPolicy(attempts, base_delay=0.1))
+        try:
+            report = asyncio.run(drive_adds(
+                titles, AsyncMovieInfoDownloader(downloader, executor, concurrency), storage,
+                concurrency))
+            report.counters = downloader.counters()
+        finally:
+            storage.close()
+            executor.shutdown(wait=True)
+            server.shutdown()
+            server.server_close()
+    return report, dict(server.counts)
+
+
+def parse_args(argv=None):
+    """
+        Parse the command line arguments of the load test.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load test adding movies through a local fake OMDb server")
+    parser.add_argument("--movies", type=int, default=1000, help="number of movies to add")
+    parser.add_argument("--concurrency", type=int, default=50, help="adds in flight")
+    parser.add_argument("--storage", help="data file to add to (default: a temporary file)")
+    parser.add_argument("--recording", help="recorded OMDb responses to serve")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency in s")
+    parser.add_argument("--jitter", type=float, default=0.05, help="random extra latency in s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="share of 429 responses")
+    parser.add_argument("--rate", type=float, default=DEFAULT_LOAD_RATE,
+                        help="requests per second the downloader starts out with")
+    parser.add_argument("--attempts", type=int, default=4, help="tries per lookup")
+    parser.add_argument("--seed", type=int, help="seed for repeatable runs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+        Run a load test from the command line and print its report.
+    """
+    args = parse_args(argv)
+    report, counts = run_load_test(
+        args.movies, args.concurrency, args.storage, args.recording, latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        seed=args.seed, rate=args.rate, attempts=args.attempts)
+    print(report.summary())
+    print("server responses: " + ", ".join(f"{status}: {count}"
+                                           for status, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
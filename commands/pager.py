@@ -0,0 +1,56 @@
+import shutil
+import sys
+
+# Lines gathered before each write when the output is not paged
+BATCH_LINES = 512
+MORE_PROMPT = "-- More -- (Enter: next page, q: quit) "
+
+
+def terminal_page_size():
+    """
+        Returns the number of lines that fit on the screen, if both the input and
+        the output are a terminal.
+
+        Returns:
+            int | None: Lines per page, or None if the output should not be paged.
+    """
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        return None
+    return max(shutil.get_terminal_size().lines - 2, 1)
+
+
+def page_lines(lines, page_size=None, out=None, ask=input) -> tuple:
+    """
+        Writes lines through a buffer, a page at a time if a page size is given.
+
+        Lines are joined into one write per batch or page instead of one write per
+        line. Lines are consumed only as they are written, so the first page
+        appears as soon as its lines are produced, and quitting stops the
+        producer.
+
+        Args:
+            lines (iterable): Lines, each ending with a newline.
+            page_size (int, optional): Lines per page; the output is not paged if None.
+            out (TextIO, optional): The output. Defaults to sys.stdout.
+            ask (callable, optional): Prompts for the next page; an answer starting
+                                      with "q" quits.
+
+        Returns:
+            tuple: The number of lines written and whether all lines were written.
+    """
+    out = sys.stdout if out is None else out
+    batch_size = page_size or BATCH_LINES
+    batch, written = [], 0
+    for line in lines:
+        if len(batch) == batch_size:
+            out.write("".join(batch))
+            written += len(batch)
+            batch.clear()
+            if page_size:
+                out.flush()
+                if ask(MORE_PROMPT).strip().lower().startswith("q"):
+                    return written, False
+        batch.append(line)
+    out.write("".join(batch))
+    out.flush()
+    return written + len(batch), True
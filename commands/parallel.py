@@ -0,0 +1,253 @@
+import difflib
+import heapq
+import multiprocessing
+import os
+import statistics
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from operator import itemgetter
+from storage.csv_reader import gc_paused
+
+# Catalogs smaller than this are processed in the calling process: starting the
+# workers and collecting their results would cost more than the work itself
+PARALLEL_THRESHOLD = 100_000
+# Fuzzy matching is far more expensive per title, so it pays off much earlier
+FUZZY_PARALLEL_THRESHOLD = 5_000
+
+# The shared items of the worker processes, set by _share()
+_ITEMS = None
+
+
+def default_workers():
+    """
+        Returns the number of worker processes to use by default: one per core.
+    """
+    return os.cpu_count() or 1
+
+
+def _share(items):
+    """
+        Worker initializer: keeps the items all chunks refer to.
+    """
+    global _ITEMS  # pylint: disable=global-statement
+    _ITEMS = items
+
+
+def _run_chunk(func, start, end, args):
+    """
+        Runs a chunk function on a range of the shared items.
+    """
+    return func(_ITEMS, start, end, *args)
+
+
+def worth_splitting(count, workers, min_size=None):
+    """
+        Decides whether a catalog is large enough to be split between processes.
+
+        Args:
+            count (int): Number of movies.
+            workers (int): Available worker processes.
+            min_size (int, optional): Smallest catalog worth splitting. Defaults to
+                                      PARALLEL_THRESHOLD.
+
+        Returns:
+            bool: True if the work should be done by worker processes.
+    """
+    if min_size is None:
+        min_size = PARALLEL_THRESHOLD
+    return workers > 1 and count >= max(min_size, 2)
+
+
+def start_context():
+    """
+        Returns the multiprocessing context the worker processes are started with.
+
+        Forking shares the items without copying them, but a process forked while
+        other threads run, such as the snapshot writer, the enrichment daemon or
+        the API server's workers, inherits the locks they hold and may deadlock.
+        Fork is therefore only used while the calling thread is the only one;
+        otherwise the workers come from a fork server where available.
+
+        Returns:
+            BaseContext | None: The context, or None for the platform default.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    if "forkserver" in methods:
+        return multiprocessing.get_context("forkserver")
+    return None
+
+
+def map_chunks(func, items, workers, *args):
+    """
+        Runs a function over contiguous chunks of a list in worker processes.
+
+        The list is handed to the workers once when they start, not per chunk.
+        Where processes are forked (see start_context) it is not copied at all:
+        the workers see the parent's memory, and only the chunk results are
+        pickled back. Elsewhere it is pickled once per worker.
+
+        Args:
+            func (callable): A module-level function called as
+                             func(items, start, end, *args) for each chunk.
+            items (list): The items to split.
+            workers (int): Number of processes.
+            *args: Further arguments for func.
+
+        Returns:
+            list: The results of the chunks, in list order.
+    """
+    workers = max(min(workers, len(items)), 1)
+    size = -(-len(items) // workers)
+    bounds = [(start, min(start + size, len(items))) for start in range(0, len(items), size)]
+    with ProcessPoolExecutor(max_workers=len(bounds), mp_context=start_context(),
+                             initializer=_share, initargs=(items,)) as executor:
+        futures = [executor.submit(_run_chunk, func, start, end, args)
+                   for start, end in bounds]
+        return [future.result() for future in futures]
+
+
+def _chunk_statistics(movies, start, end):
+    """
+        Computes the rating statistics of a chunk of movies, skipping unrated ones.
+
+        Returns:
+            tuple: The sorted ratings, their sum, the highest rating with the indices
+                   of its movies and the lowest rating with the indices of its movies,
+                   or None without ratings.
+    """
+    rated = [(index, float(movie.rating))
+             for index, movie in enumerate(movies[start:end], start) if movie.rating is not None]
+    if not rated:
+        return None
+    ratings = [rating for _, rating in rated]
+    highest, lowest = max(ratings), min(ratings)
+    best = [index for index, rating in rated if rating == highest]
+    worst = [index for index, rating in rated if rating == lowest]
+    total = sum(ratings)
+    ratings.sort()
+    return ratings, total, highest, best, lowest, worst
+
+
+def parallel_statistics(movies, workers):
+    """
+        Computes the statistics of Analytics.compute_statistics() in worker processes.
+
+        Every chunk yields its sorted ratings, their sum and its best and worst
+        movies. The sorted runs are merged for the exact median.
+
+        Args:
+            movies (MovieCollection): The movies.
+            workers (int): Number of processes.
+
+        Returns:
+            dict | None: The statistics, or None if there are no ratings.
+    """
+    with gc_paused():
+        titles, details = list(movies.keys()), list(movies.values())
+        results = [result for result in map_chunks(_chunk_statistics, details, workers)
+                   if result is not None]
+        if not results:
+            return None
+        # The runs are already sorted, which the sort in median() merges in linear time
+        median = statistics.median(chain.from_iterable(result[0] for result in results))
+    count = sum(len(result[0]) for result in results)
+    highest = max(result[2] for result in results)
+    lowest = min(result[4] for result in results)
+    return {
+        "average": sum(result[1] for result in results) / count,
+        "median": median,
+        "highest": highest,
+        "lowest": lowest,
+        "best": [titles[index] for result in results if result[2] == highest
+                 for index in result[3]],
+        "worst": [titles[index] for result in results if result[4] == lowest
+                  for index in result[5]]
+    }
+
+
+def _chunk_fuzzy_matches(titles, start, end, search_words):
+    """
+        Finds the titles of a chunk with a word close to each search word.
+
+        Returns:
+            list: One list of matching titles per search word.
+    """
+    split_titles = [(title, title.lower().split()) for title in titles[start:end]]
+    return [[title for title, words in split_titles
+             if difflib.get_close_matches(word, words, n=5, cutoff=0.6)]
+            for word in search_words]
+
+
+def parallel_fuzzy_matches(titles, search_words, workers):
+    """
+        Finds the titles close to any search word in worker processes.
+
+        Args:
+            titles (list): The titles to search.
+            search_words (list): Lowercase search words.
+            workers (int): Number of processes.
+
+        Returns:
+            list: Matching titles in the order of Analytics.search_titles(): by search
+                  word, then by title order, without duplicates.
+    """
+    results = map_chunks(_chunk_fuzzy_matches, titles, workers, search_words)
+    matched = {}
+    for position in range(len(search_words)):
+        for matches in results:
+            matched.update(dict.fromkeys(matches[position]))
+    return list(matched)
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def _chunk_top(items, start, end, sort_key, reverse_order, keep):
+    """
+        Selects the first rows of a chunk of (title, details) pairs in sorted order.
+
+        Returns:
+            tuple: (value, index) pairs of the first `keep` rows of the chunk with a
+                   value, ties in storage order, and the indices of up to `keep` rows
+                   without one.
+    """
+    keyed, missing = [], []
+    for index, (_, details) in enumerate(items[start:end], start):
+        value = details.get(sort_key)
+        if value is not None:
+            keyed.append((value, index))
+        elif len(missing) < keep:
+            missing.append(index)
+    select = heapq.nlargest if reverse_order else heapq.nsmallest
+    return select(keep, keyed, key=itemgetter(0)), missing
+
+
+def parallel_top_movies(items, sort_key, reverse_order, offset, limit, workers):
+    """
+        Selects a page of sorted movies as Analytics.top_movies() in worker processes.
+
+        Every chunk is reduced to its first offset + limit rows and the sorted
+        chunks are merged. Ties keep their storage order, and rows without a
+        value for the key come last.
+
+        Args:
+            items (Collection): (title, details) tuples.
+            sort_key (str): The key to sort movies by ('Rating' or 'Year').
+            reverse_order (bool): Whether to sort in descending order.
+            offset (int): Number of leading rows to skip.
+            limit (int): Maximum number of rows.
+            workers (int): Number of processes.
+
+        Returns:
+            list: The selected (title, details) tuples.
+    """
+    keep = offset + limit
+    with gc_paused():
+        items = list(items)
+        runs = map_chunks(_chunk_top, items, workers, sort_key, reverse_order, keep)
+    # heapq.merge takes from the earlier run first on ties, which keeps the order stable
+    merged = heapq.merge(*(run for run, _ in runs), key=itemgetter(0), reverse=reverse_order)
+    indices = chain((index for _, index in merged),
+                    chain.from_iterable(missing for _, missing in runs))
+    return [items[index] for index in islice(indices, offset, keep)]
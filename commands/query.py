@@ -0,0 +1,457 @@
+import re
+import numpy as np
+import pandas as pd
+from storage.movie import MovieCollection
+
+QUERY_HELP = """Query syntax:
+    rating >= 8 AND year BETWEEN 1990 AND 1999
+    title CONTAINS "godfather" OR title MATCHES "^the .* knight$"
+    HAS NOTES AND NOT HAS POSTER
+    year < 1980 ORDER BY rating DESC LIMIT 10
+Fields: rating, year (compare with =, !=, <, <=, >, >=, BETWEEN),
+title (CONTAINS, MATCHES), HAS NOTES, HAS POSTER. Combine with AND, OR, NOT and ()."""
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<op>>=|<=|!=|=|<|>|\(|\))
+      | (?P<word>[A-Za-z_]+)
+    )""", re.VERBOSE)
+NUMERIC_FIELDS = {"rating": "rating", "year": "year"}
+ORDER_FIELDS = {"rating": "rating", "year": "year", "title": "title"}
+COMPARISONS = {
+    "=": np.equal, "!=": np.not_equal, "<": np.less,
+    "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal
+}
+
+
+class QueryError(ValueError):
+    """Raised when a query cannot be parsed or executed."""
+
+
+class MovieFrame:
+    """
+        Column-oriented, typed view of a movie dictionary.
+
+        Every field lives in its own array, so a filter is evaluated for all
+        movies at once instead of converting each row in Python.
+
+        Attributes:
+            titles (ndarray): Movie titles, in storage order.
+            details (list): The original details of each movie, aligned with titles.
+            columns (DataFrame): Typed columns: title, rating, year, has_notes, has_poster.
+    """
+
+    def __init__(self, movies: dict):
+        """
+            Builds the columns from a dictionary of movies.
+
+            Args:
+                movies (dict): Movies keyed by title.
+        """
+        movies = MovieCollection.wrap(movies)
+        self.titles = np.array(list(movies.keys()), dtype=object)
+        self.details = list(movies.values())
+        self.columns = pd.DataFrame({
+            "title": pd.Series(self.titles, dtype=object),
+            "rating": pd.to_numeric(pd.Series([movie.rating for movie in self.details],
+                                              dtype=object), errors="coerce"),
+            "year": pd.to_numeric(pd.Series([movie.year for movie in self.details],
+                                            dtype=object), errors="coerce"),
+            "has_notes": np.array([bool(movie.notes) for movie in self.details], dtype=bool),
+            "has_poster": np.array([movie.poster not in (None, "", "N/A")
+                                    for movie in self.details], dtype=bool)
+        })
+
+        self._title_text = None
+        self._title_starts = None
+
+    def __len__(self):
+        return len(self.titles)
+
+    def find_titles(self, needle: str) -> np.ndarray:
+        """
+            Case-insensitive substring search over all titles.
+
+            The lowercased titles are joined into one newline separated string once,
+            so each search is a scan in C followed by a binary search from match
+            offsets back to row numbers.
+
+            Args:
+                needle (str): The substring to look for.
+
+            Returns:
+                ndarray: Boolean mask of the titles containing the substring.
+        """
+        if self._title_text is None:
+            lowered = [str(title).lower() for title in self.titles]
+            self._title_text = "\n".join(lowered)
+            lengths = np.fromiter((len(title) + 1 for title in lowered), dtype=np.int64,
+                                  count=len(lowered))
+            self._title_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        mask = np.zeros(len(self.titles), dtype=bool)
+        needle = needle.lower()
+        if "\n" in needle:
+            return mask
+        if not needle:
+            mask[:] = True
+            return mask
+        text, offsets = self._title_text, []
+        position = text.find(needle)
+        while position != -1:
+            offsets.append(position)
+            # Skip to the next title: one match per row is enough
+            row_end = text.find("\n", position)
+            if row_end == -1:
+                break
+            position = text.find(needle, row_end + 1)
+        mask[np.searchsorted(self._title_starts, offsets, side="right") - 1] = True
+        return mask
+
+    def rows(self, indices):
+        """
+            Yields the (title, details) tuples for the given row indices.
+        """
+        for index in indices:
+            yield self.titles[index], self.details[index]
+
+
+# The plan nodes only implement evaluate(); they are small by design
+# pylint: disable=too-few-public-methods
+class Predicate:
+    """
+        Base class of the compiled plan nodes. Each node evaluates to a boolean mask.
+    """
+
+    def evaluate(self, frame: MovieFrame) -> np.ndarray:
+        """
+            Evaluates the node for every movie at once.
+
+            Args:
+                frame (MovieFrame): The columns to evaluate against.
+
+            Returns:
+                ndarray: Boolean mask with one entry per movie.
+        """
+        raise NotImplementedError
+
+
+class Compare(Predicate):
+    """Compares a numeric column with a constant."""
+
+    def __init__(self, column, operator, value):
+        self.column, self.operator, self.value = column, operator, value
+
+    def evaluate(self, frame):
+        values = frame.columns[self.column].to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            return COMPARISONS[self.operator](values, self.value)
+
+
+class Between(Predicate):
+    """Checks that a numeric column lies in an inclusive range."""
+
+    def __init__(self, column, low, high):
+        self.column, self.low, self.high = column, low, high
+
+    def evaluate(self, frame):
+        values = frame.columns[self.column].to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            return (values >= self.low) & (values <= self.high)
+
+
+class TitleSearch(Predicate):
+    """Case-insensitive substring or regular expression match on titles."""
+
+    def __init__(self, pattern, regex):
+        if regex:
+            try:
+                re.compile(pattern)
+            except re.error as err:
+                raise QueryError(f"Invalid regular expression {pattern!r}: {err}") from err
+        self.pattern, self.regex = pattern, regex
+
+    def evaluate(self, frame):
+        if not self.regex:
+            return frame.find_titles(self.pattern)
+        titles = frame.columns["title"].astype(str).str
+        return titles.contains(self.pattern, case=False, regex=True).to_numpy(dtype=bool)
+
+
+class Has(Predicate):
+    """Checks a boolean column such as has_notes."""
+
+    def __init__(self, column):
+        self.column = column
+
+    def evaluate(self, frame):
+        return frame.columns[self.column].to_numpy(dtype=bool)
+
+
+class Not(Predicate):
+    """Negates a predicate."""
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def evaluate(self, frame):
+        return ~self.operand.evaluate(frame)
+
+
+class And(Predicate):
+    """Combines predicates that must all hold."""
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def evaluate(self, frame):
+        mask = self.operands[0].evaluate(frame)
+        for operand in self.operands[1:]:
+            mask = mask & operand.evaluate(frame)
+        return mask
+
+
+class Or(Predicate):
+    """Combines predicates of which at least one must hold."""
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def evaluate(self, frame):
+        mask = self.operands[0].evaluate(frame)
+        for operand in self.operands[1:]:
+            mask = mask | operand.evaluate(frame)
+        return mask
+
+
+class Query:
+    """
+        A compiled movie query: an optional predicate plan, ordering and limit.
+
+        Attributes:
+            predicate (Predicate | None): The filter plan, or None to keep every movie.
+            order_by (str | None): Column to order the results by.
+            descending (bool): Whether the ordering is descending.
+            limit (int | None): Maximum number of results.
+    """
+
+    def __init__(self, predicate=None, order_by=None, descending=False, limit=None):
+        self.predicate = predicate
+        self.order_by = order_by
+        self.descending = descending
+        self.limit = limit
+
+    @classmethod
+    def compile(cls, text: str) -> "Query":
+        """
+            Parses a query string into an executable plan.
+
+            Args:
+                text (str): The query, see QUERY_HELP.
+
+            Returns:
+                Query: The compiled query.
+
+            Raises:
+                QueryError: If the query is malformed.
+        """
+        return _Parser(text).parse()
+
+    def execute(self, frame: MovieFrame) -> np.ndarray:
+        """
+            Runs the query over a movie frame.
+
+            Args:
+                frame (MovieFrame): The columns to query.
+
+            Returns:
+                ndarray: Indices of the matching rows, ordered and limited.
+        """
+        if self.predicate is None:
+            indices = np.arange(len(frame))
+        else:
+            indices = np.flatnonzero(self.predicate.evaluate(frame))
+
+        if self.order_by is None:
+            return indices if self.limit is None else indices[:self.limit]
+
+        keys = frame.columns[self.order_by].to_numpy()[indices]
+        if self.order_by == "title":
+            # Rank the titles so they sort like numbers in both directions
+            _, keys = np.unique([str(key).lower() for key in keys], return_inverse=True)
+        keys = keys.astype(float)
+        # Negating keeps ties in frame order and unknown (NaN) keys last when descending
+        ranking = -keys if self.descending else keys
+        if self.limit is not None and self.limit < len(indices):
+            # Select the top rows first so only the limited part is fully sorted;
+            # rows tied with the last selected key are kept in frame order
+            last = np.partition(ranking, self.limit - 1)[self.limit - 1]
+            if not np.isnan(last):
+                candidates = np.flatnonzero(ranking <= last)
+                ranking, indices = ranking[candidates], indices[candidates]
+        order = np.argsort(ranking, kind="stable")
+        return indices[order][:self.limit]
+
+    def run(self, movies: dict, frame: MovieFrame = None) -> list:
+        """
+            Convenience wrapper that executes the query over a movie dictionary.
+
+            Args:
+                movies (dict): Movies keyed by title. Ignored if a frame is given.
+                frame (MovieFrame, optional): A prebuilt frame for these movies.
+
+            Returns:
+                list: (title, details) tuples of the results.
+        """
+        if frame is None:
+            frame = MovieFrame(movies)
+        return list(frame.rows(self.execute(frame)))
+
+
+class _Parser:
+    """
+        Recursive descent parser for the query language.
+    """
+
+    def __init__(self, text):
+        self.tokens = self.tokenize(text)
+        self.position = 0
+
+    @staticmethod
+    def tokenize(text):
+        """
+            Splits a query into (kind, value) tokens.
+        """
+        tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN_PATTERN.match(text, position)
+            if not match:
+                raise QueryError(f"Unexpected character at position {position}: "
+                                 f"{text[position:position + 10]!r}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            elif kind == "number":
+                value = float(value)
+            elif kind == "word":
+                value = value.lower()
+            tokens.append((kind, value))
+            position = match.end()
+        return tokens
+
+    def peek(self, value=None):
+        """
+            Returns the current token, or whether it equals the given word or operator.
+        """
+        token = self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+        if value is None:
+            return token
+        return token[0] in ("word", "op") and token[1] == value
+
+    def advance(self):
+        """
+            Consumes and returns the current token.
+        """
+        token = self.peek()
+        if token[0] is None:
+            raise QueryError("Unexpected end of query.")
+        self.position += 1
+        return token
+
+    def expect(self, kind, value=None):
+        """
+            Consumes a token of the given kind (and value), or raises QueryError.
+        """
+        token_kind, token_value = self.advance()
+        if token_kind != kind or (value is not None and token_value != value):
+            raise QueryError(f"Expected {value or kind}, got {token_value!r}.")
+        return token_value
+
+    def parse(self):
+        """
+            Parses the whole query.
+        """
+        predicate = None
+        if self.peek()[0] is not None and not self.peek("order") and not self.peek("limit"):
+            predicate = self.parse_or()
+        query = Query(predicate)
+        if self.peek("order"):
+            self.advance()
+            self.expect("word", "by")
+            field = self.expect("word")
+            if field not in ORDER_FIELDS:
+                raise QueryError(f"Cannot order by {field!r}.")
+            query.order_by = ORDER_FIELDS[field]
+            if self.peek("asc") or self.peek("desc"):
+                query.descending = self.advance()[1] == "desc"
+        if self.peek("limit"):
+            self.advance()
+            limit = self.expect("number")
+            if limit < 0 or limit != int(limit):
+                raise QueryError("LIMIT must be a non-negative integer.")
+            query.limit = int(limit)
+        if self.peek()[0] is not None:
+            raise QueryError(f"Unexpected {self.peek()[1]!r}.")
+        return query
+
+    def parse_or(self):
+        """
+            expr := term (OR term)*
+        """
+        operands = [self.parse_and()]
+        while self.peek("or"):
+            self.advance()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def parse_and(self):
+        """
+            term := factor (AND factor)*
+        """
+        operands = [self.parse_factor()]
+        while self.peek("and"):
+            self.advance()
+            operands.append(self.parse_factor())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def parse_factor(self):
+        """
+            factor := NOT factor | ( expr ) | predicate
+        """
+        if self.peek("not"):
+            self.advance()
+            return Not(self.parse_factor())
+        if self.peek("("):
+            self.advance()
+            predicate = self.parse_or()
+            self.expect("op", ")")
+            return predicate
+        if self.peek("has"):
+            self.advance()
+            field = self.expect("word")
+            if field not in ("notes", "poster"):
+                raise QueryError(f"Unknown HAS field {field!r}.")
+            return Has(f"has_{field}")
+        field = self.expect("word")
+        if field in NUMERIC_FIELDS:
+            column = NUMERIC_FIELDS[field]
+            if self.peek("between"):
+                self.advance()
+                low = self.expect("number")
+                self.expect("word", "and")
+                return Between(column, low, self.expect("number"))
+            operator = self.expect("op")
+            if operator not in COMPARISONS:
+                raise QueryError(f"Unknown comparison {operator!r}.")
+            return Compare(column, operator, self.expect("number"))
+        if field == "title":
+            operation = self.expect("word")
+            if operation not in ("contains", "matches"):
+                raise QueryError("Expected CONTAINS or MATCHES after title.")
+            return TitleSearch(self.expect("string"), regex=operation == "matches")
+        raise QueryError(f"Unknown field {field!r}.")
@@ -0,0 +1,261 @@
+import random
+import threading
+import time
+
+# Multiplicative decrease of the rate after a throttled or failed call
+DECREASE_FACTOR = 0.5
+# Additive increase after a successful call, as a share of the configured rate
+INCREASE_SHARE = 0.05
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class RateLimiter:  # pylint: disable=too-many-instance-attributes
+    """
+        Thread-safe token bucket limiting how often a shared resource is called.
+
+        Tokens are added continuously at `rate` per second up to `burst`; every
+        call to acquire() takes one, sleeping until one is available.
+
+        The rate adapts to the resource: penalize() halves it after a throttled
+        or failed call and can pause all calls for a Retry-After period, and
+        reward() raises it again step by step after successful calls, up to the
+        configured rate (additive increase, multiplicative decrease).
+
+        Attributes:
+            rate (float): Current sustained calls per second.
+            max_rate (float): The configured rate, which the rate recovers to.
+            min_rate (float): The rate never drops below this.
+            burst (int): Maximum number of calls that may happen back to back.
+            acquired (int): Number of calls let through.
+            throttled (int): Number of penalize() calls.
+            waited (float): Total seconds callers spent waiting.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep,
+                 min_rate: float = None):
+        """
+            Initializes the limiter with a full bucket.
+
+            Args:
+                rate (float): Sustained calls per second.
+                burst (int, optional): Bucket size. Defaults to 1.
+                clock (callable, optional): Monotonic time source, replaceable in tests.
+                sleep (callable, optional): Sleep function, replaceable in tests.
+                min_rate (float, optional): Lowest adapted rate. Defaults to rate / 20.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = self.max_rate = rate
+        self.min_rate = min_rate or rate / 20
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = None
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        """
+            Adds the tokens earned since the last refill. Called with the lock held.
+        """
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+            Blocks until a call is allowed and takes a token for it.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                if self._paused_until is not None and now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.acquired += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                self.waited += wait
+            self._sleep(wait)
+
+    def penalize(self, retry_after: float = None):
+        """
+            Slows down after a throttled or failed call.
+
+            Args:
+                retry_after (float, optional): Seconds no call may be made, as sent
+                                               in a Retry-After header.
+        """
+        with self._lock:
+            self._refill()
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            if retry_after:
+                self._tokens = 0.0
+                self._paused_until = max(self._paused_until or 0.0,
+                                         self._clock() + retry_after)
+
+    def reward(self):
+        """
+            Speeds up again after a successful call.
+        """
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE_SHARE)
+
+    def counters(self) -> dict:
+        """
+            Returns the limiter's counters and current rate.
+        """
+        with self._lock:
+            return {"rate": self.rate, "acquired": self.acquired, "throttled": self.throttled,
+                    "waited": self.waited}
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+        Fails fast while a resource is down instead of waiting for every call to time out.
+
+        After `threshold` consecutive failures the circuit opens and allow()
+        refuses calls. After `reset_timeout` seconds it lets a single trial call
+        through (half-open). A success closes the circuit again; a failure opens
+        it for another period.
+
+        Attributes:
+            state (str): CLOSED, OPEN or HALF_OPEN.
+            opened (int): How often the circuit opened.
+            rejected (int): Calls refused while it was open.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        """
+            Initializes a closed circuit.
+
+            Args:
+                threshold (int, optional): Consecutive failures that open the circuit.
+                reset_timeout (float, optional): Seconds before a trial call is allowed.
+                clock (callable, optional): Monotonic time source, replaceable in tests.
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.state = CLOSED
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """
+            Decides whether a call may be made now.
+
+            Returns:
+                bool: False while the circuit is open.
+        """
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state, self._trial = HALF_OPEN, False
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._trial):
+                self._trial = self.state == HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        """
+            Returns the seconds until the open circuit allows a trial call.
+        """
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(self.reset_timeout - (self._clock() - self._opened_at), 0.0)
+
+    def record_success(self):
+        """
+            Records a successful call, closing the circuit.
+        """
+        with self._lock:
+            self._failures = 0
+            self.state = CLOSED
+
+    def record_failure(self):
+        """
+            Records a failed call, opening the circuit after too many of them.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state, self._opened_at = OPEN, self._clock()
+
+    def counters(self) -> dict:
+        """
+            Returns the breaker's state and counters.
+        """
+        with self._lock:
+            return {"state": self.state, "opened": self.opened, "rejected": self.rejected}
+
+
+class RetryPolicy:
+    """
+        Exponential backoff with full jitter.
+
+        The n-th retry waits a random time between zero and base_delay * 2**n,
+        capped at max_delay, so clients that failed together do not retry
+        together. A Retry-After from the server is a lower bound.
+
+        Attributes:
+            attempts (int): Calls made at most, the first one included.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 rng=random, sleep=time.sleep):
+        """
+            Initializes the policy.
+
+            Args:
+                attempts (int, optional): Calls made at most, the first one included.
+                base_delay (float, optional): Upper bound of the first backoff in seconds.
+                max_delay (float, optional): Upper bound of any backoff in seconds.
+                rng (random.Random, optional): Random source for the jitter.
+                sleep (callable, optional): Sleep function, replaceable in tests.
+        """
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+        self._sleep = sleep
+
+    def delay(self, retry: int, retry_after: float = None) -> float:
+        """
+            Returns the backoff before a retry.
+
+            Args:
+                retry (int): 0 for the first retry, 1 for the second, ...
+                retry_after (float, optional): Seconds the server asked to wait.
+
+            Returns:
+                float: Seconds to wait.
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** retry)
+        return max(self._rng.uniform(0, ceiling), retry_after or 0.0)
+
+    def backoff(self, retry: int, retry_after: float = None):
+        """
+            Sleeps before a retry.
+        """
+        self._sleep(self.delay(retry, retry_after))
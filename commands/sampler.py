@@ -0,0 +1,214 @@
+import datetime
+import random
+from collections import deque
+from storage.istorage import apply_save
+from storage.movie import MovieCollection
+
+HISTORY_SIZE = 10
+# Rejection sampling gives up after this many draws and scans the catalog instead
+MAX_DRAWS = 64
+# Added to every rating weight so that unrated and 0-rated movies can still be picked
+BASE_WEIGHT = 0.5
+WEIGHTS = ("uniform", "rating", "recency")
+
+
+class MovieSampler:  # pylint: disable=too-many-instance-attributes
+    """
+        Picks random movies, optionally weighted and filtered, without repeating
+        recent suggestions.
+
+        The movies are kept in flat arrays with a title -> position index, so a
+        movie is added, changed or removed in O(1), with removal swapping the last
+        movie into the gap. A pick draws a uniform position and accepts it with
+        probability weight / maximum weight (rejection sampling). That needs no
+        cumulative weights or alias table that would have to be rebuilt on every
+        change, and costs a few draws on average because the weights are bounded.
+        Filters and the exclusion of recent picks are applied as further
+        rejections. If that keeps failing because few movies qualify, the pick
+        falls back to a scan of the qualifying movies.
+
+        Attributes:
+            recent (deque): The last picked titles, which are not suggested again.
+            version (int | None): The storage version the sampler reflects.
+    """
+
+    def __init__(self, history=HISTORY_SIZE, rng=random):
+        """
+            Initializes an empty sampler.
+
+            Args:
+                history (int, optional): Number of recent picks to exclude.
+                rng (random.Random, optional): Random source.
+        """
+        self._titles = []
+        self._ratings = []
+        self._years = []
+        self._positions = {}
+        # Upper bound of the ratings; removing the top movie leaves it high, which only
+        # costs a few more draws
+        self._max_rating = 0.0
+        self._rng = rng
+        self.recent = deque(maxlen=history)
+        self.version = None
+
+    def __len__(self):
+        return len(self._titles)
+
+    def rating(self, title):
+        """
+            Returns the rating of a sampled movie, None if it has none.
+
+            Raises:
+                KeyError: If the movie is not in the sampler.
+        """
+        return self._ratings[self._positions[title]]
+
+    def rebuild(self, movies, version=None):
+        """
+            Replaces the sampled movies.
+
+            Args:
+                movies (Mapping): Movies keyed by title.
+                version (int, optional): The storage version of the movies.
+        """
+        self._titles, self._ratings, self._years, self._positions = [], [], [], {}
+        self._max_rating = 0.0
+        for title, movie in MovieCollection.wrap(movies).items():
+            self.add(title, movie)
+        self.version = version
+
+    def add(self, title, movie):
+        """
+            Adds a movie, or updates it if the title is already present.
+
+            Args:
+                title (str): The movie title.
+                movie (Movie): The movie record.
+        """
+        rating = float(movie.rating) if movie.rating is not None else None
+        if rating is not None:
+            self._max_rating = max(self._max_rating, rating)
+        position = self._positions.get(title)
+        if position is None:
+            self._positions[title] = len(self._titles)
+            self._titles.append(title)
+            self._ratings.append(rating)
+            self._years.append(movie.year)
+        else:
+            self._ratings[position] = rating
+            self._years[position] = movie.year
+
+    def remove(self, title):
+        """
+            Removes a movie if present.
+
+            Args:
+                title (str): The movie title.
+        """
+        position = self._positions.pop(title, None)
+        if position is None:
+            return
+        last = len(self._titles) - 1
+        if position != last:
+            self._titles[position] = self._titles[last]
+            self._ratings[position] = self._ratings[last]
+            self._years[position] = self._years[last]
+            self._positions[self._titles[position]] = position
+        self._titles.pop()
+        self._ratings.pop()
+        self._years.pop()
+
+    def on_save(self, titles, movies, version):
+        """
+            Storage listener: applies a save to the sampler.
+
+            Only the touched titles are updated, unless the save replaced the whole
+            collection or saves by other processes were missed, in which case the
+            sampler is rebuilt.
+
+            Args:
+                titles (list | None): The titles the save touched, None for all.
+                movies (Mapping): The saved movies.
+                version (int): The new storage version.
+        """
+        if titles is None or self.version is None or version != self.version + 1:
+            self.rebuild(movies, version)
+            return
+        apply_save(titles, MovieCollection.wrap(movies), self.add, self.remove)
+        self.version = version
+
+    def _weight(self, position, weight_by, this_year):
+        """
+            Returns the weight of a movie and the largest possible weight.
+        """
+        if weight_by == "rating":
+            # Unrated movies weigh as much as 0-rated ones
+            rating = self._ratings[position] or 0.0
+            return rating + BASE_WEIGHT, self._max_rating + BASE_WEIGHT
+        if weight_by == "recency":
+            year = self._years[position]
+            age = max(this_year - year, 0) if year is not None else 100
+            return 1 / (1 + age / 10), 1.0
+        return 1.0, 1.0
+
+    def _matches(self, position, min_rating, start_year, end_year):
+        """
+            Checks a movie against the pick's constraints.
+        """
+        rating = self._ratings[position]
+        if min_rating is not None and (rating is None or rating < min_rating):
+            return False
+        year = self._years[position]
+        if start_year is not None and (year is None or year < start_year):
+            return False
+        if end_year is not None and (year is None or year > end_year):
+            return False
+        return True
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def pick(self, weight_by="uniform", min_rating=None, start_year=None, end_year=None):
+        """
+            Picks a random movie that was not among the recent picks.
+
+            Args:
+                weight_by (str, optional): "uniform", "rating" (higher rated movies are
+                                           picked more often) or "recency" (newer movies
+                                           are picked more often).
+                min_rating (float, optional): Lowest rating to consider.
+                start_year (int, optional): Earliest release year to consider.
+                end_year (int, optional): Latest release year to consider.
+
+            Returns:
+                str | None: The picked title, or None if no movie matches. If all matching
+                            movies were picked recently, one of them is repeated.
+        """
+        if weight_by not in WEIGHTS:
+            raise ValueError(f"Unknown weighting: {weight_by}")
+        if not self._titles:
+            return None
+        this_year = datetime.date.today().year
+        recent = set(self.recent)
+        for _ in range(MAX_DRAWS):
+            position = self._rng.randrange(len(self._titles))
+            weight, max_weight = self._weight(position, weight_by, this_year)
+            if self._rng.random() * max_weight < weight and \
+                    self._titles[position] not in recent and \
+                    self._matches(position, min_rating, start_year, end_year):
+                return self._remember(self._titles[position])
+
+        candidates = [position for position in range(len(self._titles))
+                      if self._matches(position, min_rating, start_year, end_year)]
+        if not candidates:
+            return None
+        fresh = [position for position in candidates if self._titles[position] not in recent]
+        candidates = fresh or candidates
+        weights = [self._weight(position, weight_by, this_year)[0] for position in candidates]
+        position = self._rng.choices(candidates, weights)[0]
+        return self._remember(self._titles[position])
+
+    def _remember(self, title):
+        """
+            Adds a pick to the exclusion history and returns it.
+        """
+        self.recent.append(title)
+        return title
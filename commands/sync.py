@@ -0,0 +1,571 @@
+import hashlib
+import json
+import os
+import pickle
+import socket
+import socketserver
+import threading
+import time
+import weakref
+import zlib
+from collections import defaultdict
+from contextlib import suppress
+from storage import init_storage
+from storage.istorage import IStorage, apply_save
+from storage.locking import atomic_write
+from storage.movie import Movie
+
+HEX = "0123456789abcdef"
+# Levels of the hash tree below the root; each node has 16 children, so the
+# leaves are 16 ** DEPTH buckets of titles
+DEPTH = 4
+DIGEST_SIZE = 16
+TREE_FORMAT = 1
+# The open tree of each storage object, which registers a single listener
+_TREES = weakref.WeakKeyDictionary()
+_TREES_LOCK = threading.Lock()
+
+
+def record_fields(movie) -> dict:
+    """
+        Returns the fields of a record in the form both backends agree on.
+
+        Empty fields are left out, because CSV files store a missing poster as
+        an empty cell and JSON files leave it out, and ratings are floats.
+
+        Args:
+            movie (Mapping): The movie details.
+
+        Returns:
+            dict: Storage field name -> value.
+    """
+    fields = {key: value for key, value in movie.items() if value != "" and value is not None}
+    if isinstance(fields.get("Rating"), int):
+        fields["Rating"] = float(fields["Rating"])
+    return fields
+
+
+def record_hash(title: str, movie: Movie) -> str:
+    """
+        Hashes a record, title included.
+
+        Records that record_fields() gives the same fields get the same hash.
+        The fields are read from the record's attributes rather than through
+        its mapping interface, which makes hashing a large catalog several
+        times faster.
+
+        Args:
+            title (str): The movie title.
+            movie (Movie): The record.
+
+        Returns:
+            str: The hex digest.
+    """
+    rating = movie.rating
+    if isinstance(rating, int):
+        rating = float(rating)
+    extra = movie.extra
+    if extra:
+        extra = tuple(sorted((key, value) for key, value in extra.items()
+                             if value != "" and value is not None)) or None
+    text = repr((title, movie.year, rating, movie.poster or None, movie.imdb_link or None,
+                 movie.notes or None, extra))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def bucket_of(title: str) -> str:
+    """
+        Returns the leaf bucket of a title: DEPTH hex digits of its CRC-32.
+    """
+    return f"{zlib.crc32(title.encode('utf-8')) & 0xffffffff:08x}"[-DEPTH:]
+
+
+class MerkleTree:
+    """
+        Hash tree over the records of a catalog.
+
+        Titles are spread over 16 ** DEPTH leaf buckets by a hash of the title,
+        so the same movie lands in the same bucket on every machine. A bucket's
+        digest covers the titles and record hashes in it, and every inner
+        node's digest covers those of its 16 children. Two catalogs are equal
+        if their root digests are; otherwise only the subtrees whose digests
+        differ have to be compared.
+
+        Nodes are named by their path from the root: "" is the root, "a" its
+        eleventh child and "a3f0" a leaf bucket. Empty subtrees have no digest.
+
+        The tree is kept next to the storage file ("<file>.sync") and updated
+        with every save, so only a save by another program makes it rehash the
+        whole catalog.
+
+        Attributes:
+            version (int | None): The storage version the tree reflects.
+    """
+
+    def __init__(self, items=(), path=None):
+        """
+            Hashes the records and builds the tree.
+
+            Args:
+                items (iterable, optional): (title, details) pairs.
+                path (str, optional): Sidecar file for save().
+        """
+        self.path = path
+        self.version = None
+        self._rebuild(items)
+
+    def _rebuild(self, items):
+        """
+            Hashes all records and computes every digest bottom-up.
+        """
+        self.buckets = defaultdict(dict)
+        for title, details in items:
+            self.buckets[bucket_of(title)][title] = record_hash(title, Movie.from_dict(details))
+        self._digests = {}
+        level = {bucket: self._bucket_digest(entries) for bucket, entries in self.buckets.items()}
+        self._digests.update(level)
+        for _ in range(DEPTH):
+            parents = {node[:-1] for node in level}
+            level = {node: self._node_digest(node) for node in parents}
+            self._digests.update(level)
+
+    @classmethod
+    def open(cls, storage: IStorage):
+        """
+            Returns the up-to-date tree of a storage.
+
+            The first call for a storage object loads the tree from its sidecar
+            and registers it as a listener of the storage; later calls return
+            the same tree.
+
+            Args:
+                storage (IStorage): The catalog.
+
+            Returns:
+                MerkleTree: The tree.
+        """
+        with _TREES_LOCK:
+            tree = _TREES.get(storage)
+            if tree is None:
+                tree = cls(path=f"{storage.path}.sync")
+                tree.load()
+                storage.add_listener(tree.on_save)
+                _TREES[storage] = tree
+            tree.refresh(storage)
+        return tree
+
+    def load(self):
+        """
+            Replaces the tree with the one in its sidecar file, if that is readable.
+        """
+        try:
+            with open(self.path, "rb") as file:
+                state = pickle.load(file)
+            if state.get("format") == TREE_FORMAT:
+                self.version, self.buckets, self._digests = (
+                    state["version"], defaultdict(dict, state["buckets"]), state["digests"])
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError,
+                KeyError, TypeError):
+            pass
+
+    def refresh(self, storage: IStorage):
+        """
+            Rebuilds the tree if the storage was changed by another program.
+        """
+        version = storage.version()
+        if self.version != version:
+            self._rebuild(storage.get_movies().items())
+            self.version = version
+            self.save()
+
+    def save(self):
+        """
+            Writes the tree to its sidecar file, if it has one.
+        """
+        if self.path is None:
+            return
+        state = {"format": TREE_FORMAT, "version": self.version,
+                 "buckets": dict(self.buckets), "digests": self._digests}
+        atomic_write(self.path, lambda file: pickle.dump(state, file, pickle.HIGHEST_PROTOCOL),
+                     mode="wb")
+
+    def on_save(self, titles, movies, version):
+        """
+            Storage listener: rehashes the movies touched by a save.
+        """
+        if titles is None or self.version is None or version != self.version + 1:
+            self._rebuild(movies.items())
+        else:
+            apply_save(titles, movies, self.update, self.remove)
+        self.version = version
+        self.save()
+
+    def update(self, title: str, details):
+        """
+            Adds or rehashes one record and the digests above it.
+        """
+        bucket = bucket_of(title)
+        self.buckets[bucket][title] = record_hash(title, Movie.from_dict(details))
+        self._refresh_path(bucket)
+
+    def remove(self, title: str):
+        """
+            Removes one record, if it is in the tree, and updates the digests above it.
+        """
+        bucket = bucket_of(title)
+        if self.buckets.get(bucket, {}).pop(title, None) is not None:
+            self._refresh_path(bucket)
+
+    def _refresh_path(self, bucket: str):
+        """
+            Recomputes the digests from a bucket up to the root.
+        """
+        entries = self.buckets.get(bucket)
+        if entries:
+            self._digests[bucket] = self._bucket_digest(entries)
+        else:
+            self.buckets.pop(bucket, None)
+            self._digests.pop(bucket, None)
+        for length in range(DEPTH - 1, -1, -1):
+            node = bucket[:length]
+            if any(node + char in self._digests for char in HEX):
+                self._digests[node] = self._node_digest(node)
+            else:
+                self._digests.pop(node, None)
+
+    def _bucket_digest(self, entries: dict) -> str:
+        return self._hash("".join(f"{title}\0{entries[title]}\0" for title in sorted(entries)))
+
+    def _node_digest(self, node: str) -> str:
+        return self._hash("".join(self._digests.get(node + char, "-") for char in HEX))
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+    @property
+    def root(self):
+        """The root digest, or None for an empty catalog."""
+        return self._digests.get("")
+
+    def digests(self, nodes) -> dict:
+        """
+            Returns the digests of the given nodes that are not empty.
+        """
+        return {node: self._digests[node] for node in nodes if node in self._digests}
+
+    def entries(self, buckets) -> dict:
+        """
+            Returns title -> record hash for the titles in the given buckets.
+        """
+        return {title: digest for bucket in buckets
+                for title, digest in self.buckets.get(bucket, {}).items()}
+
+
+class SyncEndpoint:
+    """
+        Answers the sync requests of a peer about one storage.
+
+        The hash tree of the storage is kept up to date by its saves; the
+        movies are only loaded to send records.
+    """
+
+    def __init__(self, storage: IStorage):
+        """
+            Initializes the endpoint.
+
+            Args:
+                storage (IStorage): The storage to serve.
+        """
+        self.storage = storage
+        self._lock = threading.Lock()
+
+    def tree(self) -> MerkleTree:
+        """
+            Returns the up-to-date hash tree of the storage.
+        """
+        return MerkleTree.open(self.storage)
+
+    def handle(self, request: dict) -> dict:
+        """
+            Answers one request.
+
+            Args:
+                request (dict): {"op": "digests", "nodes": [...]},
+                                {"op": "entries", "buckets": [...]},
+                                {"op": "records", "titles": [...]} or
+                                {"op": "apply", "upserts": {...}, "deletes": [...]}.
+
+            Returns:
+                dict: The response; {"error": message} for an invalid request.
+        """
+        with self._lock:
+            return self._handle(request)
+
+    def _handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "digests":
+            return {"digests": self.tree().digests(request["nodes"])}
+        if op == "entries":
+            return {"entries": self.tree().entries(request["buckets"])}
+        if op == "records":
+            movies = self.storage.get_movies()
+            return {"records": {title: record_fields(movies[title])
+                                for title in request["titles"] if title in movies}}
+        if op == "apply":
+            self.storage.replace_movies(request["upserts"], request["deletes"])
+            return {"applied": len(request["upserts"]) + len(request["deletes"])}
+        return {"error": f"Unknown operation {op!r}"}
+
+
+class Peer:
+    """
+        The other side of a sync, reached through a transport.
+
+        Requests and responses are JSON objects; the bytes they take are
+        counted, so a sync can report how much it exchanged.
+
+        Attributes:
+            requests (int): Requests made.
+            bytes_sent (int): Size of the encoded requests.
+            bytes_received (int): Size of the encoded responses.
+    """
+
+    def __init__(self):
+        self.requests = self.bytes_sent = self.bytes_received = 0
+
+    def request(self, op: str, **args) -> dict:
+        """
+            Sends a request and returns the response.
+
+            Raises:
+                ConnectionError: If the peer reports an error or the connection fails.
+        """
+        line = json.dumps({"op": op, **args}, ensure_ascii=False).encode("utf-8") + b"\n"
+        response_line = self._exchange(line)
+        self.requests += 1
+        self.bytes_sent += len(line)
+        self.bytes_received += len(response_line)
+        response = json.loads(response_line)
+        if "error" in response:
+            raise ConnectionError(response["error"])
+        return response
+
+    def _exchange(self, line: bytes) -> bytes:
+        """
+            Transports an encoded request and returns the encoded response.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+            Releases the transport.
+        """
+
+
+class LocalPeer(Peer):
+    """
+        A catalog in a data file on this machine, e.g. on a mounted share.
+    """
+
+    def __init__(self, storage: IStorage):
+        super().__init__()
+        self.endpoint = SyncEndpoint(storage)
+
+    def _exchange(self, line: bytes) -> bytes:
+        response = self.endpoint.handle(json.loads(line))
+        return json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class RemotePeer(Peer):
+    """
+        A catalog served by a sync server on another machine.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0):
+        super().__init__()
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._socket.makefile("rwb")
+
+    def _exchange(self, line: bytes) -> bytes:
+        self._file.write(line)
+        self._file.flush()
+        response = self._file.readline()
+        if not response:
+            raise ConnectionError("The sync server closed the connection.")
+        return response
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+class SyncHandler(socketserver.StreamRequestHandler):
+    """
+        Answers the JSON line requests of one sync client until it disconnects.
+    """
+
+    server: "SyncServer"
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.endpoint.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as err:
+                response = {"error": f"Invalid request: {err}"}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class SyncServer(socketserver.ThreadingTCPServer):
+    """
+        Serves a catalog to sync clients over TCP.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, storage: IStorage, server_address=("127.0.0.1", 0)):
+        super().__init__(server_address, SyncHandler)
+        self.endpoint = SyncEndpoint(storage)
+
+
+def start_sync_server(storage: IStorage, host="127.0.0.1", port=0) -> SyncServer:
+    """
+        Starts a sync server on a background thread.
+
+        Returns:
+            SyncServer: The running server; call shutdown() and server_close() to stop it.
+    """
+    server = SyncServer(storage, (host, port))
+    threading.Thread(target=server.serve_forever, name="sync-server", daemon=True).start()
+    return server
+
+
+def serve_sync(storage: IStorage, host="127.0.0.1", port=8001):
+    """
+        Serves a catalog to sync clients until interrupted.
+
+        Args:
+            storage (IStorage): The storage to serve.
+            host (str, optional): Interface to bind. Defaults to localhost.
+            port (int, optional): Port to listen on.
+    """
+    with SyncServer(storage, (host, port)) as server, suppress(KeyboardInterrupt):
+        print(f"Serving '{storage.path}' for sync on {host}:{server.server_address[1]}")
+        server.serve_forever()
+    print("\nBye!")
+
+
+def open_peer(target: str) -> Peer:
+    """
+        Opens the other side of a sync.
+
+        Args:
+            target (str): "host:port" of a sync server, or the path of a data file.
+
+        Returns:
+            Peer: The peer.
+    """
+    host, _, port = target.rpartition(":")
+    if host and port.isdigit() and not os.path.exists(target):
+        return RemotePeer(host, int(port))
+    return LocalPeer(init_storage(target))
+
+
+class SyncReport:  # pylint: disable=too-few-public-methods
+    """
+        What a sync changed and exchanged.
+
+        Attributes:
+            copied (int): Records that were added or replaced on the receiving side.
+            deleted (int): Records that were removed from the receiving side.
+            requests (int): Requests made to the peer.
+            bytes_exchanged (int): Size of the requests and responses.
+            elapsed (float): Wall-clock seconds.
+    """
+
+    def __init__(self):
+        self.copied = self.deleted = self.requests = self.bytes_exchanged = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        """
+            Formats the report for the console.
+        """
+        if not self.copied and not self.deleted:
+            changes = "Already in sync"
+        else:
+            changes = f"{self.copied} movie(s) copied, {self.deleted} deleted"
+        return (f"{changes}; {self.requests} requests, "
+                f"{self.bytes_exchanged / 1024:.1f} KB exchanged in {self.elapsed:.2f} s")
+
+
+def diff_tree(tree: MerkleTree, peer: Peer) -> tuple:
+    """
+        Finds the records that differ between a local tree and a peer.
+
+        Descends the tree level by level, asking the peer only for the children
+        of the nodes whose digests differ, and then for the record hashes of the
+        differing buckets.
+
+        Args:
+            tree (MerkleTree): The local tree.
+            peer (Peer): The other side.
+
+        Returns:
+            tuple: Titles only stored locally, titles only stored by the peer and
+                   titles stored by both with different content.
+    """
+    nodes = [""]
+    for level in range(DEPTH + 1):
+        remote = peer.request("digests", nodes=nodes)["digests"]
+        local = tree.digests(nodes)
+        nodes = [node for node in nodes if remote.get(node) != local.get(node)]
+        if not nodes:
+            return [], [], []
+        if level < DEPTH:
+            nodes = [node + char for node in nodes for char in HEX]
+    remote = peer.request("entries", buckets=nodes)["entries"]
+    local = tree.entries(nodes)
+    local_only = [title for title in local if title not in remote]
+    remote_only = [title for title in remote if title not in local]
+    changed = [title for title, digest in local.items()
+               if title in remote and remote[title] != digest]
+    return local_only, remote_only, changed
+
+
+def sync(storage: IStorage, peer: Peer, push: bool = False) -> SyncReport:
+    """
+        Makes one catalog a copy of the other, moving only the differing records.
+
+        Args:
+            storage (IStorage): The local catalog.
+            peer (Peer): The other catalog.
+            push (bool, optional): Update the peer from the local catalog instead of
+                                   the local catalog from the peer.
+
+        Returns:
+            SyncReport: What was changed and exchanged.
+    """
+    report = SyncReport()
+    start = time.perf_counter()
+    requests, exchanged = peer.requests, peer.bytes_sent + peer.bytes_received
+    local_only, remote_only, changed = diff_tree(MerkleTree.open(storage), peer)
+    if push:
+        if local_only or remote_only or changed:
+            movies = storage.get_movies()
+            upserts = {title: record_fields(movies[title]) for title in local_only + changed}
+            peer.request("apply", upserts=upserts, deletes=remote_only)
+        report.copied, report.deleted = len(local_only) + len(changed), len(remote_only)
+    else:
+        upserts = {}
+        if remote_only or changed:
+            upserts = peer.request("records", titles=remote_only + changed)["records"]
+        if upserts or local_only:
+            storage.replace_movies(upserts, local_only)
+        report.copied, report.deleted = len(upserts), len(local_only)
+    report.requests = peer.requests - requests
+    report.bytes_exchanged = peer.bytes_sent + peer.bytes_received - exchanged
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,153 @@
+import html
+import os
+import re
+
+# Slots are written as __TEMPLATE_NAME__ in the templates
+SLOT_PATTERN = re.compile(r"__TEMPLATE_([A-Z0-9_]+)__")
+
+
+class Markup(str):
+    """A string that is already HTML and is inserted into a template without escaping."""
+
+
+class Template:  # pylint: disable=too-few-public-methods
+    """
+        A template compiled once into static segments and named slots.
+
+        Compiling splits the source at its slots and turns it into a single
+        format string, so rendering is one str.format_map() call instead of a
+        search and replace per slot. Slot values are HTML-escaped unless they
+        are Markup.
+
+        Attributes:
+            slots (tuple): The slot names, in order of appearance.
+    """
+
+    def __init__(self, source: str):
+        """
+            Compiles the template source.
+
+            Args:
+                source (str): The template text.
+        """
+        segments = SLOT_PATTERN.split(source)
+        # split() alternates static text and slot names, starting and ending with text
+        self.slots = tuple(segments[1::2])
+        self._format = "".join(
+            segment.replace("{", "{{").replace("}", "}}") if index % 2 == 0
+            else "{" + segment + "}"
+            for index, segment in enumerate(segments))
+
+    def render(self, **values) -> Markup:
+        """
+            Fills in the slots.
+
+            Args:
+                **values: A value for every slot. None renders as an empty string.
+
+            Returns:
+                Markup: The rendered HTML.
+
+            Raises:
+                KeyError: If a slot has no value.
+        """
+        return Markup(self._format.format_map(
+            {slot: escape(values[slot]) for slot in self.slots}))
+
+
+def escape(value) -> str:
+    """
+        Converts a slot value to HTML-safe text.
+
+        Args:
+            value: The value to insert. Markup is returned unchanged.
+
+        Returns:
+            str: The escaped text.
+    """
+    if isinstance(value, Markup):
+        return value
+    if value is None:
+        return ""
+    return html.escape(str(value), quote=True)
+
+
+_compiled = {}
+
+
+def load_template(path: str) -> Template:
+    """
+        Returns the compiled template stored at a path.
+
+        A template is read and compiled once and then served from memory until
+        the file changes.
+
+        Args:
+            path (str): The path to the template file.
+
+        Returns:
+            Template: The compiled template.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is empty.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        cached = _compiled.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as file:
+            content = file.read()
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"Error: The file '{path}' was not found.") from exc
+    if not content:
+        raise ValueError(f"Error: The file '{path}' is empty.")
+    template = Template(content)
+    _compiled[path] = (mtime, template)
+    return template
+
+
+class FragmentCache:
+    """
+        Memoizes rendered fragments by the content of the record they were rendered from.
+
+        Only fragments used by the latest build are kept, so the cache holds at
+        most one generation of the catalog.
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._current = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        """
+            Returns the cached fragment for a key, rendering it on a miss.
+
+            Args:
+                key (tuple): Hashable record content.
+                render (callable): Produces the fragment; called without arguments.
+
+            Returns:
+                str: The fragment.
+        """
+        fragment = self._current.get(key)
+        if fragment is None:
+            fragment = self._previous.get(key)
+            if fragment is None:
+                fragment = render()
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._current[key] = fragment
+        else:
+            self.hits += 1
+        return fragment
+
+    def next_generation(self):
+        """
+            Starts a new build: fragments not used since the previous call are dropped.
+        """
+        self._previous, self._current = self._current, {}
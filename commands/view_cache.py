@@ -0,0 +1,219 @@
+import sys
+import threading
+from collections import OrderedDict
+from itertools import islice
+from storage.istorage import IStorage
+from storage.movie import MovieCollection
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+# Containers larger than this are measured from their first elements and extrapolated
+SIZE_SAMPLE = 64
+MOVIES = ("movies",)
+
+
+def estimate_size(value, depth: int = 4) -> int:
+    """
+        Estimates the memory taken by a value and what it references, in bytes.
+
+        Large containers are measured from a sample of their elements, so the cost
+        does not grow with the catalog. Objects shared between views are counted
+        once per view, so the estimate errs on the high side.
+
+        Args:
+            value (object): The value to measure.
+            depth (int, optional): How many levels of references to follow.
+
+        Returns:
+            int: The approximate size.
+    """
+    if hasattr(value, "memory_usage"):
+        # pandas objects; object columns only hold references to the titles
+        return int(value.memory_usage(index=True).sum())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if depth == 0 or isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        count = len(value)
+        sample = [part for item in islice(value.items(), SIZE_SAMPLE) for part in item]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        count = len(value)
+        sample = list(islice(value, SIZE_SAMPLE))
+    elif hasattr(type(value), "__slots__"):
+        count = 1
+        sample = [getattr(value, name, None) for name in type(value).__slots__]
+    elif hasattr(value, "__dict__"):
+        count = 1
+        sample = list(vars(value).values())
+    else:
+        return size
+    if not sample:
+        return size
+    measured = sum(estimate_size(item, depth - 1) for item in sample)
+    if count > SIZE_SAMPLE:
+        measured = measured * count // SIZE_SAMPLE
+    return size + measured
+
+
+class ViewCache:  # pylint: disable=too-many-instance-attributes
+    """
+        Memory-bounded cache of the views the commands derive from the movies.
+
+        Every entry belongs to one storage version. A save through the storage
+        drops all entries and keeps the saved movies as the new base view, so
+        commands after an edit do not even re-read the file; a save by another
+        process is noticed by the version changing. Repeating a command on an
+        unchanged catalog is a dictionary lookup.
+
+        The entries share a memory budget. When it is exceeded the least recently
+        used entries are evicted, and a view larger than the whole budget is
+        built every time instead of cached.
+
+        Attributes:
+            budget (int): Memory budget in bytes.
+            size (int): Estimated bytes taken by the cached views.
+            version (int | None): The storage version the entries belong to.
+            hits (int): Lookups answered from the cache.
+            misses (int): Lookups that built the view.
+            evictions (int): Entries evicted to stay within the budget.
+    """
+
+    def __init__(self, storage: IStorage, budget: int = DEFAULT_BUDGET):
+        """
+            Initializes an empty cache and registers it as a storage listener.
+
+            Args:
+                storage (IStorage): The storage the views are derived from.
+                budget (int, optional): Memory budget in bytes; 0 disables caching.
+        """
+        self.storage = storage
+        self.budget = budget
+        self.size = 0
+        self.version = None
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        storage.add_listener(self.on_save)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple, build):
+        """
+            Returns a view, building and caching it if it is not cached for the
+            current storage version.
+
+            Views are shared between callers and must not be modified.
+
+            Args:
+                key (tuple): Identifies the view and its parameters.
+                build (callable): Builds the view from scratch.
+
+            Returns:
+                object: The view.
+        """
+        version = self.storage.version()
+        with self._lock:
+            if version != self.version:
+                self._clear(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = build()
+        self._store(key, value, version)
+        return value
+
+    def peek(self, key: tuple):
+        """
+            Returns a view if it is cached for the current storage version, without
+            building it.
+
+            Args:
+                key (tuple): Identifies the view and its parameters.
+
+            Returns:
+                object: The view, or None if it is not cached.
+        """
+        version = self.storage.version()
+        with self._lock:
+            entry = self._entries.get(key) if version == self.version else None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def movies(self) -> MovieCollection:
+        """
+            Returns the stored movies, read from the file only after they changed.
+
+            Returns:
+                MovieCollection: Movie records keyed by title; must not be modified.
+        """
+        return self.get(MOVIES, lambda: MovieCollection.wrap(self.storage.get_movies()))
+
+    def iter_movies(self):
+        """
+            Iterates over the stored movies without loading them for the cache.
+
+            Cached movies are used if they are current; otherwise the movies are
+            streamed from the file, so the first ones are available at once.
+
+            Returns:
+                Iterator: (title, Movie) pairs.
+        """
+        movies = self.peek(MOVIES)
+        if movies is not None:
+            return iter(movies.items())
+        return self.storage.iter_movies()
+
+    def on_save(self, titles, movies, version):
+        """
+            Storage listener dropping the views of the previous version.
+
+            After an add, edit or delete the saved movies become the cached base
+            view. A collection passed to save_movies() is not kept, since the
+            caller may go on changing it.
+        """
+        with self._lock:
+            self._clear(version)
+        if titles is not None and isinstance(movies, MovieCollection):
+            self._store(MOVIES, movies, version)
+
+    def _store(self, key, value, version):
+        """
+            Caches a view of a storage version, evicting old entries to make room.
+        """
+        size = estimate_size(value)
+        with self._lock:
+            if version != self.version or size > self.budget:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def _clear(self, version):
+        """
+            Drops all entries and moves on to a storage version. Called with the lock held.
+        """
+        self._entries.clear()
+        self.size = 0
+        self.version = version
+
+    def counters(self) -> dict:
+        """
+            Returns the cache's counters and memory use.
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "size": self.size, "budget": self.budget,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
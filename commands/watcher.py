@@ -0,0 +1,118 @@
+import os
+import time
+from commands.web_generator import WebGenerator
+from storage.istorage import IStorage
+
+POLL_INTERVAL = 0.2
+# A change is acted on once the file has been quiet for this long
+DEBOUNCE = 0.3
+
+
+def file_signature(path):
+    """
+        Returns what identifies the current content of a file without reading it.
+
+        Saves replace the file, so the inode changes as well as the mtime.
+
+        Args:
+            path (str): The file to check.
+
+        Returns:
+            tuple | None: (inode, size, mtime in ns), or None if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class StorageWatcher:
+    """
+        Watches a storage file and calls back once a burst of changes has settled.
+
+        The file is polled with os.stat() and the watcher sleeps between polls,
+        so watching costs one stat call per interval. Changes are debounced:
+        the callback runs after the file stayed unchanged for the debounce time,
+        so a burst of saves causes one callback. Changes made outside the
+        application do not bump the storage version, so for them the watcher
+        invalidates the storage to make version-keyed caches reload.
+    """
+
+    def __init__(self, movies_data: IStorage, on_change, interval=POLL_INTERVAL,
+                 debounce=DEBOUNCE):
+        """
+            Initializes the watcher with the current state of the file.
+
+            Args:
+                movies_data (IStorage): The storage to watch.
+                on_change (callable): Called without arguments after a change.
+                interval (float, optional): Seconds between polls.
+                debounce (float, optional): Seconds the file must stay unchanged.
+        """
+        self.movies = movies_data
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self._signature = file_signature(movies_data.path)
+        self._version = movies_data.version()
+        self._changed_at = None
+
+    def poll(self, now=None):
+        """
+            Checks the file once and calls back if a change has settled.
+
+            Args:
+                now (float, optional): The current monotonic time.
+
+            Returns:
+                bool: True if the callback ran.
+        """
+        now = time.monotonic() if now is None else now
+        signature = file_signature(self.movies.path)
+        if signature != self._signature:
+            self._signature = signature
+            self._changed_at = now
+            return False
+        if self._changed_at is None or now - self._changed_at < self.debounce:
+            return False
+
+        self._changed_at = None
+        if self.movies.version() == self._version:
+            self.movies.invalidate()
+        self._version = self.movies.version()
+        self.on_change()
+        return True
+
+    def run(self, stop_event=None):
+        """
+            Polls until interrupted or until the stop event is set.
+
+            Args:
+                stop_event (threading.Event, optional): Ends the loop when set.
+        """
+        while stop_event is None or not stop_event.is_set():
+            self.poll()
+            if stop_event is None:
+                time.sleep(self.interval)
+            else:
+                stop_event.wait(self.interval)
+
+
+def watch_website(movies_data: IStorage, generator: WebGenerator = None):
+    """
+        Generates the website and regenerates it whenever the storage file changes,
+        until interrupted with Ctrl+C.
+
+        Args:
+            movies_data (IStorage): The storage to watch.
+            generator (WebGenerator, optional): The generator to run.
+                                                Defaults to the standard output path.
+    """
+    generator = generator or WebGenerator(movies_data)
+    generator.generate_website()
+    print(f"Watching {movies_data.path} for changes, press Ctrl+C to stop.")
+    try:
+        StorageWatcher(movies_data, generator.generate_website).run()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -1,6 +1,26 @@
+import json
 import os
 from pathlib import Path
+from commands.site_assets import SEARCH_INDEX, build_site, build_title_index
+from commands.template_engine import FragmentCache, Markup, Template, load_template
+from commands.view_cache import ViewCache
 from storage.istorage import IStorage
+from storage.locking import atomic_write
+
+MOVIE_TEMPLATE = Template("""
+            <li>
+                <div class="movie">
+                    <a href="__TEMPLATE_IMDB_LINK__" target="_blank">
+                        <img src="__TEMPLATE_POSTER__" alt="__TEMPLATE_TITLE__" class="movie-poster"/>
+                    </a>
+                    <div class="movie-title">__TEMPLATE_TITLE__</div>
+                    <div class="movie-year">(__TEMPLATE_YEAR__)</div>
+                    <div class="movie-rating">Rating: __TEMPLATE_RATING__</div>
+                    <div class="movie-notes">__TEMPLATE_NOTES__</div>
+                </div>
+            </li>
+            """)
+NOTES_TEMPLATE = Template('<span class="tooltiptext">__TEMPLATE_NOTES__</span>')
 
 
 class WebGenerator:
@@ -9,6 +29,12 @@ class WebGenerator:
 
         This class loads an HTML template, serializes movie data,
         and generates an HTML file with a movie grid based on the data.
+        The template is compiled once and rendered movies are cached between builds;
+        the whole movie grid is kept in a ViewCache until the next save.
+
+        Each new page is also published as an optimized site in a "dist"
+        directory next to it: minified, with fingerprinted and precompressed
+        assets and a prefix index of the titles for the search box.
     """
 
     project_dir = Path(__file__).parent.parent
@@ -17,7 +43,9 @@ class WebGenerator:
     new_index_path = os.path.join(project_dir,
                                   "_static", "index.html")
 
-    def __init__(self, movies_data: IStorage, new_path=new_index_path):
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, movies_data: IStorage, new_path=new_index_path, views: ViewCache = None,
+                 dist_path=None):
         """
             Initialize the WebGenerator with movie data and an output path.
 
@@ -25,106 +53,128 @@ class WebGenerator:
                 movies_data (IStorage): The data containing movie information.
                 new_path (str, optional): The path to save the generated HTML file.
                                           Defaults to `new_index_path`.
+                views (ViewCache, optional): View cache shared with other commands;
+                                             a private one by default.
+                dist_path (str, optional): Directory of the optimized site. Defaults to
+                                           "dist" next to the HTML file.
         """
         self.movies = movies_data
+        self.views = ViewCache(movies_data) if views is None else views
         self.new_path = new_path
+        self.dist_path = dist_path or os.path.join(os.path.dirname(new_path), "dist")
+        self._fragments = FragmentCache()
+        self._written = None
 
     def generate_website(self) -> None:
         """
             Generate the HTML website for the movie list.
 
-            This method loads the template, inserts serialized movie data into the
-            template, and writes the updated HTML to the specified output path.
+            This method loads the compiled template, inserts serialized movie data
+            into it, and writes the updated HTML to the specified output path,
+            unless it is the same as the last page this generator wrote. A new
+            page is then published as an optimized site.
         """
 
-        template = self.load_template(WebGenerator.template_path)
-        serialized_data = self.serialize_movies()
-        new_html = template.replace('__TEMPLATE_MOVIE_GRID__', serialized_data)
-        self.write_file(self.new_path, new_html)
+        template = load_template(WebGenerator.template_path)
+        serialized_data = self.views.get(("website grid",), self.serialize_movies)
+        new_html = template.render(MOVIE_GRID=serialized_data)
+        if new_html == self._written and os.path.exists(self.new_path):
+            print(f"Website at {self.new_path} is up to date.")
+            return
+        if self.write_file(self.new_path, new_html):
+            self._written = new_html
+            self.publish(new_html)
+
+    def publish(self, html: str) -> None:
+        """
+            Write the optimized site of a generated page.
+
+            The page and its stylesheet and script are minified and fingerprinted,
+            and the title index is built once per version of the movies.
+
+            Args:
+                html (str): The generated page.
+        """
+        index = self.views.get(("search index",), self.serialize_title_index)
+        try:
+            build_site(html, os.path.dirname(WebGenerator.template_path), self.dist_path,
+                       {SEARCH_INDEX: index})
+            print(f"Optimized site was generated in {self.dist_path}.")
+        except OSError as e:
+            print(f"Failed to write the optimized site to '{self.dist_path}': {e}")
+
+    def serialize_title_index(self) -> bytes:
+        """
+            Serialize the prefix index of the titles, in grid order, as compact JSON.
+
+            Returns:
+                bytes: The JSON document.
+        """
+        index = build_title_index(self.views.movies())
+        return json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
     @staticmethod
-    def load_template(path: str) -> str:
+    def render_movie(title, details) -> str:
         """
-            Load and return the content of a template file.
+            Render the HTML list item of a single movie.
 
-            Opens the specified file in read mode, reads its content, and returns it.
-            Raises an error if the file is not found or if it's empty.
+            Titles, notes and URLs are HTML-escaped. If notes are present, they are
+            added as a tooltip.
 
             Args:
-                path (str): The path to the file.
+                title (str): The movie title.
+                details (Movie): The movie record.
 
             Returns:
-                str: The content of the file as a string.
-
-            Raises:
-                FileNotFoundError: If the file does not exist.
-                ValueError: If the file is empty.
+                str: The HTML list item.
         """
-        try:
-            with open(path, "r", encoding="utf-8") as file:
-                content = file.read()
-                if not content:
-                    raise ValueError(f"Error: The file '{path}' is empty.")
-                return content
-        except FileNotFoundError as exc:
-            raise FileNotFoundError(f"Error: The file '{path}' was not found.") from exc
+        notes = details.notes or ''
+        return MOVIE_TEMPLATE.render(
+            IMDB_LINK='#' if details.imdb_link is None else details.imdb_link,
+            POSTER=details.poster,
+            TITLE=title,
+            YEAR='N/A' if details.year is None else details.year,
+            RATING='N/A' if details.rating is None else details.rating,
+            NOTES=NOTES_TEMPLATE.render(NOTES=notes) if notes else '')
 
     def serialize_movies(self) -> str:
         """
             Serialize the movie data into an HTML list format.
 
-            This method generates HTML list items for each movie with details such
-            as title, year, rating, and notes. If notes are present, they are added
-            as a tooltip.
+            Each movie's list item is memoized by the movie's content, so a rebuild
+            only renders the movies that were added or changed since the last one.
 
             Returns:
                 str: An HTML string representing the movie list.
         """
-        output = ''
-        movies = self.movies.get_movies()
-        for movie, details in movies.items():
-            imdb_link = details.get('IMDB Link', '#')
-            poster_url = details.get('Poster', '')
-            year = details.get('Year', 'N/A')
-            rating = details.get('Rating', 'N/A')
-            notes = details.get('Notes', '')
-            # Conditionally add the tooltip span if there are notes
-            notes_html = f'<span class="tooltiptext">{notes}</span>' if notes else ''
-
-            output += f"""
-            <li>
-                <div class="movie">
-                    <a href="{imdb_link}" target="_blank">
-                        <img src="{poster_url}" alt="{movie}" class="movie-poster"/>
-                    </a>
-                    <div class="movie-title">{movie}</div>
-                    <div class="movie-year">({year})</div>
-                    <div class="movie-rating">Rating: {rating}</div>
-                    <div class="movie-notes">{notes_html}</div>
-                </div>
-            </li>
-            """
-
-        return output
+        movies = self.views.movies()
+        self._fragments.next_generation()
+        return Markup(''.join(
+            self._fragments.get(
+                (title, details.rating, details.year, details.poster, details.imdb_link,
+                 details.notes),
+                lambda title=title, details=details: self.render_movie(title, details))
+            for title, details in movies.items()))
 
     @staticmethod
     def write_file(path, content):
         """
             Write the given content to a file.
 
-            Opens the specified file in write mode, writes the provided content,
-            and prints a success message.
+            The file is replaced atomically, so a browser or web server never sees a
+            half-written page, and a success or failure message is printed.
 
             Args:
                 path (str): The file path where content should be saved.
                 content (str): The content to write to the file.
 
-            Raises:
-                IOError: If there is an issue with writing to the file.
+            Returns:
+                bool: True if the file was written.
         """
         try:
-            with open(path, "w", encoding="utf-8") as file:
-                file.write(content)
+            atomic_write(path, lambda file: file.write(content))
             print(f"Website was successfully generated at {path}.")
+            return True
         except IOError as e:
             print(f"Failed to write to file '{path}': {e}")
+            return False
@@ -1,26 +1,99 @@
-import sys
-from storage import init_storage, is_valid_path
+import argparse
+from storage import SCHEMA_VERSION, init_storage, is_valid_path
 from data import DEFAULT_PATH, get_data_path
 from movie_app import MovieApp
+from commands.api_server import run_server
+from commands.crud import Crud
+from commands.sync import open_peer, serve_sync, sync
+from commands.view_cache import DEFAULT_BUDGET
+from commands.watcher import watch_website
 
 
-def get_storage_arg():
+def non_negative_int(value):
     """
-        Get the storage file path from command line arguments.
+        Converts a command line argument to an integer that is zero or more.
 
-        If no arguments are provided, returns the default path
+        Args:
+            value (str): The argument.
+
+        Returns:
+            int: The number.
+
+        Raises:
+            argparse.ArgumentTypeError: If the argument is not a non-negative integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"expected a non-negative integer, got '{value}'")
+    return number
+
+
+def parse_args(argv=None):
+    """
+        Parse the command line arguments.
+
+        Args:
+            argv (list, optional): Arguments to parse. Defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="My Movies Database")
+    parser.add_argument("storage", nargs="?",
+                        help="CSV or JSON data file inside the data directory")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the database as a JSON HTTP API instead of the menu")
+    parser.add_argument("--watch", action="store_true",
+                        help="regenerate the website whenever the data file changes")
+    parser.add_argument("--host", default="127.0.0.1", help="API server interface")
+    parser.add_argument("--port", type=int, default=8000, help="API server port")
+    parser.add_argument("--workers", type=int, default=8, help="API server worker threads")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes for analytics of large databases "
+                             "(default: one per core, 1 to disable)")
+    parser.add_argument("--migrate", action="store_true",
+                        help="rewrite the data file in the current schema and exit")
+    parser.add_argument("--list", action="store_true",
+                        help="list the movies and exit, a screen at a time on a terminal")
+    parser.add_argument("--offset", type=non_negative_int, default=0,
+                        help="with --list, movies to skip")
+    parser.add_argument("--limit", type=non_negative_int,
+                        help="with --list, the most movies to list")
+    parser.add_argument("--sync", metavar="TARGET",
+                        help="make the data file a copy of another data file or of a "
+                             "sync server given as host:port, then exit")
+    parser.add_argument("--push", action="store_true",
+                        help="with --sync, update the target from the data file instead")
+    parser.add_argument("--sync-serve", action="store_true",
+                        help="serve the data file to sync clients on --host and --port")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_BUDGET // 2 ** 20,
+                        help="memory budget of the cache of derived views in MB "
+                             "(0 to disable)")
+    return parser.parse_args(argv)
+
+
+def get_storage_arg(storage=None):
+    """
+        Get the storage file path from the command line argument.
+
+        If no argument is provided, returns the default path
         to the default JSON storage file. If a valid CSV or JSON
         file is provided as an argument, constructs the full path
         to that file. If the provided file has an invalid extension,
         defaults to the JSON storage file.
 
+        Args:
+            storage (str, optional): The storage file given on the command line.
+
         Returns:
             str: The full path to the storage file.
     """
 
-    if len(sys.argv) <= 1:
+    if not storage:
         return DEFAULT_PATH
-    storage = sys.argv[1]
     full_path = get_data_path(storage)
     if is_valid_path(storage):
         return full_path
@@ -34,12 +107,42 @@ def main():
 
         This function determines the storage type based on the file
         extension of the provided storage path. It initializes the
-        appropriate storage class and the MovieApp, then starts the
-        application.
+        appropriate storage class and either the MovieApp or, with
+        --serve, the HTTP API server, or with --watch the website
+        watcher, then starts it. With --migrate it only upgrades the
+        data file to the current schema, with --list it only lists the
+        movies and with --sync it only synchronizes the data file with
+        another catalog.
     """
-    storage_path = get_storage_arg()
+    args = parse_args()
+    storage_path = get_storage_arg(args.storage)
     storage = init_storage(storage_path)
-    movie_app = MovieApp(storage)
+    if args.migrate:
+        if storage.migrate():
+            print(f"Migrated '{storage_path}' to schema version {SCHEMA_VERSION}.")
+        else:
+            print(f"'{storage_path}' already uses schema version {SCHEMA_VERSION}.")
+        return
+    if args.list:
+        Crud(storage).list_movies(args.offset, args.limit)
+        return
+    if args.sync:
+        peer = open_peer(args.sync)
+        try:
+            print(sync(storage, peer, args.push).summary())
+        finally:
+            peer.close()
+        return
+    if args.sync_serve:
+        serve_sync(storage, args.host, args.port)
+        return
+    if args.serve:
+        run_server(storage, args.host, args.port, args.workers)
+        return
+    if args.watch:
+        watch_website(storage)
+        return
+    movie_app = MovieApp(storage, args.processes, args.cache_mb * 2 ** 20)
     movie_app.run()
 
 
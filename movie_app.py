@@ -1,6 +1,9 @@
 import sys
 from commands.analytics import Analytics
 from commands.crud import Crud
+from commands.dedup import Deduplicator
+from commands.enrichment import EnrichmentWorker
+from commands.view_cache import DEFAULT_BUDGET, ViewCache
 from commands.web_generator import WebGenerator
 from storage.istorage import IStorage
 
@@ -18,6 +21,8 @@ class MovieApp:
         Attributes:
             _storage (object): An object that interfaces with the movie database storage,
                                such as a JSON or database file.
+            _views (ViewCache): Movies and derived views shared by all commands until the
+                                next save.
             _crud (Crud): An instance of the Crud class for handling create, read, update,
                           and delete operations.
             _analytics (Analytics): An instance of the Analytics class for data analysis
@@ -35,18 +40,23 @@ class MovieApp:
                    commands.
     """
 
-    def __init__(self, storage: IStorage):
+    def __init__(self, storage: IStorage, processes: int = None,
+                 cache_budget: int = DEFAULT_BUDGET):
         """
             Initializes the MovieApp instance with provided storage and sets up dependencies.
 
             Args:
                 storage (object): The storage backend for the movie database, providing methods
                 to manage movies.
+                processes (int, optional): Worker processes for analytics of large catalogs;
+                                           defaults to one per core.
+                cache_budget (int, optional): Memory budget of the view cache in bytes.
         """
         self._storage = storage
-        self._crud = Crud(self._storage)
-        self._analytics = Analytics(self._storage)
-        self._webgenerator = WebGenerator(self._storage)
+        self._views = ViewCache(self._storage, cache_budget)
+        self._crud = Crud(self._storage, self._views)
+        self._analytics = Analytics(self._storage, processes, self._views)
+        self._webgenerator = WebGenerator(self._storage, views=self._views)
         self.menu_entries = [
             ("Exit", self.exit_command),
             ("List movies", self._crud.list_movies),
@@ -59,7 +69,13 @@ class MovieApp:
             ("Movies sorted by rating", self._analytics.sorted_by_rating),
             ("Movies sorted by year", self._analytics.sorted_by_year),
             ("Filter movies", self._analytics.filtered_movies),
-            ("Generate website", self._webgenerator.generate_website)
+            ("Generate website", self._webgenerator.generate_website),
+            ("Query movies", self._analytics.query_movies),
+            ("Deduplicate movies", Deduplicator(self._storage).deduplicate),
+            ("Refresh movie metadata", EnrichmentWorker(self._storage).refresh_metadata),
+            ("Approximate stats", self._analytics.show_approximate_statistics),
+            ("Batch edit movies", self._crud.batch_edit),
+            ("Full-text search", self._analytics.full_text_search)
         ]
 
     @staticmethod
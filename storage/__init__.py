@@ -1,11 +1,18 @@
-from pathlib import Path
+from .compression import COMPRESSIONS, storage_suffix
 from .storage_csv import StorageCsv
 from .storage_json import StorageJson
+from .movie import Movie, MovieCollection
+from .schema import SCHEMA_VERSION, SchemaVersionError
+from .async_storage import IAsyncStorage, AsyncStorageAdapter
 
 STORAGE_LOADERS = {
     '.csv': StorageCsv,
     '.json': StorageJson
 }
+# Every format can also be stored compressed, e.g. '.json.gz'
+STORAGE_LOADERS.update({suffix + compression: loader
+                        for suffix, loader in list(STORAGE_LOADERS.items())
+                        for compression in COMPRESSIONS})
 
 
 # Storage loaders mapping for each file type
@@ -13,11 +20,18 @@ def init_storage(path):
     """
         Initializes the storage handler based on the file extension.
     """
-    return STORAGE_LOADERS.get(Path(path).suffix)(path)
+    return STORAGE_LOADERS.get(storage_suffix(path))(path)
 
 
 def is_valid_path(storage_path):
     """
         Checks if the provided storage path has a valid file extension.
     """
-    return Path(storage_path).suffix in STORAGE_LOADERS
+    return storage_suffix(storage_path) in STORAGE_LOADERS
+
+
+def init_async_storage(path, executor=None):
+    """
+        Initializes an asyncio-friendly storage handler based on the file extension.
+    """
+    return AsyncStorageAdapter(init_storage(path), executor=executor)
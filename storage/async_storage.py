@@ -0,0 +1,146 @@
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from storage.istorage import IStorage
+
+
+class IAsyncStorage(ABC):
+    """
+        Asynchronous interface for movie storage operations.
+        Mirrors IStorage, but every method is a coroutine so callers running
+        inside an asyncio event loop never block on file I/O.
+    """
+
+    @abstractmethod
+    async def get_movies(self):
+        """
+            Retrieves movies from storage.
+
+            Returns:
+                dict: A dictionary containing movie data.
+        """
+
+    @abstractmethod
+    async def save_movies(self, dict_object: dict):
+        """
+            Saves movies to storage.
+
+            Args:
+                dict_object (dict): The dictionary object containing movie data to be saved.
+        """
+
+    async def add_movie(self, movie: dict):
+        """
+            Adds a new movie entry to the storage database.
+
+            Args:
+                movie (dict): Dictionary containing movie details (title, rating, etc.).
+        """
+        movies = await self.get_movies()
+        movies.update(movie)
+        await self.save_movies(movies)
+
+    async def delete_movie(self, title: str):
+        """
+            Removes a movie entry from storage by its title.
+
+            Args:
+                title (str): The title of the movie to be deleted.
+        """
+        movies = await self.get_movies()
+        if title in movies:
+            del movies[title]
+            await self.save_movies(movies)
+
+    async def update_movie(self, title: str, notes: str):
+        """
+            Updates the specified movie with additional notes.
+
+            Args:
+                title (str): The title of the movie to be updated.
+                notes (str): The notes to add to the movie.
+        """
+        movies = await self.get_movies()
+        if title in movies:
+            movies[title]["Notes"] = notes
+            await self.save_movies(movies)
+
+
+class AsyncStorageAdapter(IAsyncStorage):
+    """
+        Adapts any blocking IStorage backend to the IAsyncStorage interface.
+
+        Each call is offloaded to a thread pool, so the event loop keeps running
+        while the backend reads or writes its file. Mutations are serialized with
+        an asyncio lock, because the backends implement them as read-modify-write
+        cycles over the whole file.
+    """
+
+    def __init__(self, storage: IStorage, executor: ThreadPoolExecutor = None,
+                 max_workers: int = 4):
+        """
+            Initializes the adapter around a blocking storage backend.
+
+            Args:
+                storage (IStorage): The backend to wrap.
+                executor (ThreadPoolExecutor, optional): Executor used for file I/O.
+                                                         A private one is created if omitted.
+                max_workers (int, optional): Size of the private executor. Defaults to 4.
+        """
+        self._storage = storage
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers,
+                                                        thread_name_prefix="storage-io")
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def storage(self) -> IStorage:
+        """The wrapped blocking backend."""
+        return self._storage
+
+    async def _run(self, func, *args):
+        """
+            Runs a blocking callable in the executor and awaits its result.
+
+            Args:
+                func (callable): The blocking function to call.
+                *args: Positional arguments passed to the function.
+
+            Returns:
+                The return value of the function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def get_movies(self) -> dict:
+        return await self._run(self._storage.get_movies)
+
+    async def save_movies(self, dict_object: dict):
+        async with self._write_lock:
+            await self._run(self._storage.save_movies, dict_object)
+
+    async def add_movie(self, movie: dict):
+        async with self._write_lock:
+            await self._run(self._storage.add_movie, movie)
+
+    async def delete_movie(self, title: str):
+        async with self._write_lock:
+            await self._run(self._storage.delete_movie, title)
+
+    async def update_movie(self, title: str, notes: str):
+        async with self._write_lock:
+            await self._run(self._storage.update_movie, title, notes)
+
+    def close(self):
+        """
+            Shuts down the private executor, waiting for pending file operations.
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.close()
@@ -0,0 +1,101 @@
+import gzip
+import io
+from pathlib import Path
+from storage.locking import atomic_write
+try:
+    import zstandard
+except ImportError:  # Optional; .zst files are only supported if it is installed
+    zstandard = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Compression suffix -> (open a file for binary reading, wrap a binary file for writing)
+COMPRESSIONS = {
+    ".gz": (lambda path: gzip.open(path, "rb"),
+            # mtime=0 keeps the output identical for identical content
+            lambda raw: gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL,
+                                      mtime=0))
+}
+# Raised while reading a damaged compressed file
+DECOMPRESSION_ERRORS = (gzip.BadGzipFile, EOFError) + \
+    ((zstandard.ZstdError,) if zstandard is not None else ())
+if zstandard is not None:
+    COMPRESSIONS[".zst"] = (
+        lambda path: zstandard.open(path, "rb"),
+        lambda raw: zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw,
+                                                                             closefd=False))
+
+
+def compression_suffix(path):
+    """
+        Returns the compression suffix of a path.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            str | None: ".gz" or ".zst" if the file is compressed, else None.
+    """
+    suffix = Path(path).suffix
+    return suffix if suffix in COMPRESSIONS else None
+
+
+def storage_suffix(path):
+    """
+        Returns the suffix that selects the storage format, including compression.
+
+        Args:
+            path (str): The file path.
+
+        Returns:
+            str: E.g. ".json", ".csv" or ".json.gz".
+    """
+    if compression_suffix(path):
+        return "".join(Path(path).suffixes[-2:])
+    return Path(path).suffix
+
+
+def open_text(path, newline=None):
+    """
+        Opens a possibly compressed UTF-8 file for reading text.
+
+        Compressed files are decompressed while they are read, without loading
+        the compressed data into memory first.
+
+        Args:
+            path (str): The file path.
+            newline (str, optional): Newline handling as for open().
+
+        Returns:
+            TextIO: The open file.
+    """
+    suffix = compression_suffix(path)
+    if suffix is None:
+        return open(path, "r", encoding="utf-8", newline=newline)
+    return io.TextIOWrapper(COMPRESSIONS[suffix][0](path), encoding="utf-8", newline=newline)
+
+
+def write_text(path, write_func, newline=None):
+    """
+        Atomically writes a possibly compressed UTF-8 file.
+
+        The text is compressed while write_func produces it, so the uncompressed
+        content never exists as a whole.
+
+        Args:
+            path (str): The file path.
+            write_func (callable): Called with the open text file object.
+            newline (str, optional): Newline handling as for open().
+    """
+    suffix = compression_suffix(path)
+    if suffix is None:
+        atomic_write(path, write_func, newline=newline)
+        return
+
+    def write_compressed(raw):
+        with io.TextIOWrapper(COMPRESSIONS[suffix][1](raw), encoding="utf-8",
+                              newline=newline) as file:
+            write_func(file)
+
+    atomic_write(path, write_compressed, mode="wb")
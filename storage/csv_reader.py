@@ -0,0 +1,447 @@
+import csv
+import gc
+import io
+import itertools
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from storage.compression import compression_suffix, open_text
+from storage.movie import Movie, MovieCollection
+from storage.schema import (LEGACY_VERSION, SCHEMA_VERSION, migrate_movie,
+                            parse_schema_comment, schema_comment)
+
+# Columns written by the streaming rewrite, in the order the application writes them
+COLUMNS = ("Title", "Year", "Rating", "Poster", "IMDB Link", "Notes")
+# Normalized header name -> storage field, so "title" and "Title" both work
+HEADER_FIELDS = {
+    "title": "Title",
+    "rating": "Rating",
+    "year": "Year",
+    "poster": "Poster",
+    "imdb link": "IMDB Link",
+    "notes": "Notes"
+}
+REQUIRED_FIELDS = ("Title", "Rating", "Year")
+BATCH_SIZE = 4096
+# Files smaller than this are always parsed in a single process
+PARALLEL_THRESHOLD = 4 * 1024 * 1024
+
+
+class CsvSchemaError(csv.Error):
+    """Raised when the CSV header lacks a required column."""
+
+
+@contextmanager
+def gc_paused():
+    """
+        Pauses the cyclic garbage collector while a catalog is being built.
+
+        Loading creates hundreds of thousands of container objects and no cycles,
+        so the collections triggered along the way only cost time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def map_header(header):
+    """
+        Maps a CSV header row to the column index of every known field.
+
+        Args:
+            header (list): The header cells.
+
+        Returns:
+            dict: Storage field name -> column index.
+
+        Raises:
+            CsvSchemaError: If a required column is missing.
+    """
+    columns = {}
+    for index, name in enumerate(header):
+        field = HEADER_FIELDS.get(name.strip().lower())
+        if field and field not in columns:
+            columns[field] = index
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        raise CsvSchemaError(f"Missing column(s): {', '.join(missing)}")
+    return columns
+
+
+def read_header(file):
+    """
+        Reads the schema comment, if there is one, and the header row of a CSV file.
+
+        Args:
+            file (TextIO): The file, opened with newline="" at its start.
+
+        Returns:
+            tuple: The schema version, the header cells, the byte offset of the first
+                   data row and its line number.
+
+        Raises:
+            SchemaVersionError: If the file was written with a newer schema.
+    """
+    line = file.readline()
+    version = parse_schema_comment(line)
+    offset, first_line = 0, 2
+    if version is None:
+        version = LEGACY_VERSION
+    else:
+        offset, first_line = len(line.encode("utf-8")), 3
+        line = file.readline()
+    header = next(csv.reader([line]), [])
+    return version, header, offset + len(line.encode("utf-8")), first_line
+
+
+def row_lines(batch, first_line):
+    """
+        Computes the line number each row of a batch starts on.
+
+        Rows are usually one line each, but quoted fields may contain newlines,
+        so the newlines inside the fields are counted as well.
+
+        Args:
+            batch (list): Raw rows as returned by csv.reader.
+            first_line (int): Line number of the first row.
+
+        Returns:
+            list: The starting line number of every row.
+    """
+    lines = []
+    line = first_line
+    for row in batch:
+        lines.append(line)
+        line += 1 + sum(field.count("\n") for field in row)
+    return lines
+
+
+def optional_number(cell, convert):
+    """
+        Converts a numeric cell, None if it is empty.
+
+        Raises:
+            ValueError: If the cell is neither empty nor a number.
+    """
+    return convert(cell) if cell.strip() else None
+
+
+# pylint: disable=too-many-locals,too-many-branches
+def convert_batch(batch, columns, first_line, version=SCHEMA_VERSION):
+    """
+        Converts a batch of raw rows into typed movie tuples.
+
+        The numeric columns of the whole batch are converted with map(), which
+        stays in C. Only if that fails is the batch converted row by row to
+        find the malformed rows; an empty rating or year is None there.
+
+        Rows of an older schema are not type-checked but upgraded: the upgrade
+        reads their text values, such as "N/A" ratings or "2008–2013" years.
+
+        Args:
+            batch (list): Raw rows as returned by csv.reader.
+            columns (dict): Storage field name -> column index.
+            first_line (int): Line number of the first row, used for rejects.
+            version (int, optional): The schema version of the file.
+
+        Returns:
+            tuple: A list of (title, rating, year, poster, link, notes) tuples in the
+                   current schema and a list of (line number, reason, row) rejects.
+    """
+    title_i, rating_i, year_i = columns["Title"], columns["Rating"], columns["Year"]
+    poster_i, link_i, notes_i = (columns.get("Poster"), columns.get("IMDB Link"),
+                                 columns.get("Notes"))
+    width = max(columns.values()) + 1
+    rows = [row for row in batch if len(row) >= width and row[title_i].strip()]
+    legacy = version < SCHEMA_VERSION
+    if legacy:
+        ratings = [row[rating_i] for row in rows]
+        years = [row[year_i] for row in rows]
+    else:
+        try:
+            ratings = list(map(float, [row[rating_i] for row in rows]))
+            years = list(map(int, [row[year_i] for row in rows]))
+        except ValueError:
+            ratings = years = None
+
+    rejects = []
+    if ratings is None or len(rows) != len(batch):
+        rows, ratings, years = [], [], []
+        for line, row in zip(row_lines(batch, first_line), batch):
+            if not row:
+                continue
+            if len(row) < width:
+                rejects.append((line, f"expected at least {width} fields, got {len(row)}",
+                                row))
+                continue
+            if not row[title_i].strip():
+                rejects.append((line, "empty title", row))
+                continue
+            if legacy:
+                rating, year = row[rating_i], row[year_i]
+            else:
+                try:
+                    rating = optional_number(row[rating_i], float)
+                    year = optional_number(row[year_i], int)
+                except ValueError as err:
+                    rejects.append((line, str(err), row))
+                    continue
+            rows.append(row)
+            ratings.append(rating)
+            years.append(year)
+
+    movies = [(row[title_i], rating, year,
+               row[poster_i] if poster_i is not None else None,
+               row[link_i] if link_i is not None else None,
+               row[notes_i] if notes_i is not None else "")
+              for row, rating, year in zip(rows, ratings, years)]
+    if legacy:
+        movies = [(title, movie.rating, movie.year, movie.poster, movie.imdb_link, movie.notes)
+                  for title, movie in ((title, migrate_movie(Movie(*values), version))
+                                       for title, *values in movies)]
+    return movies, rejects
+# pylint: enable=too-many-locals,too-many-branches
+
+
+def iter_batches(text, columns, first_line, version=SCHEMA_VERSION):
+    """
+        Parses CSV data rows lazily, one batch at a time.
+
+        Args:
+            text (iterable): Lines of CSV data without the header.
+            columns (dict): Storage field name -> column index.
+            first_line (int): Line number of the first line in the text.
+            version (int, optional): The schema version of the file.
+
+        Yields:
+            tuple: The typed movie tuples and the rejects of a batch, as in convert_batch.
+    """
+    reader = csv.reader(text)
+    line = first_line
+    while batch := list(itertools.islice(reader, BATCH_SIZE)):
+        yield convert_batch(batch, columns, line, version)
+        line = first_line + reader.line_num
+
+
+def parse_lines(text, columns, first_line, version=SCHEMA_VERSION):
+    """
+        Parses CSV data rows in batches.
+
+        Args:
+            text (iterable): Lines of CSV data without the header.
+            columns (dict): Storage field name -> column index.
+            first_line (int): Line number of the first line in the text.
+            version (int, optional): The schema version of the file.
+
+        Returns:
+            tuple: The typed movie tuples and the rejects, as in convert_batch.
+    """
+    movies, rejects = [], []
+    for batch_movies, batch_rejects in iter_batches(text, columns, first_line, version):
+        movies.extend(batch_movies)
+        rejects.extend(batch_rejects)
+    return movies, rejects
+
+
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments
+def _parse_chunk(path, start, end, columns, first_line, version):
+    """
+        Process pool worker: parses the byte range [start, end) of a CSV file.
+    """
+    with open(path, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    with gc_paused():
+        return parse_lines(io.StringIO(data.decode("utf-8"), newline=""), columns, first_line,
+                           version)
+
+
+def split_chunks(data, start, workers, first_line=2):
+    """
+        Splits the data rows of a CSV file into byte ranges that end on record boundaries.
+
+        A boundary is only accepted at a newline outside of any quoted field,
+        which is the case when the number of quote characters before it is even.
+
+        Args:
+            data (mmap | bytes): The file content.
+            start (int): Offset of the first data row.
+            workers (int): Number of chunks to aim for.
+            first_line (int, optional): Line number of the first data row.
+
+        Returns:
+            list: (start, end, first line number) tuples.
+    """
+    size = len(data)
+    step = max((size - start) // workers, 1)
+    chunks = []
+    line = first_line
+    inside_quotes = False
+    position = start
+    while position < size:
+        end = min(position + step, size)
+        # Only the start of the last line in the range is a candidate boundary
+        candidate = data.rfind(b"\n", position, end) + 1 if end < size else end
+        scanned = candidate if candidate > position else position
+        inside_quotes ^= data[position:scanned].count(b'"') % 2 == 1
+        while scanned < size and (inside_quotes or scanned == position):
+            newline = data.find(b"\n", scanned)
+            end_of_line = size if newline == -1 else newline + 1
+            inside_quotes ^= data[scanned:end_of_line].count(b'"') % 2 == 1
+            scanned = end_of_line
+        chunks.append((position, scanned, line))
+        line += data[position:scanned].count(b"\n")
+        position = scanned
+    return chunks
+
+
+def write_rejects(reject_path, rejects):
+    """
+        Appends malformed rows to a sidecar CSV file.
+
+        The next save drops the rows from the storage file, so the sidecar is
+        their only copy: it is never truncated or removed here, and rows it
+        already holds are not added again. Users delete it, or rows from it,
+        once they have fixed or discarded them.
+
+        Args:
+            reject_path (str): Path of the sidecar file.
+            rejects (list): (line number, reason, row) tuples.
+    """
+    if not rejects:
+        return
+    known = set()
+    try:
+        with open(reject_path, newline="", encoding="utf-8") as file:
+            known.update(tuple(row[2:]) for row in itertools.islice(csv.reader(file), 1, None))
+    except FileNotFoundError:
+        pass
+    new = [reject for reject in sorted(rejects, key=lambda reject: reject[0])
+           if tuple(reject[2]) not in known]
+    if not new:
+        return
+    exists = os.path.exists(reject_path)
+    with open(reject_path, "a", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        if not exists:
+            writer.writerow(["Line", "Reason", "Row"])
+        for line, reason, row in new:
+            writer.writerow([line, reason, *row])
+
+
+def read_movies_csv(path, reject_path=None, workers=None):  # pylint: disable=too-many-locals
+    """
+        Reads a movie CSV file, optionally compressed, into a MovieCollection.
+
+        Rows are read as tuples and mapped through a fixed header-to-column
+        mapping. Malformed rows do not abort the load; they are written with their
+        line numbers to the reject file. Records of an older schema are upgraded.
+
+        Args:
+            path (str): The CSV file.
+            reject_path (str, optional): Sidecar file for malformed rows.
+                                         Defaults to "<path>.rejects.csv".
+            workers (int, optional): Number of processes used for uncompressed files
+                                     larger than PARALLEL_THRESHOLD. Defaults to single
+                                     process.
+
+        Returns:
+            tuple: The MovieCollection and the number of rejected rows.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            CsvSchemaError: If the header lacks a required column.
+            SchemaVersionError: If the file was written with a newer schema.
+    """
+    reject_path = reject_path or f"{path}.rejects.csv"
+    with open_text(path, newline="") as file, gc_paused():
+        version, header, data_start, first_line = read_header(file)
+        if not any(cell.strip() for cell in header):
+            return MovieCollection(), 0
+        columns = map_header(header)
+
+        # Compressed files can only be decompressed from the start, so they are read serially
+        if workers and workers > 1 and compression_suffix(path) is None and \
+                os.path.getsize(path) > PARALLEL_THRESHOLD:
+            movies, rejects = _parse_parallel(path, data_start, first_line, columns, workers,
+                                              version)
+        else:
+            movies, rejects = parse_lines(file, columns, first_line, version)
+
+        collection = MovieCollection()
+        for title, rating, year, poster, link, notes in movies:
+            dict.__setitem__(collection, title, Movie(rating, year, poster, link, notes))
+    write_rejects(reject_path, rejects)
+    return collection, len(rejects)
+
+
+def iter_movies_csv(path, rejects=None):
+    """
+        Streams the movies of a CSV file, optionally compressed, without loading it whole.
+
+        Memory use is bounded by one batch of rows. Malformed rows are skipped;
+        read_movies_csv reports them.
+
+        Args:
+            path (str): The CSV file.
+            rejects (list, optional): Receives the (line number, reason, row) tuples of
+                                      the malformed rows.
+
+        Yields:
+            tuple: (title, Movie) pairs in file order, upgraded to the current schema.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            CsvSchemaError: If the header lacks a required column.
+            SchemaVersionError: If the file was written with a newer schema.
+    """
+    with open_text(path, newline="") as file:
+        version, header, _, first_line = read_header(file)
+        if not any(cell.strip() for cell in header):
+            return
+        for movies, batch_rejects in iter_batches(file, map_header(header), first_line,
+                                                  version):
+            if rejects is not None:
+                rejects.extend(batch_rejects)
+            for title, rating, year, poster, link, notes in movies:
+                yield title, Movie(rating, year, poster, link, notes)
+
+
+def write_movies_csv(file, items):
+    """
+        Writes movies as CSV rows one at a time, after the schema comment and the header.
+
+        Args:
+            file (TextIO): The file, opened with newline="".
+            items (iterable): (title, Movie) pairs.
+    """
+    file.write(schema_comment())
+    writer = csv.writer(file)
+    writer.writerow(COLUMNS)
+    for title, movie in items:
+        writer.writerow((title, movie.year, movie.rating, movie.poster, movie.imdb_link,
+                         movie.notes))
+
+
+# pylint: disable-next=too-many-arguments,too-many-positional-arguments,too-many-locals
+def _parse_parallel(path, data_start, first_line, columns, workers, version):
+    """
+        Parses the data rows of a CSV file in parallel chunks.
+    """
+    with open(path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunks = split_chunks(data, data_start, workers, first_line)
+    movies, rejects = [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_chunk, path, start, end, columns, line, version)
+                   for start, end, line in chunks]
+        for future in futures:
+            chunk_movies, chunk_rejects = future.result()
+            movies.extend(chunk_movies)
+            rejects.extend(chunk_rejects)
+    return movies, rejects
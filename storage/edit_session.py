@@ -0,0 +1,172 @@
+from storage.movie import Movie, MovieCollection
+
+ADD, DELETE, NOTE = "add", "delete", "note"
+
+
+def merge_movie(movies, title, details):
+    """
+        Stores a movie, merging it into an entry with the same IMDb ID if there is one.
+
+        The existing entry keeps its title, and its notes unless the new details
+        have notes of their own.
+
+        Args:
+            movies (MovieCollection): The movies to change.
+            title (str): The title of the new movie.
+            details (Mapping): The movie details.
+
+        Returns:
+            str: The title the movie is stored under.
+    """
+    details = Movie.from_dict(details)
+    existing = movies.title_for_imdb_id(details.imdb_id)
+    if existing is not None:
+        if not details.notes:
+            details.notes = movies[existing].notes
+        title = existing
+    movies[title] = details
+    return title
+
+
+def apply_operation(movies, operation):
+    """
+        Applies one queued edit to a movie collection.
+
+        Args:
+            movies (MovieCollection): The movies to change.
+            operation (tuple): (kind, title, value) as queued by EditSession.
+
+        Returns:
+            str | None: The title that was changed, or None if the edit did not apply
+                        because the movie no longer exists.
+    """
+    kind, title, value = operation
+    if kind == ADD:
+        return merge_movie(movies, title, value.copy())
+    if title not in movies:
+        return None
+    if kind == DELETE:
+        del movies[title]
+    else:
+        movies[title].notes = value
+    return title
+
+
+class EditSession:
+    """
+        A batch of edits kept in memory and saved together.
+
+        Adds, deletes and note updates are recorded in an operation log of
+        (kind, title, value) tuples instead of being saved one by one. undo()
+        and redo() move a cursor through the log. commit() replays the log on
+        the stored movies in one save. If another writer saved since the session
+        started, the edits are replayed on the new data, and edits whose movie
+        is gone are reported instead of applied.
+
+        Attributes:
+            storage (IStorage): The storage the session edits.
+            base_version (int): The storage version when the session started.
+    """
+
+    def __init__(self, storage):
+        """
+            Starts a session on the current content of a storage.
+
+            Args:
+                storage (IStorage): The storage to edit.
+        """
+        self.storage = storage
+        self.base_version = storage.version()
+        self._base = MovieCollection.wrap(storage.get_movies())
+        self._log = []
+        self._cursor = 0
+        self._view = None
+
+    @property
+    def operations(self):
+        """The edits that are in effect, oldest first."""
+        return self._log[:self._cursor]
+
+    def _record(self, operation):
+        """
+            Appends an edit, discarding the edits that could have been redone.
+        """
+        del self._log[self._cursor:]
+        self._log.append(operation)
+        self._cursor += 1
+        if self._view is not None:
+            apply_operation(self._view, operation)
+
+    def add_movie(self, movie: dict):
+        """
+            Queues adding movies, given as a dictionary keyed by title.
+        """
+        for title, details in movie.items():
+            self._record((ADD, title, Movie.from_dict(details).copy()))
+
+    def delete_movie(self, title: str):
+        """
+            Queues deleting a movie.
+        """
+        self._record((DELETE, title, None))
+
+    def update_movie(self, title: str, notes: str):
+        """
+            Queues replacing the notes of a movie.
+        """
+        self._record((NOTE, title, notes))
+
+    def undo(self):
+        """
+            Takes back the latest edit in effect.
+
+            Returns:
+                tuple | None: The edit, or None if there is nothing to undo.
+        """
+        if self._cursor == 0:
+            return None
+        self._cursor -= 1
+        self._view = None
+        return self._log[self._cursor]
+
+    def redo(self):
+        """
+            Re-applies the latest undone edit.
+
+            Returns:
+                tuple | None: The edit, or None if there is nothing to redo.
+        """
+        if self._cursor == len(self._log):
+            return None
+        operation = self._log[self._cursor]
+        self._cursor += 1
+        if self._view is not None:
+            apply_operation(self._view, operation)
+        return operation
+
+    def get_movies(self):
+        """
+            Returns the movies as they will be after the commit, assuming no other writer.
+
+            Returns:
+                MovieCollection: The movies with the edits applied.
+        """
+        if self._view is None:
+            self._view = self._base.copy()
+            for operation in self.operations:
+                apply_operation(self._view, operation)
+        return self._view
+
+    def commit(self):
+        """
+            Saves all edits in effect with a single write and ends the session.
+
+            Returns:
+                list: The edits that could not be applied because their movie was
+                      deleted or renamed by another writer in the meantime.
+        """
+        skipped = self.storage.apply_edits(self.operations)
+        self._log, self._cursor, self._view = [], 0, None
+        self._base = MovieCollection.wrap(self.storage.get_movies())
+        self.base_version = self.storage.version()
+        return skipped
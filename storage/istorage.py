@@ -1,4 +1,31 @@
+import random
+import time
 from abc import ABC, abstractmethod
+from storage.locking import FileLock
+from storage.edit_session import EditSession, apply_operation, merge_movie
+from storage.movie import MovieCollection
+from storage.schema import SCHEMA_VERSION
+from storage.snapshot import Snapshot
+
+# Optimistic attempts before a writer falls back to holding the lock throughout
+MAX_WRITE_ATTEMPTS = 10
+
+
+def apply_save(titles, movies, update, remove):
+    """
+        Replays the titles a save touched onto a listener's own copy of the movies.
+
+        Args:
+            titles (iterable): The titles the save added, changed or removed.
+            movies (Mapping): The saved movies.
+            update (callable): Called as update(title, movie) for each saved title.
+            remove (callable): Called as remove(title) for each removed title.
+    """
+    for title in titles:
+        if title in movies:
+            update(title, movies[title])
+        else:
+            remove(title)
 
 
 class IStorage(ABC):
@@ -6,18 +33,155 @@ class IStorage(ABC):
         Interface for movie storage operations.
         Defines the methods required for getting, saving, adding, updating,
         and deleting movies from a storage source.
+
+        Writes are coordinated between processes: every save takes a short
+        advisory lock and bumps a version counter, and the add, delete and update
+        methods use that counter for optimistic concurrency. They read without
+        locking, and if another process saved in the meantime they retry against
+        the fresh data instead of overwriting it. Readers never take the lock.
+
+        Files carry the version of their record schema. Files in an older schema
+        are upgraded record by record while they are read and written in the
+        current schema by the next save; migrate() upgrades them at once.
+
+        Large catalogs are loaded from a warm-start snapshot next to the file
+        while the file is unchanged; the snapshot is rebuilt in the background
+        after every read of the file and every save.
     """
 
-    @abstractmethod
+    def __init__(self, filepath: str):
+        """
+            Initializes the storage bookkeeping shared by all file backends.
+
+            Args:
+                filepath (str): The path to the storage file.
+        """
+        self._database = filepath
+        self._file_lock = FileLock(filepath)
+        self._snapshot = Snapshot(filepath)
+        self._listeners = []
+
     def get_movies(self):
         """
             Retrieves movies from storage.
 
+            The movies come from the snapshot if it matches the file; otherwise
+            the file is read and a new snapshot is written in the background.
+
+            Returns:
+                dict: A dictionary containing movie data.
+        """
+        movies = self._snapshot.load()
+        if movies is None:
+            key = self._snapshot.stat()
+            movies = self._read_movies()
+            if self._snapshot.stat() == key:
+                self._snapshot.write_later(movies, key)
+        return movies
+
+    @abstractmethod
+    def _read_movies(self):
+        """
+            Reads and parses all movies from the storage file.
+
             Returns:
                 dict: A dictionary containing movie data.
         """
 
+    def iter_movies(self):
+        """
+            Iterates over the stored movies.
+
+            Backends that can read their file incrementally override this to
+            stream the movies with bounded memory; the default loads them all.
+
+            Yields:
+                tuple: (title, Movie) pairs.
+        """
+        yield from MovieCollection.wrap(self.get_movies()).items()
+
+    @abstractmethod
+    def schema_version(self) -> int:
+        """
+            Reads the schema version of the storage file without loading the movies.
+
+            Returns:
+                int: The version, LEGACY_VERSION for files without a schema header.
+
+            Raises:
+                SchemaVersionError: If the file was written with a newer schema.
+        """
+
     @abstractmethod
+    def _write_movies(self, dict_object: dict):
+        """
+            Writes movies to the storage file, replacing it atomically.
+            Called with the storage lock held.
+
+            Args:
+                dict_object (dict): The dictionary object containing movie data to be saved.
+        """
+
+    def _stored(self, movies):
+        """
+            Returns the movies as they read back from the file after a write.
+
+            The listeners and the snapshot get these instead of the movies that
+            were written, so they never hold more than the file does. Backends
+            that cannot store every field override this; the default returns the
+            movies unchanged.
+
+            Args:
+                movies (Mapping): The movies that were written.
+
+            Returns:
+                Mapping: The movies as stored.
+        """
+        return movies
+
+    @property
+    def path(self) -> str:
+        """The path to the storage file."""
+        return self._database
+
+    def version(self) -> int:
+        """
+            Returns the storage version, incremented by every save from any process.
+
+            Returns:
+                int: The current version.
+        """
+        return self._file_lock.version()
+
+    def invalidate(self):
+        """
+            Bumps the version without writing, so that caches keyed by the version
+            reload. Used when the file was changed outside this application.
+        """
+        with self._file_lock as lock:
+            lock.bump()
+
+    def add_listener(self, listener):
+        """
+            Registers a callback that is told about every save made through this object.
+
+            The callback is called after the write as listener(titles, movies, version):
+            the titles that were added, changed or removed (None if the whole
+            collection was replaced), the saved movies and the new version. Saves
+            by other processes are not reported; compare version() to notice them.
+
+            Args:
+                listener (callable): The callback.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, titles, movies, version):
+        """
+            Reports a save to the registered listeners.
+        """
+        for listener in self._listeners:
+            listener(titles, movies, version)
+
     def save_movies(self, dict_object: dict):
         """
             Saves movies to storage.
@@ -25,17 +189,73 @@ class IStorage(ABC):
             Args:
                 dict_object (dict): The dictionary object containing movie data to be saved.
         """
+        with self._file_lock as lock:
+            self._write_movies(dict_object)
+            written = self._snapshot.stat()
+            version = lock.bump()
+        stored = self._stored(dict_object)
+        self._notify(None, stored, version)
+        self._snapshot.write_later(stored, written)
+
+    def _commit(self, change, titles=None):
+        """
+            Applies a change to the stored movies with optimistic concurrency.
+
+            The movies are read without locking. The lock is only taken to check
+            that no other writer bumped the version since the read and to write the
+            result; on a conflict the change is retried on freshly read data. A
+            writer that keeps losing the race finally reads, changes and writes
+            with the lock held, so it cannot be starved by busier writers.
+
+            Args:
+                change (callable): Modifies the movies dictionary in place and returns
+                                   False if there is nothing to save.
+                titles (list, optional): The titles the change touches, reported to the
+                                         listeners. May be filled in by the change itself.
+        """
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            version = self.version()
+            movies = MovieCollection.wrap(self.get_movies())
+            if change(movies) is False:
+                return
+            with self._file_lock as lock:
+                if lock.version() == version:
+                    self._write_movies(movies)
+                    written = self._snapshot.stat()
+                    version = lock.bump()
+                    break
+            time.sleep(random.uniform(0, 0.001 * (attempt + 1)))
+        else:
+            with self._file_lock as lock:
+                movies = MovieCollection.wrap(self.get_movies())
+                if change(movies) is False:
+                    return
+                self._write_movies(movies)
+                written = self._snapshot.stat()
+                version = lock.bump()
+        movies = self._stored(movies)
+        self._notify(titles, movies, version)
+        self._snapshot.write_later(movies, written)
 
     def add_movie(self, movie: dict):
         """
             Adds a new movie entry to the storage database.
 
+            Movies are identified by their IMDb ID: if a movie with the same ID is
+            already stored under another title (a different spelling or an older
+            OMDb title), that entry is updated instead of adding a duplicate, and
+            its notes are kept unless the new entry has notes of its own.
+
             Args:
                 movie (dict): Dictionary containing movie details (title, rating, etc.).
         """
-        movies = self.get_movies()
-        movies.update(movie)
-        self.save_movies(movies)
+        titles = []
+
+        def change(movies):
+            titles.clear()
+            for title, details in movie.items():
+                titles.append(merge_movie(movies, title, details))
+        self._commit(change, titles)
 
     def delete_movie(self, title: str):
         """
@@ -44,10 +264,12 @@ class IStorage(ABC):
             Args:
                 title (str): The title of the movie to be deleted.
         """
-        movies = self.get_movies()
-        if title in movies:
+        def change(movies):
+            if title not in movies:
+                return False
             del movies[title]
-            self.save_movies(movies)
+            return True
+        self._commit(change, [title])
 
     def update_movie(self, title: str, notes: str):
         """
@@ -57,7 +279,149 @@ class IStorage(ABC):
                 title (str): The title of the movie to be updated.
                 notes (str): The notes to add to the movie.
         """
-        movies = self.get_movies()
-        if title in movies:
+        def change(movies):
+            if title not in movies:
+                return False
             movies[title]["Notes"] = notes
-            self.save_movies(movies)
+            return True
+        self._commit(change, [title])
+
+    def update_details(self, updates: dict):
+        """
+            Updates fields of several movies in a single write.
+
+            Movies that were deleted in the meantime are skipped, and fields not
+            mentioned in the updates, such as the notes, are left as they are.
+
+            Args:
+                updates (dict): Title -> dictionary of the fields to set.
+        """
+        def change(movies):
+            changed = False
+            for title, fields in updates.items():
+                if title in movies:
+                    for field, value in fields.items():
+                        movies[title][field] = value
+                    changed = True
+            return changed
+        self._commit(change, list(updates))
+
+    def replace_movies(self, upserts: dict, deletes=()):
+        """
+            Stores and removes several movies exactly as given, in a single write.
+
+            Unlike add_movie(), nothing is merged by IMDb ID and the notes are not
+            kept, so that a catalog can be made identical to another one.
+
+            Args:
+                upserts (dict): Title -> details of the movies to store.
+                deletes (iterable, optional): Titles of the movies to remove.
+        """
+        deletes = list(deletes)
+
+        def change(movies):
+            if not upserts and not any(title in movies for title in deletes):
+                return False
+            for title in deletes:
+                movies.pop(title, None)
+            for title, details in upserts.items():
+                movies[title] = details
+            return True
+        self._commit(change, [*upserts, *deletes])
+
+    def apply_edits(self, operations):
+        """
+            Applies a batch of queued edits with a single write.
+
+            Args:
+                operations (list): (kind, title, value) edits as recorded by EditSession.
+
+            Returns:
+                list: The edits that did not apply because their movie no longer exists.
+        """
+        titles, skipped = [], []
+
+        def change(movies):
+            titles.clear()
+            skipped.clear()
+            for operation in operations:
+                title = apply_operation(movies, operation)
+                if title is None:
+                    skipped.append(operation)
+                else:
+                    titles.append(title)
+            return bool(titles)
+        self._commit(change, titles)
+        return skipped
+
+    def merge_movies(self, clusters, merge) -> int:
+        """
+            Merges clusters of duplicate movies with a single write.
+
+            The clusters are merged into the movies as stored at the time of the
+            write, so edits other writers made since the clusters were found are
+            kept. Titles deleted in the meantime are left out of their cluster.
+
+            Args:
+                clusters (list): Lists of titles; each is merged into its first title.
+                merge (callable): merge(movies, clusters) returning the merged movies
+                                  under the first title of each cluster.
+
+            Returns:
+                int: The number of duplicates that were merged away.
+        """
+        titles, removed = [], []
+
+        def change(movies):
+            present = [[title for title in cluster if title in movies] for cluster in clusters]
+            present = [cluster for cluster in present if len(cluster) > 1]
+            titles[:] = [title for cluster in present for title in cluster]
+            removed[:] = [title for cluster in present for title in cluster[1:]]
+            if not present:
+                return False
+            merged = merge({title: movies[title] for title in titles}, present)
+            for cluster in present:
+                movies[cluster[0]] = merged[cluster[0]]
+            for title in removed:
+                del movies[title]
+            return True
+        self._commit(change, titles)
+        return len(removed)
+
+    def edit(self):
+        """
+            Starts a transactional editing session on this storage.
+
+            Returns:
+                EditSession: The session; nothing is saved until its commit().
+        """
+        return EditSession(self)
+
+    def migrate(self) -> bool:
+        """
+            Rewrites the storage file in the current schema.
+
+            The file is rewritten with the lock held, streaming the records from
+            the old file to the new one where the backend supports it, so even
+            catalogs larger than the memory can be migrated. The version is
+            bumped, so caches reload the upgraded records.
+
+            Returns:
+                bool: False if the file already was in the current schema.
+        """
+        with self._file_lock as lock:
+            if self.schema_version() == SCHEMA_VERSION:
+                return False
+            self._rewrite_movies()
+            lock.bump()
+        return True
+
+    def _rewrite_movies(self):
+        """
+            Writes the stored movies back in the current schema. Called with the
+            storage lock held.
+
+            Backends that can stream their file override this; the default loads
+            all movies.
+        """
+        self._write_movies(self.get_movies())
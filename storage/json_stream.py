@@ -0,0 +1,123 @@
+import json
+import re
+from storage.movie import Movie, movie_json_default
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Separators that lay out a flat object as json.dump(indent=4) does one level down
+NESTED_SEPARATORS = (",\n" + " " * 8, ": ")
+
+
+def iter_json_object(file, chunk_size: int = CHUNK_SIZE):
+    """
+        Parses the top-level JSON object of a file one member at a time.
+
+        Only the member being parsed is held in memory, so files far larger than
+        the memory can be read. Every value is decoded by the json module.
+
+        Args:
+            file (TextIO): The open file.
+            chunk_size (int, optional): Characters read at a time.
+
+        Yields:
+            tuple: (key, value) pairs in file order.
+
+        Raises:
+            JSONDecodeError: If the file is not a JSON object.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            fill()
+
+    def next_value():
+        nonlocal pos
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    def expect(chars, message):
+        nonlocal pos
+        char = next_char()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(message, buffer, pos)
+        pos += 1
+        return char
+
+    expect("{", "Expecting '{'")
+    if next_char() == "}":
+        return
+    while True:
+        if next_char() != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes",
+                                       buffer, pos)
+        key = next_value()
+        expect(":", "Expecting ':' delimiter")
+        yield key, next_value()
+        if expect(",}", "Expecting ',' delimiter") == "}":
+            return
+
+
+def write_json_object(file, items, compact: bool = False):
+    """
+        Writes (key, value) pairs as a JSON object, one member at a time.
+
+        The output is laid out as json.dump() lays out the whole object, with
+        an indent of 4 or without spaces, but the object never has to exist
+        in memory as a whole.
+
+        Args:
+            file (TextIO): The open file.
+            items (iterable): (key, value) pairs; Movie values are written as dicts.
+            compact (bool, optional): Write without indentation and spaces.
+    """
+    file.write("{")
+    written = False
+    for key, value in items:
+        text = _dump_member(key, value, compact)
+        file.write("," + text if written else text)
+        written = True
+    file.write("\n}" if written and not compact else "}")
+
+
+def _dump_member(key, value, compact):
+    """
+        Formats one member of the top-level object, without a separator.
+
+        json.dumps() only uses its C encoder without indentation, so a flat
+        record, such as a movie, is indented through the separators instead.
+    """
+    if compact:
+        return json.dumps({key: value}, ensure_ascii=False, default=movie_json_default,
+                          separators=(",", ":"))[1:-1]
+    if isinstance(value, Movie):
+        value = value.to_dict()
+    if isinstance(value, dict) and value and \
+            not any(isinstance(item, (dict, list, tuple)) for item in value.values()):
+        return (f"\n    {json.dumps(key, ensure_ascii=False)}: {{\n        "
+                f"{json.dumps(value, ensure_ascii=False, separators=NESTED_SEPARATORS)[1:-1]}"
+                "\n    }")
+    # Strip the braces and the newline before the closing one
+    return json.dumps({key: value}, ensure_ascii=False, default=movie_json_default,
+                      indent=4)[1:-2]
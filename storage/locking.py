@@ -0,0 +1,119 @@
+import os
+import stat
+import tempfile
+import threading
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; locking degrades to in-process only
+    fcntl = None
+
+VERSION_WIDTH = 20
+
+
+class FileLock:
+    """
+        Advisory inter-process lock and version counter for a storage file.
+
+        The lock lives in a "<file>.lock" sidecar which also holds the version
+        counter as a fixed-width number. Writers take the lock only for the short
+        moment they check the version and replace the data file; readers read the
+        counter and the data file without taking the lock at all.
+
+        Attributes:
+            path (str): Path to the lock file.
+    """
+
+    def __init__(self, database: str):
+        """
+            Initializes the lock for a storage file.
+
+            Args:
+                database (str): Path to the storage file the lock protects.
+        """
+        self.path = f"{database}.lock"
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except OSError:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        finally:
+            self._fd = None
+            self._thread_lock.release()
+
+    def version(self) -> int:
+        """
+            Reads the current version counter without taking the lock.
+
+            Returns:
+                int: The version, or 0 if the file has never been written.
+        """
+        try:
+            with open(self.path, "rb") as file:
+                raw = file.read(VERSION_WIDTH)
+            return int(raw) if raw.strip() else 0
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        """
+            Increments the version counter. Must be called while holding the lock.
+
+            Returns:
+                int: The new version.
+        """
+        new_version = self.version() + 1
+        os.pwrite(self._fd, str(new_version).zfill(VERSION_WIDTH).encode("ascii"), 0)
+        return new_version
+
+
+def atomic_write(path: str, write_func, mode="w", encoding="utf-8", newline=None):
+    """
+        Writes a file through a temporary sibling and renames it into place.
+
+        Readers therefore see either the old or the new content, never a
+        partially written file.
+
+        Args:
+            path (str): Destination path.
+            write_func (callable): Called with the open temporary file object.
+            mode (str, optional): File mode, "w" or "wb". Defaults to "w".
+            encoding (str, optional): Text encoding. Ignored in binary mode.
+            newline (str, optional): Newline handling passed to open().
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        if "b" in mode:
+            file = os.fdopen(fd, mode)
+        else:
+            file = os.fdopen(fd, mode, encoding=encoding, newline=newline)
+        with file:
+            write_func(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,423 @@
+import unicodedata
+from collections.abc import Mapping
+
+# Field names as they appear in the storage files, in file order
+FIELDS = ("Year", "Rating", "Poster", "IMDB Link", "Notes")
+IMDB_PREFIX = "https://www.imdb.com/title/"
+# Shared URL prefixes; each URL is stored as an index into this table plus its suffix
+URL_PREFIXES = ("", IMDB_PREFIX, "https://m.media-amazon.com/images/M/")
+ARTICLES = frozenset({"the", "a", "an"})
+_PREFIX_LOOKUP = tuple((index, prefix, len(prefix))
+                       for index, prefix in enumerate(URL_PREFIXES) if prefix)
+
+
+def split_url(url):
+    """
+        Splits a URL into the index of its longest shared prefix and the remaining suffix.
+
+        Args:
+            url (str | None): The URL to split.
+
+        Returns:
+            tuple: The prefix index and the suffix, or (0, None) for a missing URL.
+                   Prefixes are tried in table order, so none may be a prefix of another.
+    """
+    if url is None:
+        return 0, None
+    for index, prefix, length in _PREFIX_LOOKUP:
+        if url.startswith(prefix):
+            return index, url[length:]
+    return 0, url
+
+
+def normalize_title(title):
+    """
+        Normalizes a title for identity matching.
+
+        Case, accents and punctuation are dropped, whitespace is collapsed and a
+        leading or trailing article is removed, so "The Godfather", "godfather"
+        and "Godfather, The" all normalize to "godfather".
+
+        Args:
+            title (str): The title to normalize.
+
+        Returns:
+            str: The normalized title.
+    """
+    decomposed = unicodedata.normalize("NFKD", title.casefold())
+    words = "".join(char if char.isalnum() else " " for char in decomposed
+                    if not unicodedata.combining(char)).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    elif len(words) > 1 and words[-1] in ARTICLES:
+        words = words[:-1]
+    return " ".join(words)
+
+
+class Movie(Mapping):  # pylint: disable=too-many-instance-attributes
+    """
+        Compact record for a single movie.
+
+        Fields are kept in __slots__ instead of a per-movie dict, and the poster and
+        IMDb URLs are stored as a reference to a shared prefix plus their suffix.
+        For compatibility the record also behaves like the dict it replaces: it can
+        be read and updated with the storage field names ("Rating", "Notes", ...)
+        and compares equal to a dict with the same content. Missing fields are
+        None and are left out of the mapping view.
+
+        Attributes:
+            rating (float | None): The IMDb rating.
+            year (int | None): The release year.
+            notes (str | None): Personal notes.
+            poster (str | None): Poster URL.
+            imdb_link (str | None): IMDb page URL.
+            imdb_id (str | None): IMDb identifier, derived from the IMDb link.
+    """
+
+    __slots__ = ("rating", "year", "notes", "_poster_prefix", "_poster",
+                 "_link_prefix", "_link", "_extra")
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, rating=None, year=None, poster=None, imdb_link=None, notes=None,
+                 extra=None):
+        """
+            Initializes the record.
+
+            Args:
+                rating (float, optional): The IMDb rating.
+                year (int, optional): The release year.
+                poster (str, optional): Poster URL.
+                imdb_link (str, optional): IMDb page URL.
+                notes (str, optional): Personal notes.
+                extra (dict, optional): Any additional fields found in the storage file.
+        """
+        self.rating = rating
+        self.year = year
+        self.notes = notes
+        self._poster_prefix, self._poster = split_url(poster)
+        self._link_prefix, self._link = split_url(imdb_link)
+        self._extra = extra or None
+
+    @classmethod
+    def from_dict(cls, details):
+        """
+            Creates a record from a dictionary keyed by storage field names.
+
+            Args:
+                details (Mapping): The movie details.
+
+            Returns:
+                Movie: The record. A Movie argument is returned unchanged.
+        """
+        if isinstance(details, Movie):
+            return details
+        extra = {key: value for key, value in details.items() if key not in FIELDS}
+        return cls(details.get("Rating"), details.get("Year"), details.get("Poster"),
+                   details.get("IMDB Link"), details.get("Notes"), extra)
+
+    @property
+    def poster(self):
+        """The poster URL, or None."""
+        if self._poster is None:
+            return None
+        return URL_PREFIXES[self._poster_prefix] + self._poster
+
+    @poster.setter
+    def poster(self, url):
+        self._poster_prefix, self._poster = split_url(url)
+
+    @property
+    def imdb_link(self):
+        """The IMDb page URL, or None."""
+        if self._link is None:
+            return None
+        return URL_PREFIXES[self._link_prefix] + self._link
+
+    @imdb_link.setter
+    def imdb_link(self, url):
+        self._link_prefix, self._link = split_url(url)
+
+    @property
+    def extra(self):
+        """The fields beyond the known ones, or None; must not be modified."""
+        return self._extra
+
+    @property
+    def imdb_id(self):
+        """The IMDb identifier such as "tt0111161", or None if there is no IMDb link."""
+        if self._link is None or self._link_prefix != URL_PREFIXES.index(IMDB_PREFIX):
+            return None
+        return self._link.strip("/").split("/", 1)[0] or None
+
+    def _field(self, key):
+        """
+            Returns the value of a storage field, None if it is missing.
+
+            Raises:
+                KeyError: If the key is not a known field.
+        """
+        if key == "Rating":
+            return self.rating
+        if key == "Year":
+            return self.year
+        if key == "Notes":
+            return self.notes
+        if key == "Poster":
+            return self.poster
+        if key == "IMDB Link":
+            return self.imdb_link
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            if self._extra is not None and key in self._extra:
+                return self._extra[key]
+            raise KeyError(key)
+        value = self._field(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key == "Rating":
+            self.rating = value
+        elif key == "Year":
+            self.year = value
+        elif key == "Notes":
+            self.notes = value
+        elif key == "Poster":
+            self.poster = value
+        elif key == "IMDB Link":
+            self.imdb_link = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __iter__(self):
+        for key in FIELDS:
+            if self._field(key) is not None:
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Movie({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Movie, (self.rating, self.year, self.poster, self.imdb_link, self.notes,
+                        self._extra))
+
+    def copy(self):
+        """
+            Returns an independent copy of the record.
+        """
+        return Movie(self.rating, self.year, self.poster, self.imdb_link, self.notes,
+                     dict(self._extra) if self._extra else None)
+
+    def to_dict(self):
+        """
+            Returns the record as a plain dictionary keyed by storage field names.
+        """
+        return dict(self.items())
+
+
+class MovieCollection(dict):
+    """
+        Dictionary of Movie records keyed by title, as produced by the storage backends.
+
+        Values assigned through item assignment, update() or setdefault() are
+        converted to Movie records, so code written for plain nested dicts keeps
+        working while the data stays compact.
+
+        Titles remain the keys in the storage files, but a movie's identity is its
+        IMDb ID. find() resolves a title, an alternate spelling or an IMDb ID to
+        the stored title through two lazily built indexes, one by IMDb ID and one
+        by normalized title, which are dropped whenever titles are added or removed.
+    """
+
+    def __init__(self, movies=None):
+        """
+            Initializes the collection.
+
+            Args:
+                movies (Mapping, optional): Movies keyed by title, as records or dicts.
+        """
+        super().__init__()
+        self._by_imdb_id = None
+        self._by_alias = None
+        if movies:
+            self.update(movies)
+
+    @classmethod
+    def wrap(cls, movies):
+        """
+            Returns movies as a MovieCollection, converting only if necessary.
+
+            Args:
+                movies (Mapping): Movies keyed by title.
+
+            Returns:
+                MovieCollection: The same object if it already is a collection.
+        """
+        if isinstance(movies, MovieCollection):
+            return movies
+        return cls(movies)
+
+    def __setitem__(self, title, details):
+        self._by_imdb_id = self._by_alias = None
+        super().__setitem__(title, Movie.from_dict(details))
+
+    def __delitem__(self, title):
+        self._by_imdb_id = self._by_alias = None
+        super().__delitem__(title)
+
+    def pop(self, *args):
+        self._by_imdb_id = self._by_alias = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._by_imdb_id = self._by_alias = None
+        return super().popitem()
+
+    def clear(self):
+        self._by_imdb_id = self._by_alias = None
+        super().clear()
+
+    def _build_indexes(self):
+        """
+            Builds the IMDb ID and normalized title indexes.
+        """
+        by_imdb_id, by_alias = {}, {}
+        for title, movie in self.items():
+            imdb_id = movie.imdb_id
+            if imdb_id is not None:
+                by_imdb_id.setdefault(imdb_id, title)
+            by_alias.setdefault(normalize_title(title), title)
+        self._by_imdb_id, self._by_alias = by_imdb_id, by_alias
+
+    def title_for_imdb_id(self, imdb_id):
+        """
+            Looks up the stored title of a movie by its IMDb ID.
+
+            Args:
+                imdb_id (str): The IMDb ID, such as "tt0111161".
+
+            Returns:
+                str | None: The stored title, or None if no movie has that ID.
+        """
+        if not imdb_id:
+            return None
+        if self._by_imdb_id is None:
+            self._build_indexes()
+        title = self._by_imdb_id.get(imdb_id)
+        if title is not None and (title not in self or self[title].imdb_id != imdb_id):
+            # A record's link was edited in place; the index is stale
+            self._build_indexes()
+            title = self._by_imdb_id.get(imdb_id)
+        return title
+
+    def find(self, name):
+        """
+            Resolves a title, an alternate spelling or an IMDb ID to the stored title.
+
+            Spelling variants are matched on the normalized title, which ignores
+            case, accents, punctuation and leading or trailing articles.
+
+            Args:
+                name (str): The name or IMDb ID to look up.
+
+            Returns:
+                str | None: The stored title, or None if there is no such movie.
+        """
+        if name in self:
+            return name
+        title = self.title_for_imdb_id(name.strip())
+        if title is not None:
+            return title
+        if self._by_alias is None:
+            self._build_indexes()
+        return self._by_alias.get(normalize_title(name))
+
+    def update(self, *args, **kwargs):
+        for title, details in dict(*args, **kwargs).items():
+            self[title] = details
+
+    def setdefault(self, title, default=None):
+        if title not in self:
+            self[title] = default if default is not None else Movie()
+        return self[title]
+
+    def copy(self):
+        """
+            Returns a copy of the collection with copied records.
+        """
+        duplicate = MovieCollection()
+        for title, movie in self.items():
+            dict.__setitem__(duplicate, title, movie.copy())
+        return duplicate
+
+    def to_dict(self):
+        """
+            Returns the collection as plain nested dictionaries.
+        """
+        return {title: movie.to_dict() for title, movie in self.items()}
+
+    # pylint: disable=protected-access
+    def to_rows(self):
+        """
+            Packs the records into tuples of plain values for fast serialization.
+
+            The URLs stay split into prefix index and suffix, so the rows are only
+            valid with the same URL_PREFIXES table.
+
+            Returns:
+                list: A (title, rating, year, notes, poster prefix, poster, link prefix,
+                      link, extra) tuple per movie.
+        """
+        return [(title, movie.rating, movie.year, movie.notes, movie._poster_prefix,
+                 movie._poster, movie._link_prefix, movie._link,
+                 dict(movie._extra) if movie._extra else None)
+                for title, movie in self.items()]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+            Unpacks records packed by to_rows().
+
+            The records are filled in directly instead of through Movie(), which
+            would split the URLs again.
+
+            Args:
+                rows (iterable): The tuples.
+
+            Returns:
+                MovieCollection: The collection.
+        """
+        new = Movie.__new__
+        movies = {}
+        for title, rating, year, notes, poster_prefix, poster, link_prefix, link, extra in rows:
+            movie = new(Movie)
+            movie.rating, movie.year, movie.notes = rating, year, notes
+            movie._poster_prefix, movie._poster = poster_prefix, poster
+            movie._link_prefix, movie._link, movie._extra = link_prefix, link, extra
+            movies[title] = movie
+        collection = cls()
+        dict.update(collection, movies)
+        return collection
+    # pylint: enable=protected-access
+
+
+def movie_json_default(obj):
+    """
+        json.dump hook that serializes Movie records as plain dictionaries.
+
+        Raises:
+            TypeError: If the object is not a Movie.
+    """
+    if isinstance(obj, Movie):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
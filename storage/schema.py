@@ -0,0 +1,160 @@
+import re
+from storage.movie import FIELDS, Movie
+
+# Version of the record schema written by this application
+SCHEMA_VERSION = 2
+# Files without a schema header were written before the schema was versioned
+LEGACY_VERSION = 1
+# Reserved first key of JSON files, holding the schema version
+SCHEMA_KEY = "_schema"
+# First line of CSV files, followed by the schema version
+SCHEMA_COMMENT = "#schema="
+# Field name in any case -> storage field name
+FIELD_ALIASES = {field.lower(): field for field in FIELDS}
+YEAR_PATTERN = re.compile(r"\s*(\d{4})")
+
+
+class SchemaVersionError(ValueError):
+    """Raised when a file was written with a newer schema than this application knows."""
+
+
+def check_version(version) -> int:
+    """
+        Validates the schema version found in a file.
+
+        Args:
+            version (object): The stored version.
+
+        Returns:
+            int: The version.
+
+        Raises:
+            SchemaVersionError: If the version is not a known schema version.
+    """
+    if not isinstance(version, int) or version < LEGACY_VERSION:
+        raise SchemaVersionError(f"Invalid schema version {version!r}.")
+    if version > SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"The file uses schema version {version}, but this application only "
+            f"supports up to version {SCHEMA_VERSION}. Please update the application.")
+    return version
+
+
+def parse_schema_comment(line: str):
+    """
+        Reads the schema version from the first line of a CSV file.
+
+        Args:
+            line (str): The first line.
+
+        Returns:
+            int | None: The version, or None if the line is not a schema comment.
+
+        Raises:
+            SchemaVersionError: If the version is invalid or too new.
+    """
+    if not line.startswith(SCHEMA_COMMENT):
+        return None
+    try:
+        version = int(line[len(SCHEMA_COMMENT):].strip())
+    except ValueError as err:
+        raise SchemaVersionError(f"Invalid schema comment {line.strip()!r}.") from err
+    return check_version(version)
+
+
+def schema_comment() -> str:
+    """
+        Returns the first line of CSV files written in the current schema.
+    """
+    return f"{SCHEMA_COMMENT}{SCHEMA_VERSION}\n"
+
+
+def _number(value, convert):
+    """
+        Converts a number stored as text, None if it is not a number.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return convert(value.strip())
+    except ValueError:
+        return None
+
+
+def _year(value):
+    """
+        Converts a year stored as text, such as "1999" or "2008–2013", None if there is none.
+    """
+    if not isinstance(value, str):
+        return value
+    match = YEAR_PATTERN.match(value)
+    return int(match.group(1)) if match else None
+
+
+def upgrade_v1(movie: Movie) -> Movie:
+    """
+        Upgrades a record from the unversioned schema to version 2.
+
+        Version 1 files were written by hand or by other tools as often as by
+        this application: ratings and years may be text ("8.7", "N/A",
+        "2008–2013"), field names may differ in case ("imdb link") and notes
+        may be missing. Version 2 stores ratings as numbers, years as integers,
+        the known fields under their storage names and notes as a string.
+
+        Args:
+            movie (Movie): The record in version 1.
+
+        Returns:
+            Movie: The record in version 2.
+    """
+    extra = movie.extra
+    if extra and any(key.lower() in FIELD_ALIASES for key in extra):
+        details = {FIELD_ALIASES.get(key.lower(), key): value
+                   for key, value in movie.to_dict().items()}
+        movie = Movie.from_dict(details)
+    movie.rating = _number(movie.rating, float)
+    movie.year = _year(movie.year)
+    if movie.notes is None:
+        movie.notes = ""
+    return movie
+
+
+# Schema version -> function upgrading one record from it to the next version.
+# To change the schema, add a step here and increase SCHEMA_VERSION.
+MIGRATIONS = {
+    1: upgrade_v1
+}
+
+
+def migrate_movie(movie: Movie, version: int) -> Movie:
+    """
+        Upgrades a record to the current schema.
+
+        Args:
+            movie (Movie): The record as stored.
+            version (int): The schema version it was stored in.
+
+        Returns:
+            Movie: The upgraded record; the same object if it was current.
+    """
+    for step in range(version, SCHEMA_VERSION):
+        movie = MIGRATIONS[step](movie)
+    return movie
+
+
+def migrate_movies(movies, version: int):
+    """
+        Upgrades the records of a collection to the current schema in place.
+
+        Args:
+            movies (MovieCollection): Records keyed by title.
+            version (int): The schema version they were stored in.
+
+        Returns:
+            MovieCollection: The same collection.
+    """
+    if version == SCHEMA_VERSION:
+        return movies
+    for title, movie in movies.items():
+        dict.__setitem__(movies, title, migrate_movie(movie, version))
+    return movies
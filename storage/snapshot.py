@@ -0,0 +1,229 @@
+import hashlib
+import marshal
+import os
+import struct
+import threading
+import time
+from storage.csv_reader import gc_paused
+from storage.locking import atomic_write
+from storage.movie import URL_PREFIXES, MovieCollection
+from storage.schema import SCHEMA_VERSION
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+# Smaller catalogs parse about as fast as their snapshot loads
+MIN_MOVIES = 1000
+# A file changed this shortly before it was hashed may change again without a new mtime
+RACY_SECONDS = 2.0
+HEADER_LENGTH = struct.Struct("<I")
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """
+        Hashes the content of a file.
+
+        Args:
+            path (str): The file.
+
+        Returns:
+            str: The hex digest.
+    """
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Snapshot:
+    """
+        Warm-start copy of the movies parsed from a storage file.
+
+        The snapshot is stored next to the file as "<file>.snapshot": a header
+        with the file's path, modification time, size and content hash, followed
+        by the movies packed with marshal, so loading it is one read and no
+        parsing. It is used only while the file is unchanged. The path,
+        modification time and size are compared first; if they differ, or the
+        file was changed too shortly before it was hashed to trust its
+        modification time, the content hash decides.
+
+        A snapshot written right after a save is usually racy. The first load
+        that verifies its hash once the file is old enough rewrites the header
+        with the file's current key, so later loads trust the modification time
+        again and skip the hash.
+
+        New snapshots are packed in the caller's thread, which is quick, and
+        written by a background thread, so saves and loads do not wait for them.
+        The data must come from trusted files: like pickle, marshal is not safe
+        against maliciously constructed data.
+    """
+
+    def __init__(self, source: str):
+        """
+            Initializes the snapshot of a storage file.
+
+            Args:
+                source (str): The path to the storage file.
+        """
+        self.source = source
+        self.path = source + SNAPSHOT_SUFFIX
+        self._lock = threading.Lock()
+        self._pending = None
+        self._thread = None
+
+    def stat(self):
+        """
+            Returns the (modification time in ns, size) key of the storage file.
+
+            Returns:
+                tuple | None: The key, or None if the file does not exist.
+        """
+        try:
+            stat = os.stat(self.source)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """
+            Loads the movies from the snapshot if it matches the storage file.
+
+            Returns:
+                MovieCollection | None: The movies, or None if there is no valid snapshot.
+        """
+        try:
+            with open(self.path, "rb") as file:
+                data = memoryview(file.read())
+            (length,) = HEADER_LENGTH.unpack_from(data)
+            start = HEADER_LENGTH.size + length
+            header = marshal.loads(data[HEADER_LENGTH.size:start])
+            matches, verified = self._matches(header)
+            if not matches:
+                return None
+            with gc_paused():
+                movies = MovieCollection.from_rows(marshal.loads(data[start:]))
+        except (OSError, EOFError, ValueError, TypeError, struct.error):
+            return None
+        if verified is not None:
+            self._trust(header, data[start:], *verified)
+        return movies
+
+    def _matches(self, header):
+        """
+            Checks a snapshot header against the storage file.
+
+            Returns:
+                tuple: Whether the snapshot matches, and the file's key with the time
+                       its content was hashed if the hash had to be compared, else None.
+        """
+        if not isinstance(header, dict) or \
+                header.get("format") != (SNAPSHOT_FORMAT, SCHEMA_VERSION, URL_PREFIXES):
+            return False, None
+        key = self.stat()
+        if key is None or key[1] != header["key"][1]:
+            return False, None
+        if key == header["key"] and header["path"] == os.path.abspath(self.source) \
+                and not header["racy"]:
+            return True, None
+        # Touched, copied or possibly changed within the same mtime: compare the content
+        hashed_at = time.time_ns()
+        return file_digest(self.source) == header["digest"], (key, hashed_at)
+
+    def _trust(self, header, body, key, hashed_at):
+        """
+            Rewrites the header of a snapshot whose content was just verified with the
+            file's current key, unless the file may still change within the same mtime.
+        """
+        if hashed_at - key[0] < RACY_SECONDS * 1e9:
+            return
+        with self._lock:
+            if self._thread is not None:
+                # A newer snapshot is being written
+                return
+        header = {**header, "path": os.path.abspath(self.source), "key": key, "racy": False}
+        try:
+            self._write_file(marshal.dumps(header), body)
+        except (OSError, ValueError):
+            # Only an optimization: the next load compares the hash again
+            pass
+
+    def write_later(self, movies, key):
+        """
+            Replaces the snapshot in the background.
+
+            Only the latest pending snapshot is written, and none if the file
+            changed after the movies were read or written.
+
+            Args:
+                movies (Mapping): The movies as read from or written to the file.
+                key (tuple): The file's stat() key right after the movies were read
+                             or written.
+        """
+        if key is None or len(movies) < MIN_MOVIES:
+            self.discard()
+            return
+        rows = MovieCollection.wrap(movies).to_rows()
+        with self._lock:
+            self._pending = (rows, key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer")
+                self._thread.start()
+
+    def wait(self):
+        """
+            Waits until the pending snapshot is written.
+        """
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def discard(self):
+        """
+            Removes the snapshot file.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _run(self):
+        """
+            Writes pending snapshots until there are none left.
+        """
+        while True:
+            with self._lock:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._thread = None
+                    return
+            try:
+                self._write(*job)
+            except (OSError, ValueError):
+                # A snapshot is only an optimization; without one the file is parsed
+                self.discard()
+
+    def _write(self, rows, key):
+        """
+            Writes a snapshot of rows read from or written to the file with the given key.
+        """
+        hashed_at = time.time_ns()
+        digest = file_digest(self.source)
+        if self.stat() != key:
+            return
+        header = marshal.dumps({
+            "format": (SNAPSHOT_FORMAT, SCHEMA_VERSION, URL_PREFIXES),
+            "path": os.path.abspath(self.source), "key": key, "digest": digest,
+            "racy": hashed_at - key[0] < RACY_SECONDS * 1e9})
+        self._write_file(header, marshal.dumps(rows))
+
+    def _write_file(self, header, body):
+        """
+            Replaces the snapshot file with a packed header and body.
+        """
+        def write(file):
+            file.write(HEADER_LENGTH.pack(len(header)))
+            file.write(header)
+            file.write(body)
+        atomic_write(self.path, write, mode="wb")
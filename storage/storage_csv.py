@@ -1,58 +1,90 @@
 import csv
 import os
-import pandas as pd
+from storage.compression import DECOMPRESSION_ERRORS, open_text, write_text
 from storage.istorage import IStorage
+from storage.csv_reader import (iter_movies_csv, read_header, read_movies_csv,
+                                write_movies_csv, write_rejects)
+from storage.movie import Movie, MovieCollection
 
 
 class StorageCsv(IStorage):
     """
         CSV-based implementation of the IStorage interface.
         Handles loading and saving movie data to and from a CSV file.
+
+        The first line of the file is a "#schema=<version>" comment; files
+        without it are in the legacy schema.
     """
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, workers: int = None):
         """
             Initializes the CSV storage with a given file path.
 
             Args:
                 filepath (str): The path to the CSV file.
+                workers (int, optional): Number of processes used to parse large files
+                                         in parallel chunks. Defaults to a single process.
         """
-        self._database = filepath
+        super().__init__(filepath)
+        self._workers = workers
         if not os.path.exists(self._database):
             self.save_movies({})
 
-    def get_movies(self) -> dict:
+    def _read_movies(self) -> dict:
         """
             Loads movie data from the CSV file.
 
+            Malformed rows are skipped and appended to "<file>.rejects.csv" with
+            their line numbers instead of aborting the whole load.
+
             Returns:
-                dict: A dictionary containing movie information.
+                MovieCollection: Movie records keyed by title.
 
             Raises:
                 csv.Error: If there is an error with the CSV format.
+                SchemaVersionError: If the file was written with a newer schema.
         """
 
-        movies = {}
         try:
-            with open(self._database, "r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    movies[row['Title']] = {
-                        "Rating": float(row['Rating']),
-                        "Year": int(row['Year']),
-                        "Poster": row['Poster'],
-                        "IMDB Link": row['IMDB Link'],
-                        "Notes": row.get("Notes", "")
-                    }
-            return movies
+            movies, rejected = read_movies_csv(self._database, workers=self._workers)
         except FileNotFoundError:
             print(f"Error: File '{self._database}' not found. Returning empty movie list.")
-            return {}
-        except csv.Error as e:
+            return MovieCollection()
+        except (csv.Error, UnicodeDecodeError, *DECOMPRESSION_ERRORS) as e:
             print(f"Error: Issue with CSV format in '{self._database}'. Details: {e}")
-            return {}
+            return MovieCollection()
+        if rejected:
+            print(f"Warning: Skipped {rejected} malformed row(s) in '{self._database}', "
+                  f"see '{self._database}.rejects.csv'.")
+        return movies
 
-    def save_movies(self, dict_object: dict):
+    def iter_movies(self):
+        """
+            Streams the movies from the CSV file without loading it whole.
+
+            Malformed rows are skipped; get_movies() reports them.
+
+            Yields:
+                tuple: (title, Movie) pairs in file order.
+        """
+        try:
+            yield from iter_movies_csv(self._database)
+        except FileNotFoundError:
+            print(f"Error: File '{self._database}' not found. Returning empty movie list.")
+        except (csv.Error, UnicodeDecodeError, *DECOMPRESSION_ERRORS) as e:
+            print(f"Error: Issue with CSV format in '{self._database}'. Details: {e}")
+
+    def schema_version(self) -> int:
+        """
+            Reads the schema version from the first line of the CSV file.
+
+            Returns:
+                int: The version, LEGACY_VERSION if the file has no schema comment.
+        """
+        with open_text(self._database, newline="") as file:
+            return read_header(file)[0]
+
+    def _write_movies(self, dict_object: dict):
         """
             Saves movie data to the CSV file.
 
@@ -63,8 +95,33 @@ class StorageCsv(IStorage):
                 IOError: If there is an error writing to the file.
         """
 
-        movies_list = [{'Title': title, **details} for title, details in dict_object.items()]
-        # Convert the list of dictionaries to a DataFrame
-        df = pd.DataFrame(movies_list)
-        # Save to CSV
-        df.to_csv(self._database, index=False)
+        # Written row by row: missing ratings and years stay empty cells and years integers
+        items = MovieCollection.wrap(dict_object).items()
+        write_text(self._database, lambda file: write_movies_csv(file, items), newline='')
+
+    def _stored(self, movies):
+        """
+            Drops the fields beyond the known ones, which are not read back from CSV files.
+        """
+        movies = MovieCollection.wrap(movies)
+        if not any(movie.extra for movie in movies.values()):
+            return movies
+        stored = MovieCollection()
+        for title, movie in movies.items():
+            if movie.extra:
+                movie = Movie(movie.rating, movie.year, movie.poster, movie.imdb_link,
+                              movie.notes)
+            stored[title] = movie
+        return stored
+
+    def _rewrite_movies(self):
+        """
+            Streams the rows through the upgrade into a new file, one batch at a time.
+
+            Malformed rows are appended to "<file>.rejects.csv", as get_movies() does.
+        """
+        rejects = []
+        write_text(self._database,
+                   lambda file: write_movies_csv(file, iter_movies_csv(self._database, rejects)),
+                   newline='')
+        write_rejects(f"{self._database}.rejects.csv", rejects)
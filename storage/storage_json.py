@@ -1,47 +1,98 @@
+import itertools
 import json
 import os
+from storage.compression import (DECOMPRESSION_ERRORS, compression_suffix, open_text,
+                                 write_text)
 from storage.istorage import IStorage
+from storage.json_stream import iter_json_object, write_json_object
+from storage.movie import Movie, MovieCollection
+from storage.schema import (LEGACY_VERSION, SCHEMA_KEY, SCHEMA_VERSION, check_version,
+                            migrate_movie, migrate_movies)
 
 
 class StorageJson(IStorage):
     """
         JSON-based implementation of the IStorage interface.
-        Handles loading and saving movie data to and from a JSON file.
+        Handles loading and saving movie data to and from a JSON file,
+        which may be compressed (".json.gz", or ".json.zst" with zstandard installed).
+
+        The file is a single object keyed by title. Its first key, "_schema",
+        holds the schema version; files without it are in the legacy schema.
     """
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, compact: bool = None):
         """
             Initializes the JSON storage with a specified file path.
 
             Args:
                 filepath (str): The path to the JSON file.
+                compact (bool, optional): Write without indentation and spaces.
+                                          Defaults to compact for compressed files only.
         """
-        self._database = filepath
+        super().__init__(filepath)
+        self._compact = compression_suffix(filepath) is not None if compact is None else compact
         if not os.path.exists(self._database):
             self.save_movies({})
 
-    def get_movies(self) -> dict:
+    def _read_movies(self) -> dict:
         """
             Loads movie data from the JSON file.
 
+            Records stored in an older schema are upgraded while they are loaded.
+
             Returns:
-                dict: A dictionary containing movie information.
+                MovieCollection: Movie records keyed by title.
 
             Raises:
                 JSONDecodeError: If the JSON file format is invalid.
+                SchemaVersionError: If the file was written with a newer schema.
         """
 
         try:
-            with open(self._database, "r", encoding="utf-8") as file:
-                return json.load(file)
-        except json.JSONDecodeError:
+            with open_text(self._database) as file:
+                movies = json.load(file)
+        except (json.JSONDecodeError, UnicodeDecodeError, *DECOMPRESSION_ERRORS):
             print("Error: The JSON file could not be decoded. Please check the file format.")
-            return {}
+            return MovieCollection()
         except FileNotFoundError:
             print(f"Error: File '{self._database}' not found. Returning empty movie list.")
-            return {}
+            return MovieCollection()
+        version = check_version(movies.pop(SCHEMA_KEY, LEGACY_VERSION))
+        return migrate_movies(MovieCollection(movies), version)
+
+    def iter_movies(self):
+        """
+            Streams the movies from the JSON file without loading it whole.
 
-    def save_movies(self, dict_object: dict):
+            Yields:
+                tuple: (title, Movie) pairs in file order, upgraded to the current schema.
+        """
+        try:
+            with open_text(self._database) as file:
+                version = LEGACY_VERSION
+                for title, details in iter_json_object(file):
+                    if title == SCHEMA_KEY:
+                        version = check_version(details)
+                        continue
+                    yield title, migrate_movie(Movie.from_dict(details), version)
+        except (json.JSONDecodeError, UnicodeDecodeError, *DECOMPRESSION_ERRORS):
+            print("Error: The JSON file could not be decoded. Please check the file format.")
+        except FileNotFoundError:
+            print(f"Error: File '{self._database}' not found. Returning empty movie list.")
+
+    def schema_version(self) -> int:
+        """
+            Reads the schema version from the first key of the JSON file.
+
+            Returns:
+                int: The version, LEGACY_VERSION if the file has none.
+        """
+        with open_text(self._database) as file:
+            for key, value in iter_json_object(file):
+                return check_version(value) if key == SCHEMA_KEY else LEGACY_VERSION
+        return LEGACY_VERSION
+
+    def _write_movies(self, dict_object: dict):
         """
         Saves the movies dictionary to the JSON file.
 
@@ -51,8 +102,22 @@ class StorageJson(IStorage):
         Raises:
             IOError: If there is an error writing to the file.
         """
+        self._write_items(dict_object.items())
+
+    def _rewrite_movies(self):
+        """
+            Streams the records through the upgrade into a new file, one at a time.
+        """
+        self._write_items(self.iter_movies())
+
+    def _write_items(self, items):
+        """
+            Writes (title, movie) pairs after the schema header.
+        """
         try:
-            with open(self._database, "w", encoding="utf-8") as file:
-                json.dump(dict_object, file, ensure_ascii=False, indent=4)
+            write_text(self._database,
+                       lambda file: write_json_object(
+                           file, itertools.chain([(SCHEMA_KEY, SCHEMA_VERSION)], items),
+                           self._compact))
         except IOError as e:
             print(f"Error: Unable to write to the file '{self._database}'. Details: {e}")
@@ -0,0 +1,76 @@
+import random
+import threading
+from commands.analytics import Analytics
+from commands.parallel import map_chunks, start_context
+
+
+def make_movies(count):
+    """
+    Build a catalog with many rating and year ties to exercise ordering stability.
+    """
+    generator = random.Random(42)
+    return {f"Movie {index}": {"Rating": generator.choice([5.0, 7.5, 9.0]),
+                               "Year": generator.randint(1990, 1995)}
+            for index in range(count)}
+
+
+def test_top_movies_matches_full_sort():
+    """
+    Test that every page selected by top_movies equals the same slice of a full stable sort.
+    """
+    movies = make_movies(200)
+    for sort_key in ("Rating", "Year"):
+        for reverse in (True, False):
+            expected = sorted(movies.items(), key=lambda item, key=sort_key: item[1][key],
+                              reverse=reverse)
+            for offset in (0, 20, 190):
+                page = Analytics.top_movies(movies.items(), sort_key, reverse, offset, 20)
+                assert page == expected[offset:offset + 20]
+
+
+def test_top_movies_without_limit_returns_the_rest():
+    """
+    Test that top_movies without a limit returns everything after the offset.
+    """
+    movies = make_movies(30)
+    page = Analytics.top_movies(movies.items(), "Year", False, 25)
+    assert len(page) == 5
+
+
+def test_parallel_results_match_serial(monkeypatch):
+    """
+    Test that statistics, fuzzy search and paging in worker processes match the serial results.
+    """
+    monkeypatch.setattr("commands.parallel.PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr("commands.analytics.FUZZY_PARALLEL_THRESHOLD", 10)
+    calls = []
+    monkeypatch.setattr("commands.parallel.map_chunks",
+                        lambda *args, real=map_chunks: calls.append(args[0]) or real(*args))
+    movies = make_movies(101)
+    assert Analytics.compute_statistics(movies, workers=3) == \
+        Analytics.compute_statistics(movies)
+    for reverse in (True, False):
+        assert Analytics.top_movies(movies.items(), "Rating", reverse, 30, 20, workers=3) == \
+            Analytics.top_movies(movies.items(), "Rating", reverse, 30, 20)
+    assert Analytics.search_titles(movies, "movei 7", workers=3) == \
+        Analytics.search_titles(movies, "movei 7")
+    assert len(calls) == 4
+
+
+def test_workers_are_not_forked_next_to_other_threads(monkeypatch):
+    """
+    Test that worker processes are started without fork while another thread runs.
+    """
+    monkeypatch.setattr("commands.parallel.PARALLEL_THRESHOLD", 10)
+    movies = make_movies(101)
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        context = start_context()
+        assert context is None or context.get_start_method() != "fork"
+        assert Analytics.compute_statistics(movies, workers=2) == \
+            Analytics.compute_statistics(movies)
+    finally:
+        stop.set()
+        thread.join()
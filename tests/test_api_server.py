@@ -0,0 +1,133 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import pytest
+from commands.api_server import MovieCatalog, PooledHTTPServer
+from storage.storage_json import StorageJson
+
+
+# Disable Pylint warning for redefined-outer-name specifically for the api_server fixture
+# pylint: disable=redefined-outer-name
+@pytest.fixture
+def api_server(tmp_path):
+    """
+    Pytest fixture running the API server on a free port over a temporary JSON file.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+
+    Yields:
+        str: Base URL of the running server.
+    """
+    storage = StorageJson(str(tmp_path / "test_movies.json"))
+    storage.save_movies({
+        "The Matrix": {"Rating": 8.7, "Year": 1999, "Poster": "", "IMDB Link": "", "Notes": ""},
+        "Inception": {"Rating": 8.8, "Year": 2010, "Poster": "", "IMDB Link": "", "Notes": ""},
+        "Up": {"Rating": 8.3, "Year": 2009, "Poster": "", "IMDB Link": "", "Notes": ""}
+    })
+    server = PooledHTTPServer(("127.0.0.1", 0), MovieCatalog(storage), workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, method="GET", body=None, headers=None):
+    """
+    Send a request and return the status, headers and decoded JSON body.
+    """
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = Request(url, data=data, method=method, headers=headers or {})
+    try:
+        with urlopen(req, timeout=5) as response:
+            raw = response.read()
+            return response.status, response.headers, json.loads(raw) if raw else None
+    except HTTPError as err:
+        raw = err.read()
+        return err.code, err.headers, json.loads(raw) if raw else None
+
+
+def test_list_movies_is_paginated(api_server):
+    """
+    Test that /movies returns the requested page with the total count.
+    """
+    status, _, body = request(f"{api_server}/movies?offset=1&limit=1")
+    assert status == 200
+    assert body["total"] == 3
+    assert body["next_offset"] == 2
+    assert [movie["Title"] for movie in body["movies"]] == ["Inception"]
+
+
+def test_sorted_and_stats(api_server):
+    """
+    Test the sorted and stats endpoints.
+    """
+    _, _, body = request(f"{api_server}/sorted?key=year&order=asc")
+    assert [movie["Title"] for movie in body["movies"]] == ["The Matrix", "Up", "Inception"]
+    _, _, stats = request(f"{api_server}/stats")
+    assert stats["best"] == ["Inception"]
+
+
+def test_conditional_get_and_mutation(api_server):
+    """
+    Test that an unchanged catalog answers 304 and a mutation changes the ETag.
+    """
+    _, headers, _ = request(f"{api_server}/movies")
+    etag = headers["ETag"]
+    status, _, _ = request(f"{api_server}/movies", headers={"If-None-Match": etag})
+    assert status == 304
+
+    status, _, body = request(f"{api_server}/movies/Up", "PATCH", {"notes": "Balloons"})
+    assert status == 200 and body["Notes"] == "Balloons"
+    status, headers, _ = request(f"{api_server}/movies", headers={"If-None-Match": etag})
+    assert status == 200 and headers["ETag"] != etag
+
+
+def test_add_and_delete_movie(api_server):
+    """
+    Test adding a movie with explicit details and deleting it again.
+    """
+    details = {"Rating": 7.0, "Year": 2020, "Poster": "", "IMDB Link": "", "Notes": ""}
+    status, _, _ = request(f"{api_server}/movies", "POST", {"title": "Tenet", "details": details})
+    assert status == 201
+    status, _, _ = request(f"{api_server}/movies", "POST", {"title": "tenet", "details": details})
+    assert status == 409
+    status, _, _ = request(f"{api_server}/movies/Tenet", "DELETE")
+    assert status == 204
+    status, _, _ = request(f"{api_server}/movies/Tenet")
+    assert status == 404
+
+
+def test_duplicates_are_found_by_alias_and_imdb_id(api_server):
+    """
+    Test that adding an alternate spelling or a known IMDb ID answers 409.
+    """
+    details = {"Rating": 7.0, "Year": 2020, "Poster": "",
+               "IMDB Link": "https://www.imdb.com/title/tt6723592/", "Notes": ""}
+    status, _, body = request(f"{api_server}/movies", "POST",
+                              {"title": "Matrix", "details": details})
+    assert status == 409 and "The Matrix" in body["error"]
+    status, _, _ = request(f"{api_server}/movies", "POST", {"title": "Tenet", "details": details})
+    assert status == 201
+    status, _, body = request(f"{api_server}/movies", "POST",
+                              {"title": "Tenet (film)", "details": details})
+    assert status == 409 and "'Tenet'" in body["error"]
+    _, _, body = request(f"{api_server}/movies")
+    assert body["total"] == 4
+
+
+def test_invalid_details_are_rejected(api_server):
+    """
+    Test that movies with malformed details are answered with 400 and not stored.
+    """
+    for details in ([7.0, 2020], {"Year": 2020}, {"Rating": "N/A", "Year": 2020},
+                    {"Rating": 7.0, "Year": "2020"}, {"Rating": 7.0, "Year": 2020, "Notes": 1}):
+        status, _, body = request(f"{api_server}/movies", "POST",
+                                  {"title": "Tenet", "details": details})
+        assert status == 400 and "error" in body
+    status, _, _ = request(f"{api_server}/stats")
+    assert status == 200
+    status, _, _ = request(f"{api_server}/movies/Tenet")
+    assert status == 404
@@ -0,0 +1,58 @@
+import random
+from commands.approx_stats import ApproximateStatistics, KllSketch, ReservoirSample
+from storage.movie import Movie
+from storage.storage_csv import StorageCsv
+
+
+def test_kll_quantiles_stay_within_error_bound():
+    """
+    Test that sketch quantiles are within the rank error and memory stays bounded.
+    """
+    rng = random.Random(7)
+    values = [rng.random() for _ in range(200_000)]
+    sketch = KllSketch(k=200, rng=rng)
+    for value in values:
+        sketch.update(value)
+    values.sort()
+    error = sketch.rank_error()
+    for fraction in (0.1, 0.5, 0.9):
+        rank = values.index(sketch.quantile(fraction)) / len(values)
+        assert abs(rank - fraction) <= error
+    assert sum(len(level) for level in sketch.compactors) < 3 * 200
+
+
+def test_reservoir_keeps_uniform_sample():
+    """
+    Test that every item has about the same chance to end up in the sample.
+    """
+    rng = random.Random(3)
+    hits = [0] * 10
+    for _ in range(5000):
+        sample = ReservoirSample(2, rng)
+        for item in range(10):
+            sample.add(item)
+        for item in sample.items:
+            hits[item] += 1
+    assert all(800 < count < 1200 for count in hits)
+
+
+def test_streamed_csv_statistics_merge(tmp_path):
+    """
+    Test the exact parts of streamed statistics and that merged halves add up.
+    """
+    storage = StorageCsv(str(tmp_path / "movies.csv"))
+    storage.save_movies({"Alien": {"Rating": 8.5, "Year": 1979},
+                         "Heat": {"Rating": 8.3, "Year": 1995},
+                         "Cats": {"Rating": 2.8, "Year": 2019},
+                         "Up": {"Rating": 8.5, "Year": 2009}})
+    stats = ApproximateStatistics.from_movies(storage.iter_movies())
+    assert (stats.count, stats.highest, stats.lowest) == (4, 8.5, 2.8)
+    assert sorted(stats.best.items) == ["Alien", "Up"] and stats.worst.items == ["Cats"]
+    assert stats.decades[1970][8] == 1 and stats.decades[2010][2] == 1
+    assert stats.quantile(0.5)[0] == 8.3
+
+    first = ApproximateStatistics.from_movies([("A", Movie(9.0, 2001))])
+    first.merge(ApproximateStatistics.from_movies([("B", Movie(9.0, 2002)),
+                                                    ("C", Movie(1.0, 1990))]))
+    assert (first.count, first.average, first.best.seen) == (3, 19 / 3, 2)
+    assert first.decades[2000][9] == 2
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import pytest
+from commands.downloader import APIError, AsyncMovieInfoDownloader, MovieInfoDownloader
+from storage.async_storage import AsyncStorageAdapter
+from storage.storage_json import StorageJson
+
+
+class FakeDownloader:
+    """
+    Stand-in for MovieInfoDownloader that answers from memory instead of OMDb.
+    """
+
+    @staticmethod
+    def request_movie_data(title):
+        """Return a minimal OMDb-like record, or fail for unknown titles."""
+        if title == "Unknown":
+            raise APIError("Movie not found")
+        return {"Title": title, "Year": "2010", "imdbRating": "8.8",
+                "Poster": "N/A", "imdbID": "tt0000001"}
+
+    @staticmethod
+    def parse_movie_data(data, title):
+        """Reuse the real parser so the stored format matches production."""
+        return MovieInfoDownloader.parse_movie_data(data, title)
+
+
+# Disable Pylint warning for redefined-outer-name specifically for the setup_async_storage fixture
+# pylint: disable=redefined-outer-name
+@pytest.fixture
+def setup_async_storage(tmp_path):
+    """
+    Pytest fixture wrapping a temporary StorageJson in an AsyncStorageAdapter.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+
+    Yields:
+        tuple: AsyncStorageAdapter instance and the path to the test JSON file.
+    """
+    json_file = tmp_path / "test_movies.json"
+    storage = AsyncStorageAdapter(StorageJson(str(json_file)))
+    yield storage, json_file
+    storage.close()
+    if os.path.exists(json_file):
+        os.remove(json_file)
+
+
+def test_async_add_update_delete(setup_async_storage):
+    """
+    Test that the async adapter performs CRUD operations on the wrapped backend.
+    """
+    storage, _ = setup_async_storage
+
+    async def scenario():
+        await storage.add_movie({"Inception": {"Rating": 8.8, "Year": 2010}})
+        await storage.update_movie("Inception", "Updated notes")
+        movies = await storage.get_movies()
+        assert movies["Inception"]["Notes"] == "Updated notes"
+        await storage.delete_movie("Inception")
+        return await storage.get_movies()
+
+    assert "Inception" not in asyncio.run(scenario())
+
+
+def test_async_concurrent_adds_are_not_lost(setup_async_storage):
+    """
+    Test that concurrent add_movie coroutines do not overwrite each other's changes.
+    """
+    storage, _ = setup_async_storage
+
+    async def scenario():
+        await asyncio.gather(*(storage.add_movie({f"Movie {i}": {"Rating": 5.0, "Year": 2000}})
+                               for i in range(20)))
+        return await storage.get_movies()
+
+    assert len(asyncio.run(scenario())) == 20
+
+
+def test_async_import_movies(setup_async_storage):
+    """
+    Test that import_movies saves fetched titles and reports failed ones.
+    """
+    storage, _ = setup_async_storage
+    downloader = AsyncMovieInfoDownloader(FakeDownloader())
+
+    async def scenario():
+        added, failed = await downloader.import_movies(["Inception", "Unknown"], storage)
+        return added, failed, await storage.get_movies()
+
+    added, failed, movies = asyncio.run(scenario())
+    assert added == ["Inception"]
+    assert "Unknown" in failed
+    assert movies["Inception"]["Rating"] == 8.8
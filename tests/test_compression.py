@@ -0,0 +1,53 @@
+import gzip
+import json
+import pytest
+from storage import init_storage, is_valid_path
+from storage.schema import SCHEMA_KEY, SCHEMA_VERSION
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+
+MOVIES = {
+    f"Movie {index}": {"Rating": 7.5, "Year": 2000 + index % 20,
+                       "Poster": f"https://m.media-amazon.com/images/M/poster{index}.jpg",
+                       "IMDB Link": f"https://www.imdb.com/title/tt{index:07d}/",
+                       "Notes": "ünïcode" if index % 2 else ""}
+    for index in range(200)
+}
+
+
+@pytest.mark.parametrize("filename, storage_class", [("movies.json.gz", StorageJson),
+                                                     ("movies.csv.gz", StorageCsv)])
+def test_compressed_storage_round_trip(tmp_path, filename, storage_class):
+    """
+    Test that compressed files are picked by their two-part suffix, are real gzip
+    files and hold the same movies as uncompressed ones.
+    """
+    path = str(tmp_path / filename)
+    assert is_valid_path(filename) and not is_valid_path("movies.txt.gz")
+    storage = init_storage(path)
+    assert isinstance(storage, storage_class)
+    storage.save_movies(MOVIES)
+    storage.update_movie("Movie 1", "rewatch")
+
+    with gzip.open(path, "rb") as file:
+        assert file.read(1)
+    movies = storage_class(path).get_movies()
+    assert movies["Movie 1"]["Notes"] == "rewatch"
+    assert {title: movies[title] for title in MOVIES if title != "Movie 1"} == \
+        {title: details for title, details in MOVIES.items() if title != "Movie 1"}
+
+
+def test_compact_json_is_smaller(tmp_path):
+    """
+    Test that compact and compressed JSON shrink the file and load the same movies.
+    """
+    sizes = {}
+    for filename, compact in [("indented.json", False), ("compact.json", True),
+                              ("compressed.json.gz", None)]:
+        path = tmp_path / filename
+        StorageJson(str(path), compact=compact).save_movies(MOVIES)
+        sizes[filename] = path.stat().st_size
+        assert StorageJson(str(path)).get_movies() == MOVIES
+    assert json.loads((tmp_path / "compact.json").read_text(encoding="utf-8")) == \
+        {SCHEMA_KEY: SCHEMA_VERSION, **MOVIES}
+    assert sizes["compressed.json.gz"] * 5 < sizes["compact.json"] < sizes["indented.json"]
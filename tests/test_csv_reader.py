@@ -0,0 +1,114 @@
+import csv
+import pytest
+from storage import csv_reader
+from storage.csv_reader import CsvSchemaError, read_movies_csv, split_chunks
+from storage.schema import schema_comment
+from storage.storage_csv import StorageCsv
+
+
+def write_csv(path, rows, header=("title", "Year", "Rating", "Poster", "IMDB Link", "Notes"),
+              schema=True):
+    """
+    Write a CSV file with the given header and rows, in the current schema unless
+    schema is False.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if schema:
+            file.write(schema_comment())
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_bad_rows_are_quarantined(tmp_path):
+    """
+    Test that malformed rows go to the reject file with their line numbers
+    while the valid rows still load.
+    """
+    path = tmp_path / "movies.csv"
+    write_csv(path, [
+        ("The Matrix", 1999, 8.7, "http://p/1.jpg", "http://imdb/1", "multi\nline note"),
+        ("Broken Year", "199x", 8.0, "", "", ""),
+        ("Too Short", 2000),
+        ("Inception", 2010, 8.8, "", "", "")
+    ])
+    movies, rejected = read_movies_csv(str(path))
+    assert list(movies) == ["The Matrix", "Inception"]
+    assert movies["The Matrix"]["Notes"] == "multi\nline note"
+    assert rejected == 2
+
+    with open(f"{path}.rejects.csv", newline="", encoding="utf-8") as file:
+        rejects = list(csv.reader(file))
+    assert [row[0] for row in rejects[1:]] == ["5", "6"]
+    assert rejects[1][2] == "Broken Year"
+
+
+def test_quarantined_rows_outlive_later_saves(tmp_path):
+    """
+    Test that saving and reading the cleaned file keeps the reject file intact.
+    """
+    path = tmp_path / "movies.csv"
+    write_csv(path, [("Broken Year", "199x", 8.0, "", "", ""), ("Heat", 1995, 8.3, "", "", "")])
+    storage = StorageCsv(str(path))
+    storage.add_movie({"Up": {"Rating": 8.3, "Year": 2009}})
+    assert list(StorageCsv(str(path)).get_movies()) == ["Heat", "Up"]
+    read_movies_csv(str(path))
+
+    write_csv(path, [("Broken Year", "199x", 8.0, "", "", ""), ("Too Short", 2000)])
+    read_movies_csv(str(path))
+    with open(f"{path}.rejects.csv", newline="", encoding="utf-8") as file:
+        rejects = list(csv.reader(file))
+    assert [row[2] for row in rejects[1:]] == ["Broken Year", "Too Short"]
+
+
+def test_legacy_rows_are_upgraded_instead_of_rejected(tmp_path):
+    """
+    Test that text ratings and years of an unversioned file go through its upgrade.
+    """
+    path = tmp_path / "movies.csv"
+    write_csv(path, [("Dark", "2017–2020", "N/A", "", "", ""), ("Heat", " 1995", "8.3", "", "", ""),
+                     ("Too Short", 2000)], schema=False)
+    movies, rejected = read_movies_csv(str(path))
+    assert (movies["Dark"].year, movies["Dark"].rating) == (2017, None)
+    assert (movies["Heat"].year, movies["Heat"].rating) == (1995, 8.3)
+    assert rejected == 1
+
+
+def test_missing_required_column(tmp_path):
+    """
+    Test that a header without a required column raises CsvSchemaError.
+    """
+    path = tmp_path / "movies.csv"
+    write_csv(path, [("The Matrix", 1999)], header=("Title", "Year"))
+    with pytest.raises(CsvSchemaError):
+        read_movies_csv(str(path))
+
+
+def test_chunks_never_split_quoted_newlines():
+    """
+    Test that chunk boundaries only fall on newlines outside quoted fields.
+    """
+    data = b'h\n"a\nb\nc"\nd\n"e\nf"\ng\n'
+    chunks = split_chunks(data, 2, workers=4)
+    assert chunks[0][0] == 2 and chunks[-1][1] == len(data)
+    for start, end, _ in chunks:
+        assert data[start:end].count(b'"') % 2 == 0
+
+
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch):
+    """
+    Test that parsing in parallel chunks gives the same movies and reject lines.
+    """
+    path = tmp_path / "movies.csv"
+    rows = [(f"Movie {index}", 1990 + index % 30, index % 10,
+             "", "", "note\nwith newline" if index % 7 == 0 else "")
+            for index in range(2000)]
+    rows[1234] = ("Bad", "year", 1, "", "", "")
+    write_csv(path, rows)
+
+    serial, serial_rejected = read_movies_csv(str(path))
+    monkeypatch.setattr(csv_reader, "PARALLEL_THRESHOLD", 0)
+    parallel, parallel_rejected = read_movies_csv(str(path), workers=4)
+    assert parallel == serial
+    assert list(parallel) == list(serial)
+    assert parallel_rejected == serial_rejected == 1
@@ -0,0 +1,87 @@
+from commands.dedup import Deduplicator, find_duplicates, merge_duplicates
+from storage.storage_json import StorageJson
+
+LINK = "https://www.imdb.com/title/tt0068646/"
+
+
+def test_find_duplicates_by_id_and_spelling():
+    """
+    Test that entries are clustered by IMDb ID or close spelling, but not across
+    different IMDb IDs or release years.
+    """
+    movies = {
+        "The Godfather": {"Rating": 9.2, "Year": 1972, "IMDB Link": LINK},
+        "Der Pate": {"Rating": 9.2, "Year": 1972, "IMDB Link": LINK},
+        "Godfather, The": {"Rating": 9.2, "Year": 1972},
+        "The Godfathr": {"Rating": 9.2, "Year": 1972},
+        "The Godfather Part II": {"Rating": 9.0, "Year": 1974},
+        "Dune": {"Rating": 6.3, "Year": 1984,
+                 "IMDB Link": "https://www.imdb.com/title/tt0087182/"},
+        "Dune ": {"Rating": 8.0, "Year": 2021,
+                  "IMDB Link": "https://www.imdb.com/title/tt1160419/"},
+        "Heat": {"Rating": 8.3, "Year": 1995},
+        "Heat!": {"Rating": 8.3, "Year": 1972},
+    }
+    assert find_duplicates(movies) == [
+        ["The Godfather", "Der Pate", "Godfather, The", "The Godfathr"]]
+
+
+def test_clusters_are_not_joined_through_an_unknown_entry():
+    """
+    Test that an entry without IMDb ID or year does not link two different movies.
+    """
+    movies = {
+        "Dune": {"Rating": 6.3, "Year": 1984,
+                 "IMDB Link": "https://www.imdb.com/title/tt0087182/"},
+        "DUNE": {"Rating": 7.0},
+        "Dune!": {"Rating": 8.0, "Year": 2021,
+                  "IMDB Link": "https://www.imdb.com/title/tt1160419/"},
+    }
+    assert find_duplicates(movies) == [["Dune", "DUNE"]]
+    assert list(merge_duplicates(movies, find_duplicates(movies))) == ["Dune", "Dune!"]
+
+
+def test_merge_keeps_first_entry_and_fills_gaps(tmp_path):
+    """
+    Test that merging keeps the first title, fills missing fields and joins notes.
+    """
+    movies = {
+        "The Godfather": {"Rating": 9.2, "Year": 1972, "Notes": "classic"},
+        "Godfather, The": {"Rating": 9.2, "Year": 1972, "IMDB Link": LINK,
+                           "Notes": "rewatch"},
+        "Heat": {"Rating": 8.3, "Year": 1995},
+    }
+    merged = merge_duplicates(movies, find_duplicates(movies))
+    assert list(merged) == ["The Godfather", "Heat"]
+    assert merged["The Godfather"]["IMDB Link"] == LINK
+    assert merged["The Godfather"]["Notes"] == "classic; rewatch"
+
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies(merged)
+    storage.add_movie({"Der Pate": {"Rating": 9.3, "Year": 1972, "IMDB Link": LINK,
+                                    "Notes": ""}})
+    stored = storage.get_movies()
+    assert list(stored) == ["The Godfather", "Heat"]
+    assert stored["The Godfather"]["Rating"] == 9.3
+    assert stored["The Godfather"]["Notes"] == "classic; rewatch"
+
+
+def test_merge_keeps_edits_made_during_the_prompt(tmp_path, monkeypatch):
+    """
+    Test that confirming a merge does not overwrite changes saved while it waited.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({"Heat": {"Rating": 8.3, "Year": 1995, "Notes": "first"},
+                         "Heat!": {"Rating": 8.3, "Year": 1995, "Notes": "second"},
+                         "Up": {"Rating": 8.3, "Year": 2009}})
+
+    def confirm_after_edits(_prompt):
+        other = StorageJson(storage.path)
+        other.add_movie({"Alien": {"Rating": 8.5, "Year": 1979, "Notes": ""}})
+        other.update_movie("Heat!", "edited")
+        return "y"
+    monkeypatch.setattr("builtins.input", confirm_after_edits)
+    Deduplicator(storage).deduplicate()
+    stored = StorageJson(storage.path).get_movies()
+    assert list(stored) == ["Heat", "Up", "Alien"]
+    assert stored["Heat"]["Notes"] == "first; edited"
@@ -0,0 +1,55 @@
+from storage.storage_json import StorageJson
+
+
+def test_session_commits_once_with_undo_and_redo(tmp_path):
+    """
+    Test that queued edits are invisible until commit, undo/redo move through the
+    log, and the commit costs a single save.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({"Up": {"Rating": 8.3, "Year": 2009},
+                         "Heat": {"Rating": 8.3, "Year": 1995}})
+    version = storage.version()
+
+    session = storage.edit()
+    session.add_movie({"Alien": {"Rating": 8.5, "Year": 1979}})
+    session.delete_movie("Up")
+    session.update_movie("Heat", "first")
+    session.update_movie("Heat", "second")
+    assert session.undo() == ("note", "Heat", "second")
+    assert session.get_movies()["Heat"]["Notes"] == "first"
+    assert session.redo() == ("note", "Heat", "second")
+    assert session.redo() is None
+    session.undo()
+    session.undo()
+    session.update_movie("Heat", "third")
+    assert session.redo() is None
+    assert list(session.get_movies()) == ["Heat", "Alien"]
+    assert storage.version() == version and "Up" in storage.get_movies()
+
+    assert not session.commit()
+    movies = storage.get_movies()
+    assert storage.version() == version + 1
+    assert list(movies) == ["Heat", "Alien"]
+    assert movies["Heat"]["Notes"] == "third"
+
+
+def test_commit_replays_on_concurrent_changes(tmp_path):
+    """
+    Test that edits are applied on top of another writer's save and edits to a
+    movie that writer deleted are reported as skipped.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({"Up": {"Rating": 8.3, "Year": 2009},
+                         "Heat": {"Rating": 8.3, "Year": 1995}})
+    session = storage.edit()
+    session.update_movie("Up", "balloons")
+    session.update_movie("Heat", "bank")
+
+    other = StorageJson(str(tmp_path / "movies.json"))
+    other.delete_movie("Up")
+    other.add_movie({"Alien": {"Rating": 8.5, "Year": 1979}})
+
+    assert session.commit() == [("note", "Up", "balloons")]
+    movies = storage.get_movies()
+    assert list(movies) == ["Heat", "Alien"] and movies["Heat"]["Notes"] == "bank"
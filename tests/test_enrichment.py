@@ -0,0 +1,114 @@
+import json
+from commands.downloader import APIError
+from commands.enrichment import EnrichmentWorker, find_stale
+from commands.rate_limit import RateLimiter
+from storage.storage_json import StorageJson
+
+LINK = "https://www.imdb.com/title/tt1375666/"
+POSTER = "https://m.media-amazon.com/images/M/inception.jpg"
+
+
+class FakeDownloader:
+    """
+    Stand-in for MovieInfoDownloader that answers from memory and records the lookups.
+    """
+
+    def __init__(self, fail=(), poster=POSTER):
+        self.requests = []
+        self.fail = set(fail)
+        self.poster = poster
+
+    def fetch_movie_by_id(self, imdb_id):
+        """Return fresh details for an IMDb ID."""
+        self.requests.append(imdb_id)
+        return {"Inception": {"Rating": 8.8, "Year": 2010, "Poster": self.poster,
+                              "IMDB Link": LINK, "Notes": ""}}
+
+    def fetch_movie_data(self, title):
+        """Return fresh details for a title, or fail for titles marked as failing."""
+        self.requests.append(title)
+        if title in self.fail:
+            raise APIError("Movie not found!")
+        return {title.upper(): {"Rating": 7.0, "Year": 2000, "Poster": POSTER,
+                                "IMDB Link": f"https://www.imdb.com/title/tt{len(title)}/",
+                                "Notes": ""}}
+
+
+def make_storage(tmp_path):
+    """Create a catalog with one stale movie by ID, two by title and one complete one."""
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({
+        "Inception": {"Rating": 8.0, "Year": 2010, "Poster": "N/A", "IMDB Link": LINK,
+                      "Notes": "dream"},
+        "Alpha": {"Rating": 6.0, "Year": 2000},
+        "Beta": {"Rating": 6.0, "Year": 2000},
+        "Complete": {"Rating": 9.0, "Year": 1999, "Poster": POSTER, "IMDB Link": LINK},
+    })
+    return storage
+
+
+def test_worker_refreshes_stale_movies_in_batches(tmp_path):
+    """
+    Test that stale movies are refreshed by ID or title while titles and notes are kept.
+    """
+    storage = make_storage(tmp_path)
+    downloader = FakeDownloader(fail={"Beta"})
+    worker = EnrichmentWorker(storage, downloader, rate=1000, batch_size=1)
+    worker.start()
+    worker.join(10)
+
+    movies = storage.get_movies()
+    assert sorted(downloader.requests) == ["Alpha", "Beta", "tt1375666"]
+    assert movies["Inception"] == {"Rating": 8.8, "Year": 2010, "Poster": POSTER,
+                                   "IMDB Link": LINK, "Notes": "dream"}
+    assert movies["Alpha"]["Poster"] == POSTER
+    assert "Poster" not in movies["Beta"]
+    assert worker.refreshed == 2 and list(worker.failed) == ["Beta"]
+    assert find_stale(movies) == ["Beta"]
+    assert not (tmp_path / "movies.json.enrich.json").exists()
+
+
+def test_worker_resumes_from_checkpoint(tmp_path):
+    """
+    Test that titles recorded in the checkpoint are not fetched again.
+    """
+    storage = make_storage(tmp_path)
+    checkpoint = tmp_path / "movies.json.enrich.json"
+    checkpoint.write_text(json.dumps({"refresh_all": False, "done": ["Inception", "Alpha"]}))
+    downloader = FakeDownloader()
+    assert EnrichmentWorker(storage, downloader, rate=1000).run()
+    assert downloader.requests == ["Beta"]
+
+
+def test_movies_without_poster_are_not_fetched_again_until_retry(tmp_path, monkeypatch):
+    """
+    Test that a movie OMDb has no poster for is skipped by the next runs until RETRY_AFTER.
+    """
+    storage = make_storage(tmp_path)
+    downloader = FakeDownloader(poster="N/A")
+    assert EnrichmentWorker(storage, downloader, rate=1000).run()
+    assert sorted(downloader.requests) == ["Alpha", "Beta", "tt1375666"]
+    assert find_stale(storage.get_movies()) == ["Inception"]
+
+    downloader.requests.clear()
+    assert EnrichmentWorker(storage, downloader, rate=1000).run()
+    assert not downloader.requests
+
+    monkeypatch.setattr("commands.enrichment.RETRY_AFTER", 0)
+    assert EnrichmentWorker(storage, downloader, rate=1000).run()
+    assert downloader.requests == ["tt1375666"]
+
+
+def test_rate_limiter_spaces_out_calls():
+    """
+    Test that the token bucket allows a burst and then one call per 1/rate seconds.
+    """
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    assert now[0] == 2.0
@@ -0,0 +1,79 @@
+import pytest
+from commands.downloader import RECORD, REPLAY, APIError, MovieInfoDownloader
+from commands.fake_omdb import start_fake_omdb, synthetic_record
+from commands.load_test import run_load_test
+from commands.rate_limit import CircuitBreaker, RateLimiter, RetryPolicy
+
+
+@pytest.fixture(name="server")
+def fixture_server():
+    """
+    Run a fake OMDb server without latency for the duration of a test.
+    """
+    server = start_fake_omdb(seed=1)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_record_then_replay_without_network(server, tmp_path):
+    """
+    Test that recorded responses are replayed offline and served by the fake server.
+    """
+    recording = str(tmp_path / "omdb.jsonl")
+    recorder = MovieInfoDownloader(api_url=server.url, api_key="test", mode=RECORD,
+                                   recording=recording)
+    movie = recorder.fetch_movie_data("Inception")
+    assert movie == recorder.fetch_movie_data("Inception")
+
+    replayer = MovieInfoDownloader(api_url="http://127.0.0.1:9/", mode=REPLAY,
+                                   recording=recording)
+    assert replayer.fetch_movie_data("inception") == movie
+    with pytest.raises(APIError, match="No recorded response"):
+        replayer.fetch_movie_data("Heat")
+
+    recorded = start_fake_omdb(recording, synthesize=False)
+    try:
+        downloader = MovieInfoDownloader(api_url=recorded.url, api_key="test")
+        assert downloader.fetch_movie_data("Inception") == movie
+        with pytest.raises(APIError, match="Incomplete data"):
+            downloader.fetch_movie_data("Heat")
+    finally:
+        recorded.shutdown()
+        recorded.server_close()
+
+
+def test_throttling_and_errors_carry_their_status(server):
+    """
+    Test that 429 and 503 responses surface as APIError with the HTTP status.
+    """
+    downloader = MovieInfoDownloader(api_url=server.url, api_key="test",
+                                     limiter=RateLimiter(100), breaker=CircuitBreaker(),
+                                     retry=RetryPolicy(attempts=1))
+    server.throttle_rate = 1.0
+    with pytest.raises(APIError) as error:
+        downloader.fetch_movie_data("Heat")
+    assert error.value.status == 429
+    assert error.value.retry_after == 1
+    server.throttle_rate, server.error_rate = 0.0, 1.0
+    with pytest.raises(APIError) as error:
+        downloader.fetch_movie_by_id("tt0113277")
+    assert error.value.status == 503
+    assert server.counts == {429: 1, 503: 1}
+
+
+def test_load_test_reports_every_add(tmp_path):
+    """
+    Test that a load run adds the successful lookups and counts the failures.
+    """
+    report, counts = run_load_test(60, 8, str(tmp_path / "load.json"), error_rate=0.3,
+                                   seed=3, attempts=2)
+    failed = sum(report.failures.values())
+    assert len(report.add_latencies) == counts[200]
+    assert len(report.add_latencies) + failed == 60
+    # Every 503 was either retried or reported
+    downloader = report.counters["downloader"]
+    assert downloader["retries"] + downloader.get("failures", 0) == counts[503]
+    assert failed == report.failures[503] == downloader.get("failures", 0)
+    assert synthetic_record("Load Test Movie 0")["Title"] == "Load Test Movie 0"
+    assert "movies added" in report.summary()
@@ -0,0 +1,93 @@
+from commands.fulltext import FullTextIndex, analyze, stem
+from storage.storage_json import StorageJson
+
+MOVIES = {
+    "Inception": {"Rating": 8.8, "Year": 2010,
+                  "Notes": "A thief steals secrets by entering dreams; a dream heist"},
+    "Heat": {"Rating": 8.3, "Year": 1995, "Notes": "Heists in Los Angeles"},
+    "The Great Escape": {"Rating": 8.2, "Year": 1963, "Notes": "Prisoners of war escaping"},
+    "Paprika": {"Rating": 7.7, "Year": 2006, "Notes": "Dreams leak into reality"},
+}
+
+
+def build_index():
+    """
+    Builds an in-memory index of MOVIES.
+    """
+    index = FullTextIndex()
+    index.sync(MOVIES)
+    return index
+
+
+def test_stemming_and_accents():
+    """
+    Test that word forms share a stem and accents are ignored.
+    """
+    assert stem("running") == stem("runs") == "run"
+    assert stem("heists") == stem("heist")
+    assert stem("movies") == stem("movie") and stem("stories") == stem("story")
+    assert stem("escapes") == stem("escape") and stem("heroes") == stem("hero")
+    assert analyze("Amélie's DREAMS") == analyze("amelie s dream")
+
+
+def test_bm25_prefers_title_and_frequent_matches():
+    """
+    Test that word forms match and title matches outrank note matches.
+    """
+    index = build_index()
+    titles = [title for title, _ in index.search("dreaming")]
+    assert titles == ["Inception", "Paprika"]
+    # "Heat" only mentions heists once, but its notes are shorter
+    assert [title for title, _ in index.search("heist")] == ["Heat", "Inception"]
+    assert index.search("escape")[0][0] == "The Great Escape"
+    assert not index.search("zombie")
+
+
+def test_plurals_match_their_singular():
+    """
+    Test that searching for a singular finds plural notes and the other way round.
+    """
+    index = FullTextIndex()
+    index.sync({"Cinema Paradiso": {"Rating": 8.5, "Year": 1988, "Notes": "Loves movies"},
+                "Big Fish": {"Rating": 8.0, "Year": 2003, "Notes": "A story of stories"},
+                "Heat": {"Rating": 8.3, "Year": 1995, "Notes": "A movie about a heist"}})
+    assert {title for title, _ in index.search("movie")} == {"Cinema Paradiso", "Heat"}
+    assert {title for title, _ in index.search("movies")} == {"Cinema Paradiso", "Heat"}
+    assert {title for title, _ in index.search("movie*")} == {"Cinema Paradiso", "Heat"}
+    assert [title for title, _ in index.search("story")] == ["Big Fish"]
+
+
+def test_phrase_and_prefix_queries():
+    """
+    Test that quoted phrases must match consecutively and prefixes expand.
+    """
+    index = build_index()
+    assert [title for title, _ in index.search('"dream heist"')] == ["Inception"]
+    assert not index.search('"heist dream"')
+    # The phrase may not run from the title into the notes
+    assert not index.search('"escape prisoner"')
+    assert {title for title, _ in index.search("pri*")} == {"The Great Escape"}
+    assert {title for title, _ in index.search("he*")} == {"Heat", "Inception"}
+
+
+def test_index_follows_storage_saves(tmp_path):
+    """
+    Test that saves update the index incrementally and the sidecar round-trips.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies(MOVIES)
+    index = FullTextIndex.open(storage)
+    assert (tmp_path / "movies.json.fts").exists()
+
+    storage.update_movie("Heat", "Bank robbery downtown")
+    storage.delete_movie("Paprika")
+    assert [title for title, _ in index.search("heist")] == ["Inception"]
+    assert [title for title, _ in index.search("robbery")] == ["Heat"]
+    assert "Paprika" not in index
+    index.save_if_changed()
+
+    assert FullTextIndex.open(storage) is index
+    reopened = FullTextIndex.open(StorageJson(storage.path))
+    assert reopened is not index and reopened.version == storage.version()
+    assert len(reopened) == 3
+    assert [title for title, _ in reopened.search("robbery")] == ["Heat"]
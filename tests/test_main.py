@@ -0,0 +1,14 @@
+import pytest
+from main import parse_args
+
+
+def test_list_window_must_not_be_negative():
+    """
+    Test that a negative --offset or --limit is a usage error instead of a crash.
+    """
+    args = parse_args(["--list", "--offset", "2", "--limit", "0"])
+    assert (args.offset, args.limit) == (2, 0)
+    for option in ("--offset", "--limit"):
+        for value in ("-1", "ten"):
+            with pytest.raises(SystemExit):
+                parse_args(["--list", option, value])
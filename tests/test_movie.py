@@ -0,0 +1,63 @@
+import json
+import pickle
+from storage.movie import Movie, MovieCollection, movie_json_default
+
+DETAILS = {
+    "Year": 1994,
+    "Rating": 9.3,
+    "Poster": "https://m.media-amazon.com/images/M/MV5BMDAyY2FhYjct._V1_SX300.jpg",
+    "IMDB Link": "https://www.imdb.com/title/tt0111161/",
+    "Notes": ""
+}
+
+
+def test_movie_behaves_like_its_dict():
+    """
+    Test that a Movie exposes the storage field names and compares equal to the dict.
+    """
+    movie = Movie.from_dict(DETAILS)
+    assert movie == DETAILS
+    assert movie["Poster"] == DETAILS["Poster"]
+    assert movie.imdb_id == "tt0111161"
+    assert {**movie} == DETAILS
+    assert not hasattr(movie, "__dict__")
+
+
+def test_missing_and_extra_fields_round_trip():
+    """
+    Test that missing fields stay missing and unknown fields are preserved.
+    """
+    details = {"Rating": 8.8, "Year": 2010, "Budget": 160}
+    movie = Movie.from_dict(details)
+    assert movie == details
+    assert movie.get("Poster", "") == ""
+    assert movie.imdb_id is None
+    assert pickle.loads(pickle.dumps(movie)) == details
+
+
+def test_collection_converts_assigned_values():
+    """
+    Test that update() and item assignment store Movie records, and that the
+    collection serializes back to the original JSON.
+    """
+    movies = MovieCollection()
+    movies.update({"The Shawshank Redemption": DETAILS})
+    movies["Up"] = {"Rating": 8.3, "Year": 2009}
+    movies["Up"]["Notes"] = "Balloons"
+    assert isinstance(movies["Up"], Movie)
+    assert movies["Up"].notes == "Balloons"
+    encoded = json.dumps(movies, default=movie_json_default)
+    assert json.loads(encoded) == movies.to_dict()
+    assert json.loads(encoded)["The Shawshank Redemption"] == DETAILS
+
+
+def test_collection_finds_movies_by_alias_and_imdb_id():
+    """
+    Test that find() resolves spelling variants and IMDb IDs, and follows edits.
+    """
+    movies = MovieCollection({"The Shawshank Redemption": DETAILS})
+    assert movies.find("shawshank redemption, the") == "The Shawshank Redemption"
+    assert movies.find("tt0111161") == "The Shawshank Redemption"
+    assert movies.find("Shawshank") is None
+    movies["Die Verurteilten"] = movies.pop("The Shawshank Redemption")
+    assert movies.find("tt0111161") == "Die Verurteilten"
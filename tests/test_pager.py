@@ -0,0 +1,44 @@
+import io
+from commands.crud import Crud
+from commands.pager import page_lines
+from storage.storage_json import StorageJson
+
+
+def test_pages_stop_reading_after_quit():
+    """
+    Test that lines are written a page per write and that quitting stops the producer.
+    """
+    produced = []
+
+    def lines():
+        for index in range(10):
+            produced.append(index)
+            yield f"{index}\n"
+
+    out, answers = io.StringIO(), iter(["", "q"])
+    assert page_lines(lines(), 3, out, lambda prompt: next(answers)) == (6, False)
+    assert out.getvalue() == "".join(f"{index}\n" for index in range(6))
+    assert len(produced) == 7
+
+    out = io.StringIO()
+    assert page_lines(lines(), None, out) == (10, True)
+
+
+def test_list_movies_streams_a_window(tmp_path, monkeypatch, capsys):
+    """
+    Test that listing with an offset and limit streams the file instead of loading it.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({f"Movie {index}": {"Rating": 5.0, "Year": 2000 + index}
+                         for index in range(20)})
+    crud = Crud(storage)
+
+    def load_all():
+        raise AssertionError("the whole file was loaded")
+    monkeypatch.setattr(storage, "get_movies", load_all)
+    crud.list_movies(offset=5, limit=2, page_size=0)
+    assert capsys.readouterr().out == \
+        "\nMovie 5 (2005): 5.0 \nMovie 6 (2006): 5.0 \n\nListed movies 6 to 7\n"
+
+    crud.list_movies(page_size=0)
+    assert capsys.readouterr().out.endswith("Movie 19 (2019): 5.0 \n\n20 movies in total\n")
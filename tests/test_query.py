@@ -0,0 +1,82 @@
+import pytest
+from commands.query import MovieFrame, Query, QueryError
+
+MOVIES = {
+    "The Godfather": {"Rating": 9.2, "Year": 1972, "Poster": "http://p/1.jpg", "Notes": ""},
+    "The Godfather Part II": {"Rating": 9.0, "Year": 1974, "Poster": "N/A", "Notes": "Sequel"},
+    "The Dark Knight": {"Rating": 9.0, "Year": 2008, "Poster": "http://p/3.jpg", "Notes": ""},
+    "Pulp Fiction": {"Rating": 8.9, "Year": 1994, "Poster": "", "Notes": "Tarantino"},
+    "Up": {"Rating": 8.3, "Year": 2009, "Poster": "http://p/5.jpg", "Notes": ""}
+}
+
+
+def titles(query_text):
+    """
+    Compile and run a query over MOVIES, returning the matching titles.
+    """
+    return [title for title, _ in Query.compile(query_text).run(MOVIES)]
+
+
+def test_numeric_ranges_and_boolean_logic():
+    """
+    Test rating/year comparisons, BETWEEN and the AND/OR/NOT combinators.
+    """
+    assert titles("rating >= 9 AND year BETWEEN 1970 AND 1979") == [
+        "The Godfather", "The Godfather Part II"]
+    assert titles("year > 2000 OR rating < 9 AND NOT year > 2000") == [
+        "The Dark Knight", "Pulp Fiction", "Up"]
+    assert titles("(year < 1980 OR year > 2008) AND rating != 9") == ["The Godfather", "Up"]
+
+
+def test_title_and_presence_predicates():
+    """
+    Test title substring and regex matching and the HAS NOTES / HAS POSTER checks.
+    """
+    assert titles('title CONTAINS "godfather"') == ["The Godfather", "The Godfather Part II"]
+    assert titles("title MATCHES '^the .*t$'") == ["The Dark Knight"]
+    assert titles("HAS NOTES") == ["The Godfather Part II", "Pulp Fiction"]
+    assert titles("NOT HAS POSTER") == ["The Godfather Part II", "Pulp Fiction"]
+
+
+def test_order_by_and_limit():
+    """
+    Test ORDER BY with and without LIMIT, including a query with no filter.
+    """
+    assert titles("ORDER BY year DESC LIMIT 2") == ["Up", "The Dark Knight"]
+    assert titles("rating < 9 ORDER BY rating") == ["Up", "Pulp Fiction"]
+    assert titles("ORDER BY title LIMIT 1") == ["Pulp Fiction"]
+    assert len(titles("")) == len(MOVIES)
+
+
+def test_descending_order_keeps_ties_and_puts_unrated_last():
+    """
+    Test that ORDER BY ... DESC gives the same stable order with and without LIMIT.
+    """
+    movies = {"A": {"Rating": 7.0, "Year": 2000}, "B": {"Rating": 8.0, "Year": 2001},
+              "C": {"Rating": 7.0, "Year": 2002}, "D": {"Rating": None, "Year": 2003},
+              "E": {"Rating": 6.0, "Year": 2004}}
+    ordered = [title for title, _ in Query.compile("ORDER BY rating DESC").run(movies)]
+    assert ordered == ["B", "A", "C", "E", "D"]
+    for limit in range(1, len(movies)):
+        query = Query.compile(f"ORDER BY rating DESC LIMIT {limit}")
+        assert [title for title, _ in query.run(movies)] == ordered[:limit]
+
+
+def test_prebuilt_frame_is_reused():
+    """
+    Test that a query can run against a prebuilt MovieFrame.
+    """
+    frame = MovieFrame(MOVIES)
+    results = Query.compile("year < 1980").run(None, frame)
+    assert [title for title, _ in results] == ["The Godfather", "The Godfather Part II"]
+
+
+@pytest.mark.parametrize("query_text", ["rating >", "title CONTAINS 5", "budget > 3",
+                                        "year BETWEEN 1 2", "title MATCHES '('", "LIMIT -1",
+                                        "rating > 5 rating"])
+def test_invalid_queries(query_text):
+    """
+    Test that malformed queries raise QueryError.
+    """
+    with pytest.raises(QueryError):
+        Query.compile(query_text)
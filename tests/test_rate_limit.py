@@ -0,0 +1,110 @@
+import random
+import pytest
+from commands.downloader import APIError, MovieInfoDownloader
+from commands.fake_omdb import start_fake_omdb
+from commands.rate_limit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RateLimiter, RetryPolicy
+
+
+class FakeClock:
+    """
+    Manually advanced time source whose sleep() moves the clock forward.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance the clock instead of sleeping."""
+        self.now += seconds
+
+
+def test_limiter_backs_off_honours_retry_after_and_recovers():
+    """
+    Test that penalize() halves the rate and pauses calls, and reward() restores it.
+    """
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10, burst=1, clock=clock, sleep=clock.sleep)
+    limiter.acquire()
+    limiter.penalize(retry_after=3)
+    assert limiter.rate == 5
+    limiter.acquire()
+    assert clock.now == pytest.approx(3.0)
+    for _ in range(5):
+        limiter.penalize()
+    assert limiter.rate == limiter.min_rate == 0.5
+    for _ in range(100):
+        limiter.reward()
+    assert limiter.rate == 10
+    assert limiter.counters()["throttled"] == 6
+    assert limiter.counters()["waited"] == pytest.approx(3.0)
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_a_trial():
+    """
+    Test the closed -> open -> half-open -> closed cycle of the circuit breaker.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    clock.now = 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    # Only one trial call at a time while half-open
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_in() == 10
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.counters() == {"state": CLOSED, "opened": 2, "rejected": 2}
+
+
+def test_retry_delays_are_jittered_and_bounded():
+    """
+    Test that backoff grows exponentially up to the cap and respects Retry-After.
+    """
+    policy = RetryPolicy(base_delay=1, max_delay=5, rng=random.Random(2))
+    for retry in range(6):
+        delays = [policy.delay(retry) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(5, 2 ** retry)
+        assert len(set(delays)) > 100
+    assert policy.delay(0, retry_after=7) == 7
+
+
+def test_downloader_retries_transient_failures_then_fails_fast():
+    """
+    Test that 503s are retried, and that repeated failures open the circuit.
+    """
+    server = start_fake_omdb(seed=4)
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=100, reset_timeout=60, clock=clock)
+    downloader = MovieInfoDownloader(
+        api_url=server.url, api_key="test", limiter=RateLimiter(1000), breaker=breaker,
+        retry=RetryPolicy(attempts=5, sleep=clock.sleep))
+    try:
+        server.error_rate = 0.3
+        for title in ("Heat", "Alien", "Brazil", "Fargo"):
+            assert title in downloader.fetch_movie_data(title)
+        assert downloader.counts["retries"] == server.counts.get(503, 0) > 0
+
+        server.error_rate, breaker.threshold = 1.0, 3
+        requests = downloader.counts["requests"]
+        with pytest.raises(APIError, match="unavailable"):
+            downloader.fetch_movie_data("Heat")
+        # The circuit opened after three failures and cut the remaining retries short
+        assert downloader.counts["requests"] - requests == 3 and breaker.state == OPEN
+        with pytest.raises(APIError, match="unavailable"):
+            downloader.fetch_movie_data("Alien")
+        counters = downloader.counters()
+        assert counters["downloader"]["short_circuited"] == 2
+        assert counters["downloader"]["requests"] == requests + 3
+        assert counters["breaker"]["opened"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
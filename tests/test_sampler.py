@@ -0,0 +1,59 @@
+import random
+from collections import Counter
+from commands.sampler import MovieSampler
+from storage.storage_json import StorageJson
+
+
+def test_rating_weighted_picks_follow_weights():
+    """
+    Test that rating weighting picks movies in proportion to rating + base weight.
+    """
+    sampler = MovieSampler(history=0, rng=random.Random(5))
+    sampler.rebuild({"Good": {"Rating": 9.5, "Year": 2000},
+                     "Bad": {"Rating": 1.5, "Year": 2000}})
+    counts = Counter(sampler.pick("rating") for _ in range(6000))
+    assert 4.0 < counts["Good"] / counts["Bad"] < 6.0
+
+
+def test_unrated_movies_keep_no_rating():
+    """
+    Test that an unrated movie reports no rating but can still be picked by rating.
+    """
+    sampler = MovieSampler(history=0, rng=random.Random(3))
+    sampler.rebuild({"Good": {"Rating": 9.5, "Year": 2000}, "Unrated": {"Year": 2000}})
+    assert sampler.rating("Unrated") is None and sampler.rating("Good") == 9.5
+    assert "Unrated" in {sampler.pick("rating") for _ in range(200)}
+    assert sampler.pick(min_rating=0.0, end_year=2000) == "Good"
+
+
+def test_picks_skip_recent_and_respect_filters():
+    """
+    Test that recent picks are not repeated and constraints are honored.
+    """
+    movies = {f"Movie {year}": {"Rating": 5.0 + year % 5, "Year": year}
+              for year in range(1990, 2000)}
+    sampler = MovieSampler(history=4, rng=random.Random(1))
+    sampler.rebuild(movies)
+    picks = [sampler.pick(start_year=1994, end_year=1998) for _ in range(5)]
+    assert len(set(picks)) == 5
+    assert all(1994 <= movies[title]["Year"] <= 1998 for title in picks)
+    # Only one movie qualifies: it is repeated rather than returning nothing
+    assert sampler.pick(min_rating=9.0, end_year=1998) == "Movie 1994"
+    assert sampler.pick(min_rating=9.0, end_year=1998) == "Movie 1994"
+    assert sampler.pick(min_rating=10.0) is None
+
+
+def test_sampler_follows_storage_saves(tmp_path):
+    """
+    Test that the storage listener keeps the sampler in sync without rebuilds.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    sampler = MovieSampler()
+    storage.add_listener(sampler.on_save)
+    storage.save_movies({"Up": {"Rating": 8.3, "Year": 2009},
+                         "Heat": {"Rating": 8.3, "Year": 1995}})
+    storage.add_movie({"Alien": {"Rating": 8.5, "Year": 1979}})
+    storage.delete_movie("Up")
+    assert sampler.version == storage.version()
+    assert len(sampler) == 2 and sampler.rating("Alien") == 8.5
+    assert {sampler.pick() for _ in range(50)} == {"Alien", "Heat"}
@@ -0,0 +1,124 @@
+import io
+import json
+import pytest
+from commands.analytics import Analytics
+from storage.json_stream import iter_json_object, write_json_object
+from storage.schema import LEGACY_VERSION, SCHEMA_VERSION, SchemaVersionError
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+
+LEGACY_JSON = {
+    "Heat": {"year": "1995", "Rating": "8.3",
+             "imdb link": "https://www.imdb.com/title/tt0113277/"},
+    "Dark": {"Year": "2017–2020", "Rating": "N/A", "Notes": None},
+    "Alien": {"Year": 1979, "Rating": 8.5, "Notes": "Classic"}
+}
+UPGRADED = {
+    "Heat": {"Year": 1995, "Rating": 8.3, "IMDB Link": "https://www.imdb.com/title/tt0113277/",
+             "Notes": ""},
+    "Dark": {"Year": 2017, "Notes": ""},
+    "Alien": {"Year": 1979, "Rating": 8.5, "Notes": "Classic"}
+}
+
+
+def test_legacy_json_is_upgraded_on_read_and_save(tmp_path):
+    """
+    Test that an unversioned JSON file loads upgraded and is only rewritten by the next save.
+    """
+    path = tmp_path / "movies.json"
+    path.write_text(json.dumps(LEGACY_JSON), encoding="utf-8")
+    storage = StorageJson(str(path))
+    assert storage.get_movies() == UPGRADED
+    assert dict(storage.iter_movies()) == UPGRADED
+    assert storage.schema_version() == LEGACY_VERSION
+
+    storage.update_movie("Alien", "Rewatch")
+    assert storage.schema_version() == SCHEMA_VERSION
+    assert next(iter(json.loads(path.read_text(encoding="utf-8")))) == "_schema"
+    assert storage.get_movies()["Heat"] == UPGRADED["Heat"]
+
+
+def test_migrate_rewrites_files_in_a_stream(tmp_path):
+    """
+    Test that migrate() upgrades JSON and CSV files once and bumps the version.
+    """
+    json_path = tmp_path / "movies.json"
+    json_path.write_text(json.dumps(LEGACY_JSON), encoding="utf-8")
+    storage = StorageJson(str(json_path))
+    version = storage.version()
+    assert storage.migrate() and not storage.migrate()
+    assert storage.version() == version + 1
+    assert storage.get_movies() == UPGRADED
+
+    csv_path = tmp_path / "movies.csv"
+    csv_path.write_text("title,Year,Rating,Poster,IMDB Link,Notes\n"
+                        "Heat,1995,8.3,,,\nBroken,1995\nDark,2017–2020,N/A,,,\n"
+                        "\"Alien\",1979,8.5,,,\"multi\nline\"\n",
+                        encoding="utf-8")
+    storage = StorageCsv(str(csv_path))
+    assert storage.schema_version() == LEGACY_VERSION
+    assert storage.migrate()
+    assert (tmp_path / "movies.csv.rejects.csv").exists()
+    lines = csv_path.read_text(encoding="utf-8").splitlines()
+    assert lines[:2] == [f"#schema={SCHEMA_VERSION}",
+                         "Title,Year,Rating,Poster,IMDB Link,Notes"]
+    empty = {"Poster": "", "IMDB Link": ""}
+    assert storage.get_movies() == {"Heat": {"Year": 1995, "Rating": 8.3, "Notes": "", **empty},
+                                    "Dark": {"Year": 2017, "Notes": "", **empty},
+                                    "Alien": {"Year": 1979, "Rating": 8.5,
+                                              "Notes": "multi\nline", **empty}}
+
+
+def test_newer_schema_is_refused(tmp_path):
+    """
+    Test that a file written with a newer schema is not loaded and overwritten.
+    """
+    path = tmp_path / "movies.csv"
+    path.write_text(f"#schema={SCHEMA_VERSION + 1}\nTitle,Year,Rating\nHeat,1995,8.3\n",
+                    encoding="utf-8")
+    with pytest.raises(SchemaVersionError):
+        StorageCsv(str(path)).get_movies()
+    with pytest.raises(SchemaVersionError):
+        StorageCsv(str(path)).migrate()
+
+
+def test_json_stream_round_trip():
+    """
+    Test that the streaming reader and writer match the json module for any chunk size.
+    """
+    data = {"_schema": 2, "A \"quoted\" é": {"Year": 12345, "Notes": "x\ny"}, "B": {}}
+    for compact, layout in ((False, {"indent": 4}), (True, {"separators": (",", ":")})):
+        file = io.StringIO()
+        write_json_object(file, data.items(), compact)
+        assert file.getvalue() == json.dumps(data, ensure_ascii=False, **layout)
+        for chunk_size in (1, 3, 1000):
+            assert dict(iter_json_object(io.StringIO(file.getvalue()), chunk_size)) == data
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_object(io.StringIO('{"a": 1,}')))
+
+
+def test_migrated_movies_without_rating_or_year_are_handled(tmp_path, monkeypatch, capsys):
+    """
+    Test that statistics, sorting and printing skip or place last the values a
+    migration could not parse.
+    """
+    path = tmp_path / "movies.json"
+    path.write_text(json.dumps({**LEGACY_JSON, "Odd": {"Year": "unknown", "Rating": "7.0"}}),
+                    encoding="utf-8")
+    storage = StorageJson(str(path))
+    assert storage.migrate()
+    movies = storage.get_movies()
+    stats = Analytics.compute_statistics(movies)
+    assert (stats["best"], stats["worst"], stats["median"]) == (["Alien"], ["Odd"], 8.3)
+
+    by_rating = Analytics.top_movies(movies.items(), "Rating", True)
+    assert [title for title, _ in by_rating] == ["Alien", "Heat", "Odd", "Dark"]
+    by_year = [title for title, _ in Analytics.top_movies(movies.items(), "Year", False, 1, 3)]
+    assert by_year == ["Heat", "Dark", "Odd"]
+    monkeypatch.setattr("commands.parallel.PARALLEL_THRESHOLD", 2)
+    assert Analytics.compute_statistics(movies, workers=2) == stats
+    assert Analytics.top_movies(movies.items(), "Year", False, 1, 3, workers=2) == \
+        Analytics.top_movies(movies.items(), "Year", False, 1, 3)
+
+    Analytics.print_movies(by_rating)
+    assert capsys.readouterr().out.splitlines()[2:] == ["Odd (N/A): 7.0", "Dark (2017): N/A"]
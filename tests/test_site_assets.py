@@ -0,0 +1,58 @@
+import gzip
+import json
+from commands.site_assets import (build_title_index, minify_css, minify_html, minify_js,
+                                  search_title_index)
+from commands.web_generator import WebGenerator
+from storage.storage_json import StorageJson
+
+
+def test_minifiers_keep_meaningful_whitespace():
+    """
+    Test that CSS, JS and HTML lose comments and layout but not separating spaces.
+    """
+    css = "/* grid */\n.movie-grid li :hover ,\n.a > .b {\n  margin: 0 auto;\n  color: red;\n}\n"
+    assert minify_css(css) == ".movie-grid li :hover,.a>.b{margin:0 auto;color:red}"
+    assert minify_js("// note\nvar a = 1\n\n    a++\n") == "var a = 1\na++"
+    assert minify_html("<ol>\n  <!-- x -->\n  <li>A  b</li>\n</ol>\n") == "<ol> <li>A b</li> </ol>"
+
+
+def test_title_index_matches_word_prefixes():
+    """
+    Test that the trie finds titles by the prefixes of all query words, ignoring accents.
+    """
+    titles = ["The Godfather", "Godfather II", "Amélie", "Go", "Alien", "Aliens"]
+    index = build_title_index(titles)
+    assert index["go"][""] == [3]
+    assert search_title_index(index, "god") == {0, 1}
+    assert search_title_index(index, "GO") == {0, 1, 3}
+    assert search_title_index(index, "amel") == {2}
+    assert search_title_index(index, "the god") == {0}
+    assert search_title_index(index, "alien ii") == set()
+    assert search_title_index(json.loads(json.dumps(index)), "alien") == {4, 5}
+
+
+def test_generated_site_is_fingerprinted_and_precompressed(tmp_path):
+    """
+    Test that the optimized site references fingerprinted assets and drops stale ones.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({"Heat": {"Rating": 8.3, "Year": 1995},
+                         "Up": {"Rating": 8.3, "Year": 2009}})
+    generator = WebGenerator(storage, str(tmp_path / "index.html"))
+    generator.generate_website()
+    dist = tmp_path / "dist"
+    first = {path.name for path in dist.iterdir()}
+    page = (dist / "index.html").read_text(encoding="utf-8")
+    assert "\n" not in page
+    for name in first - {"index.html", "index.html.gz"}:
+        if not name.endswith(".gz"):
+            assert f'"{name}"' in page
+            assert gzip.decompress((dist / f"{name}.gz").read_bytes()) == (dist / name).read_bytes()
+    index_name = next(name for name in first
+                      if name.startswith("titles.") and name.endswith(".json"))
+    assert json.loads((dist / index_name).read_text(encoding="utf-8"))["heat"][""] == [0]
+
+    storage.delete_movie("Heat")
+    generator.generate_website()
+    second = {path.name for path in dist.iterdir()}
+    assert index_name not in second and len(second) == len(first)
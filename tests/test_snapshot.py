@@ -0,0 +1,84 @@
+import os
+from storage.snapshot import MIN_MOVIES, file_digest
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+
+MOVIES = {f"Movie {index}": {"Rating": 5.0, "Year": 1990 + index % 30, "Notes": "",
+                             "Poster": f"https://m.media-amazon.com/images/M/{index}.jpg",
+                             "IMDB Link": f"https://www.imdb.com/title/tt{index:07d}/"}
+          for index in range(MIN_MOVIES)}
+
+
+def reading_storage(cls, path, monkeypatch):
+    """
+    Create a storage that records every parse of its file.
+    """
+    # pylint: disable=protected-access
+    storage = cls(path)
+    reads = []
+    monkeypatch.setattr(storage, "_read_movies",
+                        lambda real=storage._read_movies: reads.append(1) or real())
+    return storage, reads
+
+
+def test_snapshot_replaces_parsing_until_the_file_changes(tmp_path, monkeypatch):
+    """
+    Test that a new storage object loads the snapshot and that outside edits invalidate it.
+    """
+    path = str(tmp_path / "movies.json")
+    saved = StorageJson(path)
+    saved.save_movies(MOVIES)
+    saved._snapshot.wait()  # pylint: disable=protected-access
+    assert os.path.exists(path + ".snapshot")
+
+    storage, reads = reading_storage(StorageJson, path, monkeypatch)
+    assert storage.get_movies() == MOVIES and not reads
+
+    # Same content, new modification time: the hash keeps the snapshot valid
+    os.utime(path, ns=(0, 0))
+    assert storage.get_movies() == MOVIES and not reads
+
+    with open(path, "r+", encoding="utf-8") as file:
+        text = file.read().replace('"Movie 1"', '"Movie X"')
+        file.seek(0)
+        file.write(text)
+    assert "Movie X" in storage.get_movies() and len(reads) == 1
+
+
+def test_snapshot_is_rebuilt_after_saves(tmp_path, monkeypatch):
+    """
+    Test that edits rewrite the snapshot in the background for the next start.
+    """
+    path = str(tmp_path / "movies.csv")
+    StorageCsv(path).save_movies(MOVIES)
+    storage = StorageCsv(path)
+    storage.update_movie("Movie 7", "seen")
+    storage._snapshot.wait()  # pylint: disable=protected-access
+
+    restarted, reads = reading_storage(StorageCsv, path, monkeypatch)
+    assert restarted.get_movies()["Movie 7"].notes == "seen" and not reads
+    assert restarted.get_movies()["Movie 8"].imdb_id == "tt0000008"
+
+    storage.save_movies({"Only": {"Rating": 1.0, "Year": 2000}})
+    storage._snapshot.wait()  # pylint: disable=protected-access
+    assert not os.path.exists(path + ".snapshot")
+    assert list(restarted.get_movies()) == ["Only"]
+
+
+def test_verified_snapshot_is_trusted_on_the_next_load(tmp_path, monkeypatch):
+    """
+    Test that once a racy snapshot was verified by its hash, the next load skips the hash.
+    """
+    path = str(tmp_path / "movies.json")
+    saved = StorageJson(path)
+    saved.save_movies(MOVIES)
+    saved._snapshot.wait()  # pylint: disable=protected-access
+    hashes = []
+    monkeypatch.setattr("storage.snapshot.file_digest",
+                        lambda source, real=file_digest: hashes.append(1) or real(source))
+    # The file is now older than the racy window
+    monkeypatch.setattr("storage.snapshot.RACY_SECONDS", 0.0)
+
+    storage, reads = reading_storage(StorageJson, path, monkeypatch)
+    assert storage.get_movies() == MOVIES and len(hashes) == 1
+    assert storage.get_movies() == MOVIES and len(hashes) == 1 and not reads
@@ -130,6 +130,23 @@ def test_save_and_get_movies(setup_csv_file):
     assert stored_movies == movies_to_save, "Saved movies do not match the expected output."
 
 
+def test_unrated_and_undated_movies_round_trip(setup_csv_file):
+    """
+    Test that movies without a rating or a year are saved and read back as such.
+    """
+    storage, csv_file = setup_csv_file
+    storage.save_movies({"A": {"Rating": 8.0, "Year": 1999, "Notes": ""},
+                         "B": {"Rating": None, "Year": None, "Notes": ""},
+                         "C": {"Rating": 7.5, "Notes": "no year"}})
+
+    stored_movies = StorageCsv(str(csv_file)).get_movies()
+    assert list(stored_movies) == ["A", "B", "C"]
+    assert (stored_movies["A"].year, stored_movies["A"].rating) == (1999, 8.0)
+    assert (stored_movies["B"].year, stored_movies["B"].rating) == (None, None)
+    assert (stored_movies["C"].year, stored_movies["C"].rating) == (None, 7.5)
+    assert not os.path.exists(f"{csv_file}.rejects.csv")
+
+
 def test_invalid_csv_format(setup_csv_file):
     """
     Test handling of invalid CSV format in get_movies.
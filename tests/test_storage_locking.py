@@ -0,0 +1,65 @@
+import multiprocessing
+import pytest
+from storage.locking import fcntl
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+
+PROCESSES = 8
+MOVIES_PER_PROCESS = 15
+
+
+def hammer(storage_class, path, worker):
+    """
+    Add, update and delete movies from one process, all against the same file.
+    """
+    storage = storage_class(path)
+    for index in range(MOVIES_PER_PROCESS):
+        title = f"Movie {worker}-{index}"
+        storage.add_movie({title: {"Rating": 5.0, "Year": 2000, "Poster": "",
+                                   "IMDB Link": "", "Notes": ""}})
+        storage.update_movie(title, f"note {worker}")
+    storage.add_movie({f"Doomed {worker}": {"Rating": 1.0, "Year": 2000, "Poster": "",
+                                            "IMDB Link": "", "Notes": ""}})
+    storage.delete_movie(f"Doomed {worker}")
+
+
+@pytest.mark.skipif(fcntl is None, reason="fcntl locks are not available on this platform")
+@pytest.mark.parametrize("storage_class, filename", [(StorageJson, "movies.json"),
+                                                     (StorageCsv, "movies.csv")])
+def test_concurrent_writers_do_not_lose_updates(tmp_path, storage_class, filename):
+    """
+    Stress test: many processes modify the same storage file at once.
+
+    Verifies that every add and update from every process survives and that
+    the version counter counted each successful save.
+    """
+    path = str(tmp_path / filename)
+    storage = storage_class(path)
+    start_version = storage.version()
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=hammer, args=(storage_class, path, worker))
+                 for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    movies = storage.get_movies()
+    assert len(movies) == PROCESSES * MOVIES_PER_PROCESS
+    for worker in range(PROCESSES):
+        assert movies[f"Movie {worker}-0"]["Notes"] == f"note {worker}"
+    saves_per_process = 2 * MOVIES_PER_PROCESS + 2
+    assert storage.version() - start_version == PROCESSES * saves_per_process
+
+
+def test_save_bumps_version(tmp_path):
+    """
+    Test that every save increments the storage version.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    version = storage.version()
+    storage.save_movies({})
+    storage.add_movie({"Up": {"Rating": 8.3, "Year": 2009}})
+    assert storage.version() == version + 2
@@ -0,0 +1,128 @@
+from commands.sync import (LocalPeer, MerkleTree, RemotePeer, record_fields,
+                           start_sync_server, sync)
+from storage.storage_csv import StorageCsv
+from storage.storage_json import StorageJson
+
+MOVIES = {f"Movie {index}": {"Rating": float(index % 10), "Year": 1990 + index % 30,
+                             "Notes": f"note {index}"}
+          for index in range(300)}
+
+
+def make_catalogs(tmp_path):
+    """
+    Create a JSON catalog holding MOVIES and a CSV copy with a few differences.
+    """
+    source = StorageJson(str(tmp_path / "source.json"))
+    source.save_movies(MOVIES)
+    target = StorageCsv(str(tmp_path / "target.csv"))
+    copy = {title: dict(details) for title, details in MOVIES.items()}
+    copy["Movie 7"]["Rating"] = 1.5
+    del copy["Movie 8"]
+    copy["Extra"] = {"Rating": 5.0, "Year": 2000, "Notes": ""}
+    target.save_movies(copy)
+    return source, target
+
+
+def test_pull_copies_only_the_differences(tmp_path):
+    """
+    Test that pulling makes a CSV catalog equal to a JSON one, up to empty fields,
+    with a few requests.
+    """
+    source, target = make_catalogs(tmp_path)
+    peer = LocalPeer(source)
+    report = sync(target, peer)
+    assert (report.copied, report.deleted) == (2, 1)
+    assert report.requests < 10
+    pulled = StorageCsv(target.path).get_movies()
+    assert {title: record_fields(movie) for title, movie in pulled.items()} == \
+        {title: record_fields(movie) for title, movie in source.get_movies().items()}
+
+    report = sync(target, peer)
+    assert (report.copied, report.deleted, report.requests) == (0, 0, 1)
+
+
+def test_push_over_a_socket(tmp_path):
+    """
+    Test that pushing to a sync server updates the served catalog, up to empty fields.
+    """
+    source, target = make_catalogs(tmp_path)
+    server = start_sync_server(source)
+    peer = RemotePeer(*server.server_address)
+    try:
+        report = sync(target, peer, push=True)
+        assert (report.copied, report.deleted) == (2, 1)
+        pushed = StorageJson(source.path).get_movies()
+        assert {title: record_fields(movie) for title, movie in pushed.items()} == \
+            {title: record_fields(movie) for title, movie in target.get_movies().items()}
+        assert sync(target, peer).copied == 0
+    finally:
+        peer.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_tree_is_kept_next_to_the_file(tmp_path):
+    """
+    Test that the saved tree is updated by saves and matches a rebuilt one.
+    """
+    source, _ = make_catalogs(tmp_path)
+    tree = MerkleTree.open(source)
+    source.update_movie("Movie 1", "changed")
+    source.delete_movie("Movie 2")
+    source.add_movie({"New": {"Rating": 7.0, "Year": 2020}})
+    rebuilt = MerkleTree(source.get_movies().items())
+    assert tree.root == rebuilt.root
+    reopened = MerkleTree.open(StorageJson(source.path))
+    assert reopened.root == rebuilt.root and reopened.version == source.version()
+
+
+def test_tree_hashes_what_the_target_stores(tmp_path):
+    """
+    Test that syncing fields a CSV file cannot keep is not reported as in sync later.
+    """
+    source = StorageJson(str(tmp_path / "source.json"))
+    source.save_movies({"Heat": {"Rating": 8.3, "Year": 1995, "Director": "Mann"},
+                        "Up": {"Rating": 8.3, "Year": 2009}})
+    target = StorageCsv(str(tmp_path / "target.csv"))
+    peer = LocalPeer(source)
+    assert sync(target, peer).copied == 2
+    stored = StorageCsv(target.path).get_movies()
+    assert "Director" not in stored["Heat"]
+    assert MerkleTree.open(target).root == MerkleTree(stored.items()).root
+
+    report = sync(target, peer)
+    assert (report.copied, report.deleted) == (1, 0)
+    assert MerkleTree.open(target).root == MerkleTree(stored.items()).root
+
+
+def test_repeated_syncs_keep_one_tree_per_storage(tmp_path, monkeypatch):
+    """
+    Test that syncing a storage again reuses its tree instead of adding listeners.
+    """
+    source, target = make_catalogs(tmp_path)
+    peer = LocalPeer(source)
+    for _ in range(3):
+        sync(target, peer)
+    assert MerkleTree.open(target) is MerkleTree.open(target)
+    writes = []
+    monkeypatch.setattr("commands.sync.atomic_write", lambda *args, **kwargs: writes.append(1))
+    target.update_movie("Movie 1", "seen")
+    source.update_movie("Movie 1", "seen")
+    assert len(writes) == 2
+
+
+def test_unrated_movies_sync_into_a_csv_catalog(tmp_path):
+    """
+    Test that movies without a rating or year survive a JSON to CSV sync.
+    """
+    source = StorageJson(str(tmp_path / "source.json"))
+    source.save_movies({"Heat": {"Rating": 8.3, "Year": 1995},
+                        "Dark": {"Year": 2017, "Notes": ""},
+                        "Unknown": {"Rating": 6.0}})
+    target = StorageCsv(str(tmp_path / "target.csv"))
+    peer = LocalPeer(source)
+    assert sync(target, peer).copied == 3
+    pulled = StorageCsv(target.path).get_movies()
+    assert {title: record_fields(movie) for title, movie in pulled.items()} == \
+        {title: record_fields(movie) for title, movie in source.get_movies().items()}
+    assert sync(target, peer).requests == 1
@@ -0,0 +1,58 @@
+from commands.template_engine import FragmentCache, Markup, Template, load_template
+from commands.web_generator import WebGenerator
+from storage.storage_json import StorageJson
+
+
+def test_template_escapes_slots_except_markup():
+    """
+    Test that slot values are HTML-escaped while Markup and literal braces are kept.
+    """
+    template = Template("<p title='__TEMPLATE_A__'>{__TEMPLATE_B__}</p>")
+    assert template.slots == ("A", "B")
+    assert template.render(A="x' onclick='y", B=Markup("<b>ok</b>")) == \
+        "<p title='x&#x27; onclick=&#x27;y'>{<b>ok</b>}</p>"
+
+
+def test_load_template_recompiles_only_after_change(tmp_path):
+    """
+    Test that a template file is compiled once and reloaded when it changes.
+    """
+    path = tmp_path / "page.html"
+    path.write_text("<ol>__TEMPLATE_MOVIE_GRID__</ol>", encoding="utf-8")
+    first = load_template(str(path))
+    assert load_template(str(path)) is first
+    path.write_text("<ul>__TEMPLATE_MOVIE_GRID__</ul>", encoding="utf-8")
+    assert load_template(str(path)).render(MOVIE_GRID="x") == "<ul>x</ul>"
+
+
+def test_fragment_cache_keeps_one_generation():
+    """
+    Test that fragments are reused by the next build and then dropped if unused.
+    """
+    cache = FragmentCache()
+    cache.get(("a",), lambda: "A")
+    cache.next_generation()
+    assert cache.get(("a",), lambda: "other") == "A"
+    cache.next_generation()
+    cache.next_generation()
+    assert cache.get(("a",), lambda: "new") == "new"
+
+
+def test_website_escapes_and_reuses_fragments(tmp_path):
+    """
+    Test that movie titles and notes are escaped and unchanged movies are not re-rendered.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies({"<Heat>": {"Rating": 8.3, "Year": 1995, "Notes": "a & b"},
+                         "Up": {"Rating": 8.3, "Year": 2009}})
+    generator = WebGenerator(storage, str(tmp_path / "index.html"))
+    generator.generate_website()
+    storage.update_movie("Up", "balloons")
+    html = generator.serialize_movies()
+
+    assert "&lt;Heat&gt;" in html and "<Heat>" not in html
+    assert '<span class="tooltiptext">a &amp; b</span>' in html
+    assert "balloons" in html
+    assert "<Heat>" not in (tmp_path / "index.html").read_text(encoding="utf-8")
+    # pylint: disable=protected-access
+    assert (generator._fragments.hits, generator._fragments.misses) == (1, 3)
@@ -0,0 +1,71 @@
+from commands.analytics import Analytics
+from commands.view_cache import ViewCache, estimate_size
+from storage.storage_json import StorageJson
+
+MOVIES = {f"Movie {index}": {"Rating": index % 10, "Year": 1990 + index % 30}
+          for index in range(200)}
+
+
+def make_storage(tmp_path):
+    """
+    Create a JSON storage holding MOVIES.
+    """
+    storage = StorageJson(str(tmp_path / "movies.json"))
+    storage.save_movies(MOVIES)
+    return storage
+
+
+def test_views_are_reused_until_a_save(tmp_path, monkeypatch):
+    """
+    Test that views are built once per version and that edits refresh them without a re-read.
+    """
+    storage = make_storage(tmp_path)
+    views = ViewCache(storage)
+    analytics = Analytics(storage, workers=1, views=views)
+    reads = []
+    monkeypatch.setattr(storage, "get_movies",
+                        lambda real=storage.get_movies: reads.append(1) or real())
+    first = analytics.sort_movies("Rating", True, 0, 5)
+    assert analytics.sort_movies("Rating", True, 0, 5) is first
+    assert views.movies() is views.movies()
+    assert len(reads) == 1 and views.hits == 4
+
+    storage.update_movie("Movie 3", "Seen twice")
+    assert views.movies()["Movie 3"].notes == "Seen twice"
+    assert analytics.sort_movies("Rating", True, 0, 5) == first
+    # The collection saved by update_movie became the new base view
+    assert len(reads) == 2
+
+    # A save by another process is noticed through the version
+    StorageJson(storage.path).delete_movie("Movie 9")
+    assert "Movie 9" not in views.movies()
+    assert analytics.sort_movies("Rating", True, 0, 5) != first
+
+
+def test_least_recently_used_views_are_evicted(tmp_path):
+    """
+    Test that the cache stays within its budget by evicting the least recently used views.
+    """
+    storage = make_storage(tmp_path)
+    entry = estimate_size(list(range(100)))
+    views = ViewCache(storage, budget=int(entry * 2.5))
+    for name in ("a", "b"):
+        views.get((name,), lambda: list(range(100)))
+    views.get(("a",), list)
+    views.get(("c",), lambda: list(range(100)))
+    assert views.get(("a",), list) == list(range(100))
+    assert views.get(("b",), list) == []
+    assert views.evictions == 1 and views.size <= views.budget
+    # A view larger than the budget is returned but not cached
+    views.get(("big",), lambda: list(range(1000)))
+    assert ("big",) not in views._entries  # pylint: disable=protected-access
+
+
+def test_size_estimate_extrapolates_large_collections(tmp_path):
+    """
+    Test that sampled size estimates grow with the number of movies.
+    """
+    storage = make_storage(tmp_path)
+    movies = storage.get_movies()
+    small = estimate_size(dict(list(movies.items())[:50]))
+    assert 3 * small < estimate_size(movies) < 5 * small
@@ -0,0 +1,28 @@
+from commands.watcher import StorageWatcher
+from storage.storage_json import StorageJson
+
+
+def test_watcher_debounces_and_invalidates_external_edits(tmp_path):
+    """
+    Test that a burst of changes causes one callback after the file settles, and
+    that edits made outside the app bump the storage version.
+    """
+    path = tmp_path / "movies.json"
+    storage = StorageJson(str(path))
+    storage.save_movies({"Up": {"Rating": 8.3, "Year": 2009}})
+    calls = []
+    watcher = StorageWatcher(storage, lambda: calls.append(storage.version()), debounce=0.3)
+
+    storage.add_movie({"Heat": {"Rating": 8.3, "Year": 1995}})
+    assert not watcher.poll(now=10.0)
+    storage.add_movie({"Alien": {"Rating": 8.5, "Year": 1979}})
+    assert not watcher.poll(now=10.2)
+    assert not watcher.poll(now=10.4)
+    assert watcher.poll(now=10.6)
+    assert not watcher.poll(now=11.0)
+    assert calls == [storage.version()]
+
+    path.write_text('{"Up": {"Rating": 8.3, "Year": 2009}}', encoding="utf-8")
+    watcher.poll(now=20.0)
+    assert watcher.poll(now=20.5)
+    assert calls == [calls[0], calls[0] + 1]